@@ -1,43 +1,89 @@
-import nltk
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from pymongo.server_api import ServerApi
 from datetime import datetime
 from dotenv import load_dotenv
+from importlib.metadata import version
 import os
+import sys
+import time
+import result_cache
+from result_cache import get_result_cache, make_key
+from nltk_resources import ensure_resource, sent_tokenize, word_tokenize
 
 # Load environment variables
 load_dotenv()
 
-# MongoDB connection string
-uri = "mongodb+srv://alejandrocanomn:" + \
-    os.getenv("DB_PASSWORD") + \
-    "@cluster0.vlqder.mongodb.net/?retryWrites=true&w=majority&appName=Cluster0"
+
+def mongo_uri():
+    """MongoDB connection string (read when connecting, so importing needs no DB_PASSWORD)"""
+    password = os.getenv("DB_PASSWORD")
+    if not password:
+        raise RuntimeError("DB_PASSWORD is not set (add it to .env)")
+    return "mongodb+srv://alejandrocanomn:" + password + \
+        "@cluster0.vlqder.mongodb.net/?retryWrites=true&w=majority&appName=Cluster0"
+
+
+# Reviews read per cursor batch and written per bulk_write in batched mode
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", "500"))
+# mongod used by --benchmark (a temporary database is created and dropped)
+NLP_BENCHMARK_URI = os.getenv("NLP_BENCHMARK_URI", "mongodb://localhost:27017")
+
+# Identifies the tokenizer in cache keys
+TOKENIZER_ID = f"nltk-punkt-{version('nltk')}"
 
 
-# Download required NLTK data (updated for newer NLTK versions)
 def ensure_nltk_data():
-    """Ensure all required NLTK data is downloaded"""
-    required_packages = ['punkt', 'punkt_tab']
+    """Ensure the tokenizer data is available (tokenize_review also does this on first use)"""
+    for package in ['punkt', 'punkt_tab']:
+        ensure_resource(package)
 
-    for package in required_packages:
-        try:
-            nltk.data.find(f'tokenizers/{package}')
-            print(f"✅ NLTK {package} already available")
-        except LookupError:
-            print(f"📥 Downloading NLTK {package}...")
-            nltk.download(package, quiet=True)
-            print(f"✅ NLTK {package} downloaded successfully")
 
+def tokenize_review(review, concatenate_text=False):
+    """NLP fields for a review document, or None if it has no text"""
+    title = review.get("title") or ""
+    body = review.get("body") or ""
 
-# Download NLTK data
-ensure_nltk_data()
+    # Prepare text for processing
+    if concatenate_text:
+        # Concatenate title and body
+        full_text = f"{title} {body}" if title else body
+    else:
+        # Process only the body
+        full_text = body
+
+    if not full_text.strip():
+        return None
+
+    # Identical texts (short reviews repeat a lot) are tokenized once; the
+    # key is the exact text because the sentences keep their whitespace
+    cache = get_result_cache()
+    key = make_key(full_text, TOKENIZER_ID, {
+                   "concatenate_text": concatenate_text}, normalize=False)
+    tokens = cache.get(key) if cache else None
+    if tokens is None:
+        tokens = {"sentences": sent_tokenize(full_text),
+                  "words": word_tokenize(full_text)}
+        if cache:
+            cache.put(key, tokens)
+
+    return {
+        "sentences": tokens["sentences"],
+        "words": tokens["words"],
+        "nlp_processed_at": datetime.now(),
+        "nlp_concatenated": concatenate_text,
+        "nlp_text_used": full_text
+    }
 
 
 class SimpleNLP:
-    def __init__(self):
-        """Initialize with MongoDB connection"""
-        self.client = MongoClient(uri, server_api=ServerApi('1'))
-        self.db = self.client.canadian_tire_scraper
+    def __init__(self, db=None):
+        """Initialize with MongoDB connection (or an existing database object)"""
+        if db is None:
+            self.client = MongoClient(mongo_uri(), server_api=ServerApi('1'))
+            db = self.client.canadian_tire_scraper
+        else:
+            self.client = None
+        self.db = db
         self.review_collection = self.db.reviews
 
     def process_review_nlp(self, review_id, concatenate_text=False):
@@ -50,36 +96,13 @@ class SimpleNLP:
             print(f"❌ Review with ID {review_id} not found")
             return None
 
-        # Get text data from the review
-        title = review.get("title", "")
-        body = review.get("body", "")
-
-        # Prepare text for processing
-        if concatenate_text:
-            # Concatenate title and body
-            full_text = f"{title} {body}" if title else body
-        else:
-            # Process only the body
-            full_text = body
-
-        if not full_text.strip():
+        update_data = tokenize_review(review, concatenate_text)
+        if not update_data:
             print(f"⚠️ No text content found for review {review_id}")
             return None
-
-        # Sentence segmentation
-        sentences = nltk.sent_tokenize(full_text)
-
-        # Word tokenization
-        words = nltk.word_tokenize(full_text)
-
-        # Update the existing review document with NLP data
-        update_data = {
-            "sentences": sentences,
-            "words": words,
-            "nlp_processed_at": datetime.now(),
-            "nlp_concatenated": concatenate_text,
-            "nlp_text_used": full_text
-        }
+        full_text = update_data["nlp_text_used"]
+        sentences = update_data["sentences"]
+        words = update_data["words"]
 
         # Update the document in MongoDB
         result = self.review_collection.update_one(
@@ -134,6 +157,60 @@ class SimpleNLP:
 
         return results
 
+    def process_all_reviews_batched(self, concatenate_text=False, skip_processed=True, batch_size=NLP_BATCH_SIZE):
+        """Process all reviews with one cursor and bulk writes
+
+        Only review_id/title/body are read, streamed in cursor batches, and
+        each chunk of results is written with one unordered bulk_write, so
+        there are no per-review round trips.
+        """
+        query_filter = {}
+        if skip_processed:
+            query_filter["sentences"] = {"$exists": False}
+
+        cursor = self.review_collection.find(
+            query_filter, {"review_id": 1, "title": 1, "body": 1}).batch_size(batch_size)
+
+        results = []
+        operations = []
+        skipped = 0
+        start_time = time.time()
+
+        def _write():
+            if operations:
+                self.review_collection.bulk_write(operations, ordered=False)
+                operations.clear()
+                print(
+                    f"✅ {len(results)} reviews processed ({time.time() - start_time:.1f}s)")
+
+        for review in cursor:
+            update_data = tokenize_review(review, concatenate_text)
+            if not update_data:
+                skipped += 1
+                continue
+
+            operations.append(UpdateOne({"_id": review["_id"]}, {
+                              "$set": update_data}))
+            results.append({
+                "review_id": review.get("review_id"),
+                "sentences_count": len(update_data["sentences"]),
+                "words_count": len(update_data["words"]),
+                "updated": True
+            })
+            if len(operations) >= batch_size:
+                _write()
+        _write()
+
+        if not results and not skipped:
+            if skip_processed:
+                print("✅ All reviews already processed with NLP data")
+            else:
+                print("❌ No reviews found in the database")
+        elif skipped:
+            print(f"⚠️ {skipped} reviews had no text content")
+
+        return results
+
     def get_nlp_stats(self):
         """Get statistics about NLP processing"""
         total_reviews = self.review_collection.count_documents({})
@@ -156,8 +233,64 @@ class SimpleNLP:
         return sample
 
 
+def benchmark_processing(review_count=2000, batch_size=NLP_BATCH_SIZE, benchmark_uri=NLP_BENCHMARK_URI):
+    """Time per-review processing against the batched path on a scratch database
+
+    Runs against the mongod at benchmark_uri in a temporary database that
+    is dropped afterwards. Both paths process the same generated reviews
+    from scratch, with the result cache bypassed.
+    """
+    client = MongoClient(benchmark_uri)
+    db_name = f"nlp_benchmark_{os.getpid()}_{int(time.time())}"
+    db = client[db_name]
+
+    sample_reviews = [{
+        "review_id": f"bench-{i}",
+        "title": "Great value" if i % 2 else "Not what I expected",
+        "body": "Assembly took about an hour. The instructions were clear, and the frame feels solid! "
+                "Would I buy it again? Probably, although the seat is a bit hard." * (1 + i % 3)
+    } for i in range(review_count)]
+
+    timings = {}
+    cache_mode = result_cache.NLP_CACHE_MODE
+    result_cache.NLP_CACHE_MODE = "off"
+    try:
+        for label, method in (("per-review", "process_all_reviews"), ("batched", "process_all_reviews_batched")):
+            db.reviews.drop()
+            db.reviews.insert_many([dict(review) for review in sample_reviews])
+            db.reviews.create_index("review_id")
+            nlp = SimpleNLP(db)
+
+            start_time = time.time()
+            if method == "process_all_reviews_batched":
+                results = nlp.process_all_reviews_batched(
+                    concatenate_text=True, batch_size=batch_size)
+            else:
+                results = nlp.process_all_reviews(concatenate_text=True)
+            timings[label] = time.time() - start_time
+            if len(results) != review_count:
+                raise RuntimeError(
+                    f"{label} processed {len(results)} of {review_count} reviews")
+    finally:
+        result_cache.NLP_CACHE_MODE = cache_mode
+        client.drop_database(db_name)
+        client.close()
+
+    print(f"\n⏱️ NLP benchmark ({review_count} reviews, {benchmark_uri})")
+    print(f"   per-review: {timings['per-review']:.2f}s ({2 * review_count + 1} database calls)")
+    print(f"   batched:    {timings['batched']:.2f}s (~{2 * -(-review_count // batch_size)} database calls, batch {batch_size})")
+    print(f"   speedup:    {timings['per-review'] / timings['batched']:.1f}x")
+    return timings
+
+
 # Example usage
 if __name__ == "__main__":
+    # python basic_nlp_processing.py --benchmark [review_count] [mongodb://localhost:27017]
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        benchmark_processing(int(sys.argv[2]) if len(sys.argv) > 2 else 2000,
+                             benchmark_uri=sys.argv[3] if len(sys.argv) > 3 else NLP_BENCHMARK_URI)
+        sys.exit(0)
+
     nlp = SimpleNLP()
 
     print("🚀 Starting NLP processing for reviews...")
@@ -177,11 +310,13 @@ if __name__ == "__main__":
             f"\n🔄 Processing {initial_stats['unprocessed_reviews']} unprocessed reviews...")
 
         # Process all unprocessed reviews (concatenating title + body)
-        results = nlp.process_all_reviews(
+        results = nlp.process_all_reviews_batched(
             concatenate_text=True, skip_processed=True)
 
         print(f"\n✅ Processing completed!")
         print(f"📈 Successfully processed: {len(results)} reviews")
+        if get_result_cache():
+            get_result_cache().print_stats()
 
         # Get final stats
         final_stats = nlp.get_nlp_stats()
@@ -0,0 +1,133 @@
+import os
+import statistics
+import subprocess
+import sys
+import threading
+
+# Vendored NLTK data (filled by `python nltk_resources.py vendor`); searched first
+NLTK_DATA_DIR = os.getenv("NLTK_VENDOR_DIR", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "nltk_data"))
+
+# Package name -> resource path checked with nltk.data.find
+REQUIRED_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "vader_lexicon": "sentiment/vader_lexicon.zip"
+}
+
+_nltk = None
+_ready = set()
+_vader_analyzer = None
+_lock = threading.Lock()
+
+
+def get_nltk():
+    """nltk, imported on first use with the vendored data directory on its path"""
+    global _nltk
+    if _nltk is None:
+        import nltk
+        if NLTK_DATA_DIR not in nltk.data.path:
+            nltk.data.path.insert(0, NLTK_DATA_DIR)
+        _nltk = nltk
+    return _nltk
+
+
+def ensure_resource(package):
+    """Make sure an NLTK package is available, downloading it only if it is missing"""
+    if package in _ready:
+        return
+    nltk = get_nltk()
+    with _lock:
+        if package in _ready:
+            return
+        try:
+            nltk.data.find(REQUIRED_RESOURCES[package])
+        except LookupError:
+            print(f"📥 Downloading NLTK {package}...")
+            if not nltk.download(package, quiet=True):
+                raise LookupError(
+                    f"NLTK {package} is not available; run `python nltk_resources.py vendor` "
+                    f"where there is network access")
+            print(f"✅ NLTK {package} downloaded successfully")
+        _ready.add(package)
+
+
+def sent_tokenize(text):
+    ensure_resource("punkt_tab")
+    return get_nltk().sent_tokenize(text)
+
+
+def word_tokenize(text):
+    ensure_resource("punkt_tab")
+    return get_nltk().word_tokenize(text)
+
+
+def get_vader_analyzer():
+    """Process-wide SentimentIntensityAnalyzer (lexicon loaded on first use)"""
+    global _vader_analyzer
+    if _vader_analyzer is None:
+        ensure_resource("vader_lexicon")
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        with _lock:
+            if _vader_analyzer is None:
+                _vader_analyzer = SentimentIntensityAnalyzer()
+    return _vader_analyzer
+
+
+def vendor_nltk_data(target=NLTK_DATA_DIR):
+    """Download every required package into target so batch jobs run offline"""
+    nltk = get_nltk()
+    os.makedirs(target, exist_ok=True)
+    for package in REQUIRED_RESOURCES:
+        ok = nltk.download(package, download_dir=target, quiet=True)
+        print(f"{'✅' if ok else '❌'} {package} -> {target}")
+
+
+# Batch-job entry points and the call that produces their first result
+STARTUP_PROBES = {
+    "basic_nlp_processing": "M.tokenize_review({'body': 'Great bike. Love it!'})",
+    "sentiment_analysis": "M.score_sentiment('Great bike. Love it!', M.get_vader_analyzer())"
+}
+
+
+def measure_startup(runs=7):
+    """Median import time and time to first result of each batch job, in fresh interpreters
+
+    The result cache is off so the first result is really computed.
+    """
+    env = dict(os.environ, NLP_CACHE="off")
+    report = {}
+    for module, probe in STARTUP_PROBES.items():
+        code = ("import contextlib, io, time\n"
+                "start = time.perf_counter()\n"
+                "with contextlib.redirect_stdout(io.StringIO()):\n"
+                f"    import {module} as M\n"
+                "imported = time.perf_counter()\n"
+                "with contextlib.redirect_stdout(io.StringIO()):\n"
+                f"    {probe}\n"
+                "print(imported - start, time.perf_counter() - start)")
+        import_times, first_result_times = [], []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+            if output.returncode:
+                print(f"❌ {module}: {output.stderr.strip().splitlines()[-1]}")
+                break
+            import_time, first_result_time = map(float, output.stdout.split())
+            import_times.append(import_time)
+            first_result_times.append(first_result_time)
+        if import_times:
+            report[module] = (statistics.median(import_times),
+                              statistics.median(first_result_times))
+            print(f"⏱️ {module}: import {report[module][0] * 1000:.0f} ms, "
+                  f"first result {report[module][1] * 1000:.0f} ms")
+    return report
+
+
+if __name__ == "__main__":
+    # python nltk_resources.py vendor | measure
+    command = sys.argv[1] if len(sys.argv) > 1 else "measure"
+    if command == "vendor":
+        vendor_nltk_data()
+    else:
+        measure_startup()
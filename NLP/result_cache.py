@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Persistent memo of tokenization / sentiment results ("off" disables it)
+NLP_CACHE_MODE = os.getenv("NLP_CACHE", "on")
+NLP_CACHE_FILE = os.getenv("NLP_CACHE_FILE", "nlp_cache.db")
+NLP_CACHE_MAX_ENTRIES = int(os.getenv("NLP_CACHE_MAX_ENTRIES", "200000"))
+
+
+def normalize_text(text):
+    """Whitespace-insensitive form of a text (case is kept: VADER uses it)"""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def make_key(text, analyzer, config=None, normalize=True):
+    """Cache key for a text scored by an analyzer (name+version) with a config
+
+    With normalize=False the key is built from the exact text, for results
+    that depend on its whitespace (token and sentence boundaries).
+    """
+    text = normalize_text(text) if normalize else text or ""
+    payload = json.dumps([text, analyzer, config or {}],
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """SQLite-backed result cache with LRU eviction
+
+    Values are stored as JSON. Entries not used for the longest time are
+    dropped once the cache holds more than max_entries.
+    """
+
+    def __init__(self, path=NLP_CACHE_FILE, max_entries=NLP_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        self._connection().execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._connection().execute(
+            "CREATE INDEX IF NOT EXISTS idx_results_access ON results(last_access)")
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _connection(self):
+        """One connection per thread and process (a connection must not cross a fork)"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        """Cached value (and mark it as recently used), or None"""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        conn.execute("UPDATE results SET last_access = ? WHERE key = ?",
+                     (time.time(), key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO results (key, value, last_access) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), time.time()))
+        self.writes += 1
+        # Checking the size on every write would dominate; every 10% is enough
+        if self.writes % max(1, min(1000, self.max_entries // 10)) == 0:
+            self._evict()
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def _evict(self):
+        """Drop least recently used entries down to 90% of max_entries"""
+        excess = self.count() - self.max_entries
+        if excess <= 0:
+            return
+        excess += int(self.max_entries * 0.1)
+        self._connection().execute(
+            "DELETE FROM results WHERE key IN "
+            "(SELECT key FROM results ORDER BY last_access LIMIT ?)", (excess,))
+
+    def print_stats(self):
+        print(f"🧠 NLP cache: {self.hits} hits, {self.misses} misses; "
+              f"{self.count()} entries in {self.path}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide cache, or None when NLP_CACHE=off"""
+    global _cache
+    if NLP_CACHE_MODE == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+    return _cache
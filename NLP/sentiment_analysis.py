@@ -1,131 +1,231 @@
-from nltk.sentiment import SentimentIntensityAnalyzer
-import nltk
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from pymongo.server_api import ServerApi
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 from dotenv import load_dotenv
+from importlib.metadata import version
 import os
-from textblob import TextBlob
+import time
+from result_cache import get_result_cache, make_key
+from nltk_resources import ensure_resource, get_vader_analyzer
 
 # Load environment variables
 load_dotenv()
 
-# MongoDB connection string
-uri = "mongodb+srv://alejandrocanomn:" + \
-    os.getenv("DB_PASSWORD") + \
-    "@cluster0.vlqder.mongodb.net/?retryWrites=true&w=majority&appName=Cluster0"
 
-# Download required NLTK data for sentiment analysis
+def mongo_uri():
+    """MongoDB connection string (read when connecting, so importing needs no DB_PASSWORD)"""
+    password = os.getenv("DB_PASSWORD")
+    if not password:
+        raise RuntimeError("DB_PASSWORD is not set (add it to .env)")
+    return "mongodb+srv://alejandrocanomn:" + password + \
+        "@cluster0.vlqder.mongodb.net/?retryWrites=true&w=majority&appName=Cluster0"
+
+
+# Pipeline mode: scoring processes (default: all cores) and reviews per
+# cursor batch / scoring task / bulk_write
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", "0")) or os.cpu_count()
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "200"))
+
+# Identifies the scoring in cache keys; bump the suffix when score_sentiment changes
+SENTIMENT_ANALYZER_ID = f"vader-nltk-{version('nltk')}+textblob-{version('textblob')}/v1"
 
 
 def ensure_nltk_data():
-    """Ensure all required NLTK data is downloaded"""
-    required_packages = ['punkt', 'punkt_tab', 'vader_lexicon']
+    """Ensure all required NLTK data is available (scoring also does this on first use)"""
+    for package in ['punkt', 'punkt_tab', 'vader_lexicon']:
+        ensure_resource(package)
+
+
+def textblob_polarity(text):
+    # TextBlob pulls in nltk and its pattern lexicon; import it on first use
+    from textblob import TextBlob
+    return TextBlob(text).sentiment.polarity
+
+
+NO_TEXT_RESULT = {
+    'sentiment': 'neutral',
+    'confidence_score': 0.0,
+    'vader_scores': {},
+    'textblob_polarity': 0.0,
+    'method': 'no_text'
+}
+
+ERROR_RESULT = {
+    'sentiment': 'neutral',
+    'confidence_score': 0.0,
+    'vader_scores': {},
+    'textblob_polarity': 0.0,
+    'method': 'error'
+}
+
+
+def combine_scores(vader_scores, textblob_polarity):
+    """Consolidated result from VADER scores and a TextBlob polarity"""
+    # Determine overall sentiment and confidence
+    # VADER compound score ranges from -1 to 1
+    vader_compound = vader_scores['compound']
+
+    # Combine both methods for better accuracy
+    # Average the normalized scores
+    combined_score = (vader_compound + textblob_polarity) / 2
+
+    # Determine sentiment label
+    if combined_score >= 0.1:
+        sentiment = 'positive'
+    elif combined_score <= -0.1:
+        sentiment = 'negative'
+    else:
+        sentiment = 'neutral'
+
+    # Calculate confidence score based on agreement between methods
+    # and absolute value of the combined score
+    agreement_factor = 1 - abs(vader_compound - textblob_polarity) / 2
+    intensity_factor = abs(combined_score)
+    confidence_score = (agreement_factor * 0.6 +
+                        intensity_factor * 0.4)
+    # Clamp between 0 and 1
+    confidence_score = min(max(confidence_score, 0.0), 1.0)
+
+    return {
+        'sentiment': sentiment,
+        'confidence_score': round(confidence_score, 3),
+        'combined_score': round(combined_score, 3),
+        'vader_scores': {
+            'compound': round(vader_compound, 3),
+            'positive': round(vader_scores['pos'], 3),
+            'negative': round(vader_scores['neg'], 3),
+            'neutral': round(vader_scores['neu'], 3)
+        },
+        'textblob_polarity': round(textblob_polarity, 3),
+        'method': 'vader_textblob_combined'
+    }
+
+
+def score_sentiment(text, vader_analyzer):
+    """Analyze sentiment using multiple methods and return consolidated result"""
+    if not text or len(text.strip()) == 0:
+        return dict(NO_TEXT_RESULT)
+
+    try:
+        # Method 1: VADER Sentiment
+        vader_scores = vader_analyzer.polarity_scores(text)
+
+        # Method 2: TextBlob Sentiment
+        return combine_scores(vader_scores, textblob_polarity(text))
 
-    for package in required_packages:
+    except Exception as e:
+        print(f"❌ Error analyzing sentiment: {e}")
+        return dict(ERROR_RESULT)
+
+
+def score_sentiment_batch(texts, vader_engine):
+    """score_sentiment for a list of texts, VADER scored in one BatchVader pass"""
+    results = [dict(NO_TEXT_RESULT) if not text or not text.strip() else None
+               for text in texts]
+    todo = [i for i, result in enumerate(results) if result is None]
+    try:
+        vader_scores = vader_engine.polarity_scores_batch(
+            [texts[i] for i in todo])
+    except Exception as e:
+        print(f"❌ Error analyzing sentiment batch: {e}")
+        vader_scores = [None] * len(todo)
+
+    for i, scores in zip(todo, vader_scores):
         try:
-            if package == 'vader_lexicon':
-                nltk.data.find(f'vader_lexicon')
-            else:
-                nltk.data.find(f'tokenizers/{package}')
-            print(f"✅ NLTK {package} already available")
-        except LookupError:
-            print(f"📥 Downloading NLTK {package}...")
-            nltk.download(package, quiet=True)
-            print(f"✅ NLTK {package} downloaded successfully")
+            if scores is None:
+                raise ValueError("no VADER scores")
+            results[i] = combine_scores(
+                scores, textblob_polarity(texts[i]))
+        except Exception as e:
+            print(f"❌ Error analyzing sentiment: {e}")
+            results[i] = dict(ERROR_RESULT)
+    return results
+
+
+# Per-process VADER engine for the pipeline workers (built once in _init_worker)
+_worker_engine = None
+
+
+def _init_worker():
+    global _worker_engine
+    from vader_batch import BatchVader
+    _worker_engine = BatchVader(get_vader_analyzer().lexicon)
+
+
+def _score_batch(batch):
+    """[(key, text)] -> [(key, sentiment result)] inside a pool worker"""
+    results = score_sentiment_batch([text for _, text in batch], _worker_engine)
+    return [(key, result) for (key, _), result in zip(batch, results)]
 
 
-# Download NLTK data
-ensure_nltk_data()
+def cacheable(result):
+    """Failed scorings are recomputed next time"""
+    return result['method'] != 'error'
 
 
 class SentimentAnalyzer:
-    def __init__(self):
-        """Initialize with MongoDB connection and sentiment analyzer"""
+    def __init__(self, db=None):
+        """Initialize with MongoDB connection (or an existing database object) and sentiment analyzer"""
         try:
-            self.client = MongoClient(uri, server_api=ServerApi('1'))
-            self.db = self.client.canadian_tire_scraper
-            self.nlp_collection = self.db.reviews
+            if db is None:
+                self.client = MongoClient(mongo_uri(), server_api=ServerApi('1'))
+                db = self.client.canadian_tire_scraper
 
-            # Initialize sentiment analyzers
-            self.vader_analyzer = SentimentIntensityAnalyzer()
+                # Test connection
+                self.client.admin.command('ping')
+                print("✅ Connected to MongoDB successfully")
+            else:
+                self.client = None
+            self.db = db
+            self.nlp_collection = self.db.reviews
 
-            # Test connection
-            self.client.admin.command('ping')
-            print("✅ Connected to MongoDB successfully")
-            print("✅ Sentiment analyzers initialized")
+            # Sentiment analyzers are loaded on first use (vader_analyzer / vader_engine)
+            self._vader_engine = None
 
         except Exception as e:
             print(f"❌ MongoDB connection failed: {e}")
             raise
 
-    def analyze_sentiment(self, text):
-        """Analyze sentiment using multiple methods and return consolidated result"""
-        if not text or len(text.strip()) == 0:
-            return {
-                'sentiment': 'neutral',
-                'confidence_score': 0.0,
-                'vader_scores': {},
-                'textblob_polarity': 0.0,
-                'method': 'no_text'
-            }
+    @property
+    def vader_analyzer(self):
+        return get_vader_analyzer()
 
-        try:
-            # Method 1: VADER Sentiment
-            vader_scores = self.vader_analyzer.polarity_scores(text)
-
-            # Method 2: TextBlob Sentiment
-            blob = TextBlob(text)
-            textblob_polarity = blob.sentiment.polarity
-
-            # Determine overall sentiment and confidence
-            # VADER compound score ranges from -1 to 1
-            vader_compound = vader_scores['compound']
-
-            # Combine both methods for better accuracy
-            # Average the normalized scores
-            combined_score = (vader_compound + textblob_polarity) / 2
-
-            # Determine sentiment label
-            if combined_score >= 0.1:
-                sentiment = 'positive'
-            elif combined_score <= -0.1:
-                sentiment = 'negative'
-            else:
-                sentiment = 'neutral'
-
-            # Calculate confidence score based on agreement between methods
-            # and absolute value of the combined score
-            agreement_factor = 1 - abs(vader_compound - textblob_polarity) / 2
-            intensity_factor = abs(combined_score)
-            confidence_score = (agreement_factor * 0.6 +
-                                intensity_factor * 0.4)
-            # Clamp between 0 and 1
-            confidence_score = min(max(confidence_score, 0.0), 1.0)
-
-            return {
-                'sentiment': sentiment,
-                'confidence_score': round(confidence_score, 3),
-                'combined_score': round(combined_score, 3),
-                'vader_scores': {
-                    'compound': round(vader_compound, 3),
-                    'positive': round(vader_scores['pos'], 3),
-                    'negative': round(vader_scores['neg'], 3),
-                    'neutral': round(vader_scores['neu'], 3)
-                },
-                'textblob_polarity': round(textblob_polarity, 3),
-                'method': 'vader_textblob_combined'
-            }
+    @property
+    def vader_engine(self):
+        if self._vader_engine is None:
+            from vader_batch import BatchVader
+            self._vader_engine = BatchVader(self.vader_analyzer.lexicon)
+            print("✅ Batch VADER engine initialized")
+        return self._vader_engine
 
-        except Exception as e:
-            print(f"❌ Error analyzing sentiment: {e}")
-            return {
-                'sentiment': 'neutral',
-                'confidence_score': 0.0,
-                'vader_scores': {},
-                'textblob_polarity': 0.0,
-                'method': 'error'
-            }
+    def analyze_sentiment(self, text):
+        """Analyze sentiment using multiple methods and return consolidated result"""
+        cache = get_result_cache()
+        if not cache:
+            return score_sentiment(text, self.vader_analyzer)
+
+        key = make_key(text, SENTIMENT_ANALYZER_ID)
+        result = cache.get(key)
+        if result is None:
+            result = score_sentiment(text, self.vader_analyzer)
+            if cacheable(result):
+                cache.put(key, result)
+        return result
+
+    def analyze_sentiment_batch(self, texts):
+        """analyze_sentiment for a list of texts (VADER vectorized over the batch)"""
+        cache = get_result_cache()
+        keys = [make_key(text, SENTIMENT_ANALYZER_ID) for text in texts]
+        results = [cache.get(key) if cache else None for key in keys]
+
+        todo = [i for i, result in enumerate(results) if result is None]
+        scored = score_sentiment_batch([texts[i] for i in todo], self.vader_engine)
+        for i, result in zip(todo, scored):
+            results[i] = result
+            if cache and cacheable(result):
+                cache.put(keys[i], result)
+        return results
 
     def add_sentiment_to_document(self, review_id, force_update=False):
         """Add sentiment analysis to existing NLP document"""
@@ -232,6 +332,107 @@ class SentimentAnalyzer:
         print(f"   ✅ Successful updates: {success_count}")
         print(f"   ❌ Failed updates: {processed_count - success_count}")
 
+    def process_all_sentiments_parallel(self, limit=None, force_reprocess=False,
+                                        workers=SENTIMENT_WORKERS, batch_size=SENTIMENT_BATCH_SIZE):
+        """Score reviews on every core and write the results back in bulk
+
+        Review bodies are read with a projected cursor. Texts already in the
+        result cache are resolved here; the rest go to a process pool in
+        batches (each worker builds its BatchVader engine once). Results go
+        back with one unordered bulk_write per batch, skipping documents
+        whose stored sentiment is already identical. At most two batches
+        per worker are in flight, so memory stays flat on a large corpus.
+        """
+        query = {} if force_reprocess else {
+            "sentiment_analysis": {"$exists": False}}
+        cursor = self.nlp_collection.find(
+            query, {"body": 1, "sentiment_analysis": 1}).batch_size(batch_size)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        print(f"🎭 Scoring {'ALL' if force_reprocess else 'unscored'} documents on {workers} processes "
+              f"(batches of {batch_size})...")
+
+        cache = get_result_cache()
+        processed_count = 0
+        unchanged_count = 0
+        failed_count = 0
+        start_time = time.time()
+
+        def _write(docs, results):
+            """docs: [(_id, stored sentiment, key)], results: {key: result}"""
+            nonlocal processed_count, unchanged_count, failed_count
+            now = datetime.utcnow()
+            operations = []
+            for doc_id, existing, key in docs:
+                result = results[key]
+                processed_count += 1
+                if result['method'] == 'error':
+                    failed_count += 1
+                if result == existing:
+                    unchanged_count += 1
+                    continue
+                operations.append(UpdateOne({"_id": doc_id}, {"$set": {
+                    "sentiment_analysis": result,
+                    "sentiment_updated_at": now
+                }}))
+            if operations:
+                self.nlp_collection.bulk_write(operations, ordered=False)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            pending = {}
+
+            def _drain(max_pending):
+                while len(pending) > max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        docs, results = pending.pop(future)
+                        for key, result in future.result():
+                            results[key] = result
+                            if cache and cacheable(result):
+                                cache.put(key, result)
+                        _write(docs, results)
+                    elapsed = time.time() - start_time
+                    print(
+                        f"📈 Progress: {processed_count} scored ({processed_count / elapsed:.0f} docs/s)")
+
+            def _submit(docs, results, to_score):
+                if to_score:
+                    future = executor.submit(
+                        _score_batch, list(to_score.items()))
+                    pending[future] = (docs, results)
+                    _drain(workers * 2)
+                else:
+                    _write(docs, results)
+
+            docs, results, to_score = [], {}, {}
+            for doc in cursor:
+                text = doc.get("body")
+                key = make_key(text, SENTIMENT_ANALYZER_ID)
+                docs.append((doc["_id"], doc.get("sentiment_analysis"), key))
+                if key not in results and key not in to_score:
+                    cached = cache.get(key) if cache else None
+                    if cached is not None:
+                        results[key] = cached
+                    else:
+                        to_score[key] = text
+                if len(docs) >= batch_size:
+                    _submit(docs, results, to_score)
+                    docs, results, to_score = [], {}, {}
+            if docs:
+                _submit(docs, results, to_score)
+            _drain(0)
+
+        elapsed = time.time() - start_time
+        print(f"\n🎉 Sentiment analysis complete!")
+        print(f"   📝 Documents processed: {processed_count}")
+        print(f"   ⏭️ Unchanged (not rewritten): {unchanged_count}")
+        print(f"   ❌ Scoring errors: {failed_count}")
+        print(f"   ⏱️ {elapsed:.1f}s ({processed_count / elapsed if elapsed else 0:.0f} docs/s)")
+        if cache:
+            cache.print_stats()
+        return processed_count
+
     def get_sentiment_stats(self):
         """Get sentiment analysis statistics"""
         pipeline = [
@@ -311,13 +512,13 @@ if __name__ == "__main__":
         
         if choice == "2":
             print("\n� Reprocessing ALL documents...")
-            analyzer.process_all_sentiments(force_reprocess=True)
+            analyzer.process_all_sentiments_parallel(force_reprocess=True)
         elif choice == "3":
             print("\n🧪 Processing sample documents...")
             analyzer.process_sample_sentiments(limit=10)
         else:
             print("\n🚀 Processing documents without sentiment...")
-            analyzer.process_all_sentiments()
+            analyzer.process_all_sentiments_parallel()
 
         # Show final statistics
         print("\n📊 Final Statistics:")
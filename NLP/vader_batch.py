@@ -0,0 +1,325 @@
+import math
+import random
+import sys
+import time
+import numpy as np
+from nltk.sentiment.vader import VaderConstants
+from nltk_resources import get_vader_analyzer
+
+# Review-like sentences that exercise every VADER rule (boosters, caps,
+# negation, "never so", "least", "kind of", idioms, "but", punctuation)
+FIXTURE_REVIEWS = [
+    "Great bike",
+    "Great bike!!!",
+    "This bike is GREAT, but the seat is terrible.",
+    "The frame is not good and the brakes are not great either.",
+    "I absolutely love it. Extremely happy with the purchase!",
+    "It is kind of ok, sort of disappointing though.",
+    "Never so happy with a purchase, never this satisfied.",
+    "At least it was cheap. Not the least bit useful.",
+    "The instructions were slightly confusing but assembly was easy :)",
+    "Worst purchase ever?? Broke after two days???",
+    "Hardly worth the money, and the shipping was awful.",
+    "Yeah right, the bomb of all bikes. It cut the mustard though.",
+    "I didn't like it. Wasn't what I expected, didn't fit.",
+    "Decent quality for the price, nothing special",
+    "VERY disappointed. The chain came off on day one!",
+    "Good good good. Bad bad. Good.",
+    "",
+    "ok",
+    "Love it!!!! Best bike I've owned, my kids love it too",
+    "It's not bad, just enough for short rides",
+]
+
+
+class BatchVader:
+    """NLTK's VADER rules applied to a whole batch of texts with NumPy
+
+    Texts are split once into tokens (the same words_and_emoticons NLTK
+    builds), mapped through a precompiled token -> index table, and
+    every rule is evaluated on flat arrays covering all tokens of the
+    batch. polarity_scores_batch returns the same dicts as
+    SentimentIntensityAnalyzer.polarity_scores.
+    """
+
+    def __init__(self, lexicon=None):
+        if lexicon is None:
+            lexicon = get_vader_analyzer().lexicon
+        self.constants = VaderConstants()
+        self.punc_set = set(self.constants.PUNC_LIST)
+        self.punc_chars = "".join(self.punc_set)
+
+        # Token table: lexicon words plus every word a rule looks at
+        words = set(lexicon) | set(self.constants.BOOSTER_DICT) | set(self.constants.NEGATE) | {
+            "least", "at", "very", "kind", "of", "but"}
+        self.index = {word: i for i, word in enumerate(sorted(words))}
+        # Row len(index) is the "unknown token" row
+        size = len(self.index) + 1
+        self.in_lexicon = np.zeros(size, dtype=bool)
+        self.valence = np.zeros(size)
+        self.is_booster = np.zeros(size, dtype=bool)
+        self.booster = np.zeros(size)
+        self.is_negate = np.zeros(size, dtype=bool)
+        for word, i in self.index.items():
+            if word in lexicon:
+                self.in_lexicon[i] = True
+                self.valence[i] = lexicon[word]
+            if word in self.constants.BOOSTER_DICT:
+                self.is_booster[i] = True
+                self.booster[i] = self.constants.BOOSTER_DICT[word]
+            self.is_negate[i] = word in self.constants.NEGATE
+        self.unknown = len(self.index)
+        self.least, self.at, self.very, self.kind, self.of, self.but = (
+            self.index[w] for w in ("least", "at", "very", "kind", "of", "but"))
+
+        # Adjacent raw token pairs of the idioms and two-word boosters
+        phrases = list(self.constants.SPECIAL_CASE_IDIOMS) + \
+            [b for b in self.constants.BOOSTER_DICT if " " in b]
+        self.phrase_pairs = {pair for phrase in phrases
+                             for pair in zip(phrase.split(), phrase.split()[1:])}
+
+    def tokenize(self, text):
+        """SentiText.words_and_emoticons without building its punctuation dict"""
+        words_only = {w for w in self.constants.REGEX_REMOVE_PUNCTUATION.sub("", text).split()
+                      if len(w) > 1}
+        punc_chars, punc_set = self.punc_chars, self.punc_set
+        tokens = []
+        for we in text.split():
+            if len(we) <= 1:
+                continue
+            # One PUNC_LIST entry glued to a word: keep just the word
+            if we[0] in punc_chars:
+                word = we.lstrip(punc_chars)
+                if word in words_only and we[:len(we) - len(word)] in punc_set:
+                    we = word
+            if we[-1] in punc_chars:
+                word = we.rstrip(punc_chars)
+                if word in words_only and we[len(word):] in punc_set:
+                    we = word
+            tokens.append(we)
+        return tokens
+
+    def polarity_scores_batch(self, texts):
+        """polarity_scores for every text, computed together"""
+        texts = [text if isinstance(text, str) else str(text.encode("utf-8"))
+                 for text in texts]
+        index, unknown, phrase_pairs = self.index, self.unknown, self.phrase_pairs
+
+        ids, upper, has_nt, exact, src, pairs, lengths = [], [], [], [], [], [], []
+        doc_tokens = []
+        for text in texts:
+            tokens = self.tokenize(text)
+            first_index = {}
+            offset = len(ids)
+            for i, token in enumerate(tokens):
+                low = token.lower()
+                ids.append(index.get(low, unknown))
+                upper.append(token.isupper())
+                has_nt.append("n't" in low)
+                exact.append(1 if token == "never" else 2 if token in (
+                    "so", "this") else 0)
+                # NLTK scores every occurrence of a token at its first position
+                src.append(first_index.setdefault(token, offset + i))
+                # Token and the one before it are part of an idiom
+                pairs.append(i > 0 and (tokens[i - 1], token) in phrase_pairs)
+            lengths.append(len(tokens))
+            doc_tokens.append(tokens)
+
+        n_docs = len(texts)
+        lengths = np.array(lengths, dtype=np.int64)
+        ids = np.array(ids, dtype=np.int64)
+        n = len(ids)
+        doc = np.repeat(np.arange(n_docs), lengths)
+        starts = np.cumsum(lengths) - lengths
+        pos = np.arange(n) - np.repeat(starts, lengths)
+        upper = np.array(upper, dtype=bool)
+        exact = np.array(exact, dtype=np.int8)
+        src = np.array(src, dtype=np.int64)
+        pairs = np.array(pairs, dtype=bool)
+
+        # Some but not all words in ALL CAPS
+        caps = np.bincount(doc, weights=upper, minlength=n_docs)
+        cap_diff = ((lengths - caps) > 0) & ((lengths - caps) < lengths)
+        capd = cap_diff[doc]
+
+        in_lex = self.in_lexicon[ids]
+        negated = self.is_negate[ids] | np.array(has_nt, dtype=bool)
+        c = self.constants
+
+        def back(k):
+            """Flat index k tokens back (clamped; callers mask on pos >= k)"""
+            return np.maximum(np.arange(n) - k, 0)
+
+        # Lexicon valence with the ALL CAPS boost
+        v = np.where(in_lex, self.valence[ids], 0.0)
+        caps_word = in_lex & upper & capd
+        v = np.where(caps_word, np.where(v > 0, v + c.C_INCR, v - c.C_INCR), v)
+
+        for start_i in range(3):
+            j = back(start_i + 1)
+            valid = in_lex & (pos > start_i) & ~self.in_lexicon[ids[j]]
+
+            # Booster/dampener before the word, weaker with distance
+            s = np.where(self.is_booster[ids[j]], self.booster[ids[j]], 0.0)
+            s = np.where(v < 0, -s, s)
+            caps_booster = self.is_booster[ids[j]] & upper[j] & capd
+            s = np.where(caps_booster, np.where(
+                v > 0, s + c.C_INCR, s - c.C_INCR), s)
+            s = s * (1.0, 0.95, 0.9)[start_i]
+            v = np.where(valid, v + s, v)
+
+            # Negation ("never so" / "this" intensify instead)
+            if start_i == 0:
+                factor = np.where(negated[j], c.N_SCALAR, 1.0)
+            elif start_i == 1:
+                never_so = (exact[j] == 1) & (exact[back(1)] == 2)
+                factor = np.where(never_so, 1.5, np.where(
+                    negated[j], c.N_SCALAR, 1.0))
+            else:
+                never_so = ((exact[j] == 1) & (exact[back(2)] == 2)) | (
+                    exact[back(1)] == 2)
+                factor = np.where(never_so, 1.25, np.where(
+                    negated[j], c.N_SCALAR, 1.0))
+            v = np.where(valid, v * factor, v)
+
+            if start_i == 2:
+                # Idioms are rare: only check tokens with an idiom pair in
+                # their window (tokens i-3 .. i+2)
+                near_pair = np.zeros(n, dtype=bool)
+                for k in range(-2, 3):
+                    near_pair |= pairs[np.clip(np.arange(n) + k, 0, max(n - 1, 0))]
+                for f in np.flatnonzero(valid & near_pair):
+                    v[f] = self._idioms_check(
+                        v[f], doc_tokens[doc[f]], pos[f])
+
+        # "least" negates unless preceded by "at" / "very"
+        prev_least = (pos > 0) & (ids[back(1)] == self.least) & ~self.in_lexicon[self.least]
+        prev2 = ids[back(2)]
+        least_negates = prev_least & ((pos == 1) | ((prev2 != self.at) & (prev2 != self.very)))
+        v = np.where(in_lex & least_negates, v * c.N_SCALAR, v)
+
+        # Boosters and "kind of" carry no valence themselves
+        next_of = np.zeros(n, dtype=bool)
+        next_of[:-1] = (ids[1:] == self.of) & (pos[:-1] < lengths[doc[:-1]] - 1)
+        skipped = self.is_booster[ids] | ((ids == self.kind) & next_of)
+        v = np.where(skipped, 0.0, v)
+
+        sentiments = v[src]
+
+        # Halve everything before the first "but", boost everything after it
+        but_pos = np.full(n_docs, np.iinfo(np.int64).max)
+        is_but = ids == self.but
+        np.minimum.at(but_pos, doc[is_but], pos[is_but])
+        first_but = but_pos[doc]
+        has_but = first_but != np.iinfo(np.int64).max
+        sentiments = np.where(has_but & (pos < first_but), sentiments * 0.5,
+                              np.where(has_but & (pos > first_but), sentiments * 1.5, sentiments))
+
+        # Sums in token order, like NLTK's loops
+        sum_s = np.bincount(doc, weights=sentiments, minlength=n_docs)
+        pos_sum = np.bincount(doc, weights=np.where(
+            sentiments > 0, sentiments + 1, 0.0), minlength=n_docs)
+        neg_sum = np.bincount(doc, weights=np.where(
+            sentiments < 0, sentiments - 1, 0.0), minlength=n_docs)
+        neu_count = np.bincount(doc, weights=sentiments == 0, minlength=n_docs)
+
+        results = []
+        for d, text in enumerate(texts):
+            if not lengths[d]:
+                results.append({"neg": 0.0, "neu": 0.0,
+                               "pos": 0.0, "compound": 0.0})
+                continue
+            amplifier = self._punctuation_amplifier(text)
+            total = float(sum_s[d])
+            if total > 0:
+                total += amplifier
+            elif total < 0:
+                total -= amplifier
+            compound = c.normalize(total)
+
+            p, ng, neu = float(pos_sum[d]), float(neg_sum[d]), float(neu_count[d])
+            if p > math.fabs(ng):
+                p += amplifier
+            elif p < math.fabs(ng):
+                ng -= amplifier
+            denominator = p + math.fabs(ng) + neu
+            results.append({
+                "neg": round(math.fabs(ng / denominator), 3),
+                "neu": round(math.fabs(neu / denominator), 3),
+                "pos": round(math.fabs(p / denominator), 3),
+                "compound": round(compound, 4)
+            })
+        return results
+
+    def _idioms_check(self, valence, words, i):
+        """SentimentIntensityAnalyzer._idioms_check for one token"""
+        idioms = self.constants.SPECIAL_CASE_IDIOMS
+        sequences = [f"{words[i - 1]} {words[i]}", f"{words[i - 2]} {words[i - 1]} {words[i]}",
+                     f"{words[i - 2]} {words[i - 1]}", f"{words[i - 3]} {words[i - 2]} {words[i - 1]}",
+                     f"{words[i - 3]} {words[i - 2]}"]
+        for seq in sequences:
+            if seq in idioms:
+                valence = idioms[seq]
+                break
+        if len(words) - 1 > i and f"{words[i]} {words[i + 1]}" in idioms:
+            valence = idioms[f"{words[i]} {words[i + 1]}"]
+        if len(words) - 1 > i + 1 and f"{words[i]} {words[i + 1]} {words[i + 2]}" in idioms:
+            valence = idioms[f"{words[i]} {words[i + 1]} {words[i + 2]}"]
+        if sequences[4] in self.constants.BOOSTER_DICT or sequences[2] in self.constants.BOOSTER_DICT:
+            valence = valence + self.constants.B_DECR
+        return valence
+
+    def _punctuation_amplifier(self, text):
+        """Emphasis from "!" (up to 4) and repeated "?" """
+        amplifier = min(text.count("!"), 4) * 0.292
+        qm_count = text.count("?")
+        if qm_count > 1:
+            amplifier += qm_count * 0.18 if qm_count <= 3 else 0.96
+        return amplifier
+
+
+def compare_with_nltk(texts, analyzer=None, engine=None):
+    """Texts whose batch scores differ from NLTK's polarity_scores"""
+    analyzer = analyzer or get_vader_analyzer()
+    engine = engine or BatchVader(analyzer.lexicon)
+    mismatches = []
+    for text, batch_scores in zip(texts, engine.polarity_scores_batch(texts)):
+        expected = analyzer.polarity_scores(text)
+        if any(abs(expected[k] - batch_scores[k]) > 1e-3 for k in expected):
+            mismatches.append((text, expected, batch_scores))
+    return mismatches
+
+
+def benchmark(review_count=20000, seed=0):
+    """Check the fixture corpus against NLTK, then time per-call vs batch scoring"""
+    analyzer = get_vader_analyzer()
+    engine = BatchVader(analyzer.lexicon)
+
+    mismatches = compare_with_nltk(FIXTURE_REVIEWS, analyzer, engine)
+    for text, expected, got in mismatches:
+        print(f"❌ Mismatch for {text!r}: NLTK {expected}, batch {got}")
+    print(f"✅ Fixture corpus: {len(FIXTURE_REVIEWS) - len(mismatches)}/{len(FIXTURE_REVIEWS)} "
+          f"texts match NLTK")
+
+    rng = random.Random(seed)
+    texts = [" ".join(rng.sample(FIXTURE_REVIEWS, 3))
+             for _ in range(review_count)]
+
+    start_time = time.time()
+    loop_scores = [analyzer.polarity_scores(text) for text in texts]
+    loop_time = time.time() - start_time
+
+    start_time = time.time()
+    batch_scores = engine.polarity_scores_batch(texts)
+    batch_time = time.time() - start_time
+
+    print(f"\n⏱️ VADER on {review_count} reviews")
+    print(f"   per-call loop: {loop_time:.2f}s")
+    print(f"   batch:         {batch_time:.2f}s")
+    print(f"   speedup:       {loop_time / batch_time:.1f}x")
+    print(f"   identical results: {loop_scores == batch_scores}")
+    return not mismatches
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
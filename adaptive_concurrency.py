@@ -0,0 +1,296 @@
+import argparse
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import requests
+
+# Politeness ceiling: page requests per second to one domain (and burst size)
+DOMAIN_RATE = float(os.getenv("DOMAIN_RATE", "1.0"))
+DOMAIN_BURST = int(os.getenv("DOMAIN_BURST", "2"))
+
+# Outcomes of one page request
+OK = "ok"
+ERROR = "error"
+TIMEOUT = "timeout"
+THROTTLED = "throttled"
+CHALLENGE = "challenge"
+
+# Outcomes that mean "slow down now" rather than "something broke"
+BACKOFF_OUTCOMES = {TIMEOUT, THROTTLED, CHALLENGE}
+
+# Text found on bot-check / block pages
+CHALLENGE_MARKERS = [
+    "captcha", "are you a robot", "verify you are human", "pardon our interruption",
+    "access denied", "request unsuccessful", "unusual traffic", "_incapsula_resource",
+    "cf-chl", "px-captcha"
+]
+
+
+class PageBlockedError(Exception):
+    """The site answered with a throttle or bot-challenge page"""
+
+    def __init__(self, outcome, url):
+        super().__init__(f"{outcome} page for {url}")
+        self.outcome = outcome
+        self.url = url
+
+
+def classify_status(status, text=""):
+    """Outcome of a response from its status code and (start of the) body"""
+    if status == 429:
+        return THROTTLED
+    lowered = (text or "").lower()
+    if any(marker in lowered for marker in CHALLENGE_MARKERS):
+        return CHALLENGE
+    if status in (403, 503):
+        return THROTTLED
+    if status and status >= 500:
+        return ERROR
+    return OK
+
+
+def classify_page(driver):
+    """Outcome of the page currently loaded in a browser"""
+    info = driver.execute_script("""
+        const navigation = performance.getEntriesByType('navigation')[0];
+        return {
+            status: navigation && navigation.responseStatus ? navigation.responseStatus : 0,
+            text: document.title + ' ' + (document.body ? document.body.innerText.slice(0, 2000) : '')
+        };
+    """)
+    return classify_status(info.get("status"), info.get("text"))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: at most `rate` acquisitions per second on average"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens +
+                                  (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+class DomainRateLimiter:
+    """One token bucket per domain, whatever the number of workers"""
+
+    def __init__(self, rate=DOMAIN_RATE, burst=DOMAIN_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(
+                    self.rate, self.burst)
+        bucket.acquire()
+
+
+class AdaptiveConcurrencyController:
+    """AIMD limit on concurrent page loads
+
+    Every `window` page loads, the limit goes up by one if the p95 latency
+    and error rate are healthy, and is halved otherwise. Timeouts, 429s
+    and bot challenges halve it immediately (at most once per cooldown).
+    """
+
+    def __init__(self, initial=2, min_limit=1, max_limit=8, window=10, p95_target=20.0,
+                 max_error_rate=0.2, decrease_factor=0.5, cooldown=30.0, decision_log=None):
+        self.limit = max(min_limit, min(initial, max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.window = window
+        self.p95_target = p95_target
+        self.max_error_rate = max_error_rate
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.decision_log = decision_log
+        self.in_flight = 0
+        self.samples = []
+        self.last_decrease = 0.0
+        self.decisions = []
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the `limit` concurrency slots"""
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    def record(self, latency, outcome=OK):
+        """Feed the result of one page load"""
+        with self.condition:
+            self.samples.append((latency, outcome))
+            if outcome in BACKOFF_OUTCOMES:
+                self._decrease(f"{outcome} after {latency:.1f}s")
+            elif len(self.samples) >= self.window:
+                self._evaluate()
+
+    def _evaluate(self):
+        latencies = sorted(latency for latency, _ in self.samples)
+        p95 = latencies[max(0, math.ceil(0.95 * len(latencies)) - 1)]
+        error_rate = sum(
+            1 for _, outcome in self.samples if outcome != OK) / len(self.samples)
+        stats = f"p95 {p95:.1f}s, errors {error_rate:.0%}"
+
+        if p95 > self.p95_target or error_rate > self.max_error_rate:
+            self._decrease(stats)
+        elif self.limit < self.max_limit:
+            self._set_limit(self.limit + 1, "increase", stats)
+        self.samples = []
+
+    def _decrease(self, reason):
+        now = time.time()
+        # One cut per burst of bad news; the samples behind it are stale
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.samples = []
+        new_limit = max(self.min_limit, int(
+            self.limit * self.decrease_factor))
+        if new_limit != self.limit:
+            self._set_limit(new_limit, "decrease", reason)
+
+    def _set_limit(self, new_limit, action, reason):
+        decision = {"time": time.strftime('%Y-%m-%d %H:%M:%S'), "action": action,
+                    "from": self.limit, "to": new_limit, "reason": reason}
+        self.decisions.append(decision)
+        if self.decision_log:
+            self.decision_log.append(decision)
+        print(
+            f"🎛️ Concurrency {self.limit} -> {new_limit} ({action}: {reason})")
+        self.limit = new_limit
+        self.condition.notify_all()
+
+
+def run_stub_server(capacity=4, base_latency=0.2, error_rate=0.0, challenge_rate=0.0):
+    """Local server whose latency grows past `capacity` concurrent requests
+
+    Above twice the capacity it answers 429; it also injects random 500s
+    and challenge pages. Returns the server (stop it with shutdown()).
+    """
+    state = {"in_flight": 0}
+    lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                state["in_flight"] += 1
+                load = state["in_flight"]
+            try:
+                if load > capacity * 2:
+                    status, body = 429, "Too Many Requests"
+                elif random.random() < error_rate:
+                    status, body = 500, "Internal Server Error"
+                elif random.random() < challenge_rate:
+                    status, body = 200, "<title>Pardon Our Interruption</title>"
+                else:
+                    time.sleep(base_latency * max(1.0, load / capacity))
+                    status, body = 200, "<title>Product</title>"
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            finally:
+                with lock:
+                    state["in_flight"] -= 1
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def simulate(total_requests=300, capacity=4, base_latency=0.2, error_rate=0.0,
+             challenge_rate=0.0, max_limit=16, domain_rate=100.0):
+    """Drive the controller against the stub server and report where it settles"""
+    server = run_stub_server(capacity, base_latency, error_rate, challenge_rate)
+    url = f"http://127.0.0.1:{server.server_address[1]}/product"
+    controller = AdaptiveConcurrencyController(
+        initial=1, max_limit=max_limit, window=10, p95_target=base_latency * 2, cooldown=1.0)
+    limiter = DomainRateLimiter(rate=domain_rate, burst=max_limit)
+    local = threading.local()
+
+    def _request(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        with controller.slot():
+            limiter.wait(url)
+            start_time = time.time()
+            try:
+                response = session.get(url, timeout=base_latency * 10)
+                outcome = classify_status(response.status_code, response.text)
+            except requests.Timeout:
+                outcome = TIMEOUT
+            except requests.RequestException:
+                outcome = ERROR
+            controller.record(time.time() - start_time, outcome)
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=max_limit) as executor:
+        list(executor.map(_request, range(total_requests)))
+    elapsed = time.time() - start_time
+    server.shutdown()
+
+    print(f"\n📊 {total_requests} requests in {elapsed:.1f}s "
+          f"({total_requests / elapsed:.1f}/s), final limit {controller.limit} (stub capacity {capacity})")
+    return controller
+
+
+def main():
+    """Run the controller against a local stub that injects latency and errors"""
+    parser = argparse.ArgumentParser(
+        description="Simulate the adaptive concurrency controller against a local stub server")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--capacity", type=int, default=4,
+                        help="concurrent requests the stub serves at base latency")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--challenge-rate", type=float, default=0.0)
+    parser.add_argument("--max-limit", type=int, default=16)
+    args = parser.parse_args()
+
+    simulate(args.requests, args.capacity, args.latency, args.error_rate,
+             args.challenge_rate, args.max_limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from clean_products import extract_product_id, review_age_text
+from http_fetch import get_http_session
+
+# Canadian Tire renders reviews with Bazaarvoice; the same data is served as
+# JSON by the Conversations API. The passkey is the public display key the
+# product page uses (visible in its bv.js requests).
+BV_API_URL = os.getenv(
+    "BV_API_URL", "https://api.bazaarvoice.com/data/reviews.json")
+BV_PASSKEY = os.getenv("BV_PASSKEY")
+BV_API_VERSION = "5.4"
+
+# The API caps Limit at 100 reviews per request
+MAX_PAGE_SIZE = 100
+
+
+class IncompleteReviewsError(Exception):
+    """Some review pages of a product could not be fetched"""
+
+    def __init__(self, product_id, failed_pages, total_pages):
+        super().__init__(
+            f"{failed_pages} of {total_pages} review pages failed for {product_id}")
+        self.failed_pages = failed_pages
+
+
+def is_configured():
+    """The API source needs a passkey"""
+    return bool(BV_PASSKEY)
+
+
+def product_id_for_url(product_url):
+    """Bazaarvoice product id for a product page (e.g. 0710110p -> 0710110P)"""
+    product_id = extract_product_id(product_url)
+    return product_id.upper() if product_id else None
+
+
+def fetch_review_page(product_id, offset=0, limit=MAX_PAGE_SIZE, api_url=None, passkey=None, timeout=15):
+    """Fetch one page of reviews (newest first) plus the product statistics"""
+    params = {
+        "apiversion": BV_API_VERSION,
+        "passkey": passkey or BV_PASSKEY,
+        "Filter": f"ProductId:{product_id}",
+        "Sort": "SubmissionTime:desc",
+        "Limit": min(limit, MAX_PAGE_SIZE),
+        "Offset": offset,
+        "Include": "Products",
+        "Stats": "Reviews"
+    }
+    response = get_http_session().get(
+        api_url or BV_API_URL, params=params, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+
+    if data.get("HasErrors"):
+        raise ValueError(f"Bazaarvoice API error: {data.get('Errors')}")
+
+    return data
+
+
+def format_bv_review(raw_review, product_url):
+    """Convert an API review to the format produced by extract_individual_reviews"""
+    badges = raw_review.get("BadgesOrder") or []
+    return {
+        "review_id": f"bv-review-{raw_review.get('Id')}",
+        "product_url": product_url,
+        "rating": raw_review.get("Rating"),
+        "title": raw_review.get("Title"),
+        "body": raw_review.get("ReviewText") or '',
+        "date": review_age_text(raw_review.get("SubmissionTime")),
+        "reviewer": raw_review.get("UserNickname") or '',
+        "verified_purchaser": "verifiedPurchaser" in badges,
+        "helpful_count": raw_review.get("TotalPositiveFeedbackCount") or 0
+    }
+
+
+def extract_rating_summary(page, product_id):
+    """Build the same rating summary that click_on_review_count returns"""
+    summary = {
+        'average_rating': None,
+        'total_reviews': page.get("TotalResults"),
+        'has_reviews': False
+    }
+
+    products = (page.get("Includes") or {}).get("Products") or {}
+    stats = (products.get(product_id) or {}).get("ReviewStatistics") or {}
+    if stats.get("AverageOverallRating") is not None:
+        summary['average_rating'] = round(stats["AverageOverallRating"], 1)
+    if stats.get("TotalReviewCount") is not None:
+        summary['total_reviews'] = stats["TotalReviewCount"]
+
+    summary['has_reviews'] = bool(
+        summary['total_reviews'] or summary['average_rating'])
+    return summary
+
+
+def fetch_page_range(product_id, product_url, offsets, page_size=MAX_PAGE_SIZE, max_workers=4, api_url=None):
+    """Fetch a list of page offsets concurrently
+
+    Returns (reviews in page order, number of pages that failed).
+    """
+    def _fetch(offset):
+        try:
+            page = fetch_review_page(
+                product_id, offset, page_size, api_url=api_url)
+            return [format_bv_review(r, product_url) for r in page.get("Results", [])]
+        except (requests.RequestException, ValueError) as e:
+            print(f"⚠️ Bazaarvoice page at offset {offset} failed: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = list(executor.map(_fetch, offsets))
+
+    failed_pages = sum(1 for page in pages if page is None)
+    reviews = [review for page in pages if page for review in page]
+    return reviews, failed_pages
+
+
+def fetch_all_reviews(product_url, product_id=None, page_size=MAX_PAGE_SIZE, max_workers=4, api_url=None):
+    """Fetch every review of a product without a browser
+
+    Returns (reviews, product_rating_summary) like extract_reviews_from_product.
+    Raises instead of returning a partial list, like fetch_new_reviews, so the
+    caller can mark the product failed: the request error when the first page
+    fails, IncompleteReviewsError when any later page does.
+    """
+    product_id = product_id or product_id_for_url(product_url)
+    if not product_id:
+        raise ValueError(
+            f"Could not derive a Bazaarvoice product id from {product_url}")
+
+    try:
+        first_page = fetch_review_page(
+            product_id, 0, page_size, api_url=api_url)
+    except (requests.RequestException, ValueError) as e:
+        print(f"❌ Bazaarvoice request failed for {product_id}: {e}")
+        raise
+
+    summary = extract_rating_summary(first_page, product_id)
+    reviews = [format_bv_review(r, product_url)
+               for r in first_page.get("Results", [])]
+
+    # Remaining pages are independent, so fetch them concurrently
+    total_results = first_page.get("TotalResults") or 0
+    offsets = list(range(page_size, total_results, page_size))
+    if offsets:
+        more_reviews, failed_pages = fetch_page_range(product_id, product_url, offsets,
+                                                      page_size=page_size, max_workers=max_workers,
+                                                      api_url=api_url)
+        if failed_pages:
+            raise IncompleteReviewsError(
+                product_id, failed_pages, len(offsets) + 1)
+        reviews.extend(more_reviews)
+
+    print(
+        f"✅ Bazaarvoice API: {len(reviews)}/{total_results} reviews for {product_id}")
+    return reviews, summary
+
+
+def fetch_new_reviews(product_url, stop_at_review_id, product_id=None, page_size=MAX_PAGE_SIZE, api_url=None):
+    """Fetch reviews newer than stop_at_review_id (pages are newest first)
+
+    Pages are read one after the other and reading stops at the first
+    known review. Returns (new reviews, product_rating_summary).
+    """
+    product_id = product_id or product_id_for_url(product_url)
+    if not product_id:
+        raise ValueError(
+            f"Could not derive a Bazaarvoice product id from {product_url}")
+
+    new_reviews = []
+    offset = 0
+    while True:
+        try:
+            page = fetch_review_page(
+                product_id, offset, page_size, api_url=api_url)
+        except (requests.RequestException, ValueError) as e:
+            print(f"❌ Bazaarvoice request failed for {product_id}: {e}")
+            raise
+
+        if offset == 0:
+            summary = extract_rating_summary(page, product_id)
+
+        results = page.get("Results", [])
+        for raw_review in results:
+            review = format_bv_review(raw_review, product_url)
+            if review["review_id"] == stop_at_review_id:
+                summary["reached_known_review"] = True
+                print(
+                    f"✅ Bazaarvoice API: {len(new_reviews)} new reviews for {product_id}")
+                return new_reviews, summary
+            new_reviews.append(review)
+
+        offset += page_size
+        if not results or offset >= (page.get("TotalResults") or 0):
+            break
+
+    print(
+        f"⚠️ Bazaarvoice API: last known review not found for {product_id}, read {len(new_reviews)} reviews")
+    return new_reviews, summary
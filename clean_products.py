@@ -28,6 +28,46 @@ def extract_product_id(product_url):
     return None
 
 
+def review_age_text(submission_time, now=None):
+    """
+    Review date as the review widget renders it ("2 days ago", "a month ago"),
+    from the API's ISO SubmissionTime; unparseable values are kept as is
+    """
+    if not submission_time:
+        return ''
+    try:
+        submitted = datetime.fromisoformat(submission_time.strip())
+    except ValueError:
+        return submission_time
+    if now is None:
+        now = datetime.now(submitted.tzinfo)
+    seconds = max(0, (now - submitted).total_seconds())
+
+    # Same thresholds as the widget's relative time (moment.js fromNow)
+    minutes, hours, days = seconds / 60, seconds / 3600, seconds / 86400
+    if seconds < 45:
+        return 'a few seconds ago'
+    if seconds < 90:
+        return 'a minute ago'
+    if minutes < 45:
+        return f'{round(minutes)} minutes ago'
+    if minutes < 90:
+        return 'an hour ago'
+    if hours < 22:
+        return f'{round(hours)} hours ago'
+    if hours < 36:
+        return 'a day ago'
+    if days < 26:
+        return f'{round(days)} days ago'
+    if days < 46:
+        return 'a month ago'
+    if days < 320:
+        return f'{round(days / 30.4)} months ago'
+    if days < 548:
+        return 'a year ago'
+    return f'{round(days / 365)} years ago'
+
+
 def extract_brand_from_title(title):
     """
     Extrae la marca del título del producto
@@ -157,6 +197,51 @@ def extract_rating_info_for_product(product_url, ratings_data):
     return rating_info
 
 
+def clean_product(product, ratings_data=None):
+    """
+    Clean a single scraped product; returns None if no product_id can be extracted
+    """
+    product_id = extract_product_id(product.get('product_url', ''))
+    if not product_id:
+        return None
+
+    # Extraer información de descuento
+    discount_info = extract_discount_info(product.get('price', ''))
+
+    # Extract rating information
+    rating_info = extract_rating_info_for_product(
+        product.get('product_url', ''), ratings_data or {})
+
+    now = datetime.now().isoformat()
+    return {
+        "product_id": product_id,
+        "title": product.get('title', '').strip(),
+        "brand": extract_brand_from_title(product.get('title', '')),
+        "category": extract_category_from_title(product.get('title', '')),
+        "product_url": product.get('product_url', ''),
+        "price": clean_price(product.get('price', '')),
+        "raw_price": product.get('price', ''),
+        "discount": discount_info if discount_info['has_discount'] else None,
+        "average_rating": rating_info['average_rating'],
+        "total_reviews": rating_info['total_reviews'],
+        "description": (product.get('description') or '').strip(),
+        "sku": (product.get('sku') or '').strip(),
+        "search_url": product.get('search_url', ''),
+        "search_urls": product.get('search_urls') or [product.get('search_url', '')],
+        "detailed_title": (product.get('detailed_title') or '').strip(),
+        "detailed_price": product.get('detailed_price', ''),
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+def clean_review(review):
+    """
+    Attach the product_id of the review's product (reviews only carry the URL)
+    """
+    return {**review, "product_id": extract_product_id(review.get('product_url', ''))}
+
+
 def clean_products_json():
     """
     Función principal para limpiar el JSON de productos
@@ -189,43 +274,15 @@ def clean_products_json():
 
     for i, product in enumerate(products):
         try:
-            # Extraer product_id de la URL
-            product_id = extract_product_id(product.get('product_url', ''))
+            # Crear producto limpio
+            cleaned_product = clean_product(product, ratings_data)
 
-            if not product_id:
+            if not cleaned_product:
                 print(
                     f"⚠️  Product {i+1}: Could not extract product_id from URL: {product.get('product_url', '')}")
                 error_count += 1
                 continue
 
-            # Extraer información de descuento
-            discount_info = extract_discount_info(product.get('price', ''))
-
-            # Extract rating information
-            rating_info = extract_rating_info_for_product(
-                product.get('product_url', ''), ratings_data)
-
-            # Crear producto limpio
-            cleaned_product = {
-                "product_id": product_id,
-                "title": product.get('title', '').strip(),
-                "brand": extract_brand_from_title(product.get('title', '')),
-                "category": extract_category_from_title(product.get('title', '')),
-                "product_url": product.get('product_url', ''),
-                "price": clean_price(product.get('price', '')),
-                "raw_price": product.get('price', ''),
-                "discount": discount_info if discount_info['has_discount'] else None,
-                "average_rating": rating_info['average_rating'],
-                "total_reviews": rating_info['total_reviews'],
-                "description": product.get('description', '').strip(),
-                "sku": product.get('sku', '').strip(),
-                "search_url": product.get('search_url', ''),
-                "detailed_title": product.get('detailed_title', '').strip(),
-                "detailed_price": product.get('detailed_price', ''),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }
-
             cleaned_products.append(cleaned_product)
             success_count += 1
 
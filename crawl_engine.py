@@ -0,0 +1,274 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+import bazaarvoice_api
+from driver_pool import DriverPool
+from driver_resolver import resolve_chromedriver_path
+from jsonl_sink import JsonlSink, compact_jsonl, seed_jsonl_from_legacy
+from lean_profile import apply_lean_options, enable_lean_browsing
+from mongo_sink import open_mongo_sink
+from http_fetch import fetch_product_details_http, has_required_fields
+from review_scraper import extract_reviews_from_product, REVIEWS_JSONL, REVIEWS_FILE, RATINGS_FILE
+from simple_scraper import search_urls, harvest_query, product_key, extract_product_details_selenium
+from waits import step_timer
+
+# Global limit on in-flight requests (HTTP and browser together)
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "8"))
+# Number of Chrome instances used for the steps that need JavaScript
+BROWSER_WORKERS = int(os.getenv("BROWSER_WORKERS", "2"))
+# Minimum seconds between two requests to the same host
+PER_HOST_DELAY = float(os.getenv("PER_HOST_DELAY", "0.5"))
+
+# Pooled drivers move between threads, so profiles are numbered, not per thread
+_profile_ids = itertools.count()
+
+
+def setup_driver():
+    """Headless Chrome for the crawl engine's browser executor"""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    apply_lean_options(options)
+    options.add_argument(
+        f"--user-data-dir=/tmp/chrome_profile_{os.getpid()}_{next(_profile_ids)}")
+
+    service = Service(resolve_chromedriver_path())
+    driver = webdriver.Chrome(service=service, options=options)
+    # Product and review steps switch the profile with use_stage()
+    enable_lean_browsing(driver, "product")
+    driver.implicitly_wait(5)
+    return driver
+
+
+class CrawlEngine:
+    """Pipelined asyncio crawl: search listing -> product details -> reviews
+
+    Each stage has its own workers connected by queues, so reviews for one
+    product are fetched while other listings and product pages are parsed.
+    HTTP work runs in the default thread pool (requests is blocking) and
+    browser work runs in a bounded executor backed by a DriverPool.
+    """
+
+    def __init__(self, concurrency=CRAWL_CONCURRENCY, browser_workers=BROWSER_WORKERS,
+                 per_host_delay=PER_HOST_DELAY, product_workers=4, review_workers=4):
+        self.concurrency = concurrency
+        self.browser_workers = browser_workers
+        self.per_host_delay = per_host_delay
+        self.product_workers = product_workers
+        self.review_workers = review_workers
+
+        self.driver_pool = DriverPool(
+            setup_driver, max_drivers=browser_workers)
+        self.browser_executor = ThreadPoolExecutor(
+            max_workers=browser_workers, thread_name_prefix="browser")
+
+        self.products = []
+        # Queries that listed each product (shared with the saved product record)
+        self.search_urls_by_key = {}
+        self.duplicate_count = 0
+        self.review_count = 0
+        self.error_count = 0
+        # Reviews go to the shared checkpoint; the JSON files are compacted from it
+        seed_jsonl_from_legacy(REVIEWS_JSONL, REVIEWS_FILE, RATINGS_FILE)
+        self.sink = JsonlSink(REVIEWS_JSONL)
+        # Upserts each cleaned record into MongoDB as it is produced (MONGO_SINK=1)
+        self.mongo_sink = open_mongo_sink()
+
+    async def wait_for_host(self, url):
+        """Per-host politeness: space requests to one host by per_host_delay"""
+        loop = asyncio.get_running_loop()
+        host = urlparse(url).netloc
+        lock = self.host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self.last_request.get(
+                host, 0) + self.per_host_delay - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.last_request[host] = loop.time()
+
+    async def run_http(self, url, func, *args):
+        """Run a blocking HTTP call under the global limit"""
+        async with self.semaphore:
+            await self.wait_for_host(url)
+            return await asyncio.to_thread(func, *args)
+
+    async def run_browser(self, url, func, *args):
+        """Run func(driver, *args) on a pooled browser under the global limit"""
+        def _call():
+            with self.driver_pool.driver() as driver:
+                return func(driver, *args)
+
+        # Queue for a browser first so waiting tasks don't hold global slots
+        async with self.browser_semaphore:
+            async with self.semaphore:
+                await self.wait_for_host(url)
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.browser_executor, _call)
+
+    async def search_stage(self, urls):
+        """Stage 1: listing pages (need JavaScript, so they go to the browser)"""
+        async def _search(search_url):
+            try:
+                # Every result page of the query, in one browser slot
+                with step_timer.step("engine_search"):
+                    products, _ = await self.run_browser(search_url, harvest_query, search_url)
+            except Exception as e:
+                print(f"❌ Search failed for {search_url}: {e}")
+                self.error_count += 1
+                return
+
+            print(f"🔎 {len(products)} products from {search_url}")
+            for product in products:
+                # Product pages already scheduled by another query are only annotated
+                key = product_key(product)
+                if key in self.search_urls_by_key:
+                    if search_url not in self.search_urls_by_key[key]:
+                        self.search_urls_by_key[key].append(search_url)
+                    self.duplicate_count += 1
+                    continue
+                product["search_urls"] = self.search_urls_by_key[key] = [
+                    search_url]
+                await self.product_queue.put(product)
+
+        await asyncio.gather(*(_search(url) for url in urls))
+
+    async def product_worker(self):
+        """Stage 2: product details over HTTP, browser only when fields are missing"""
+        while True:
+            product = await self.product_queue.get()
+            try:
+                product_url = product["product_url"]
+                with step_timer.step("engine_product"):
+                    details = await self.run_http(product_url, fetch_product_details_http, product_url)
+                    if not has_required_fields(details):
+                        browser_details = await self.run_browser(
+                            product_url, extract_product_details_selenium, product_url)
+                        details = {**details, **
+                                   {k: v for k, v in browser_details.items() if v}}
+
+                complete_product = {**product, **details}
+                self.products.append(complete_product)
+                if self.mongo_sink:
+                    self.mongo_sink.add_product(complete_product)
+                await self.review_queue.put(complete_product)
+            except Exception as e:
+                print(f"❌ Product stage failed for {product.get('product_url')}: {e}")
+                self.error_count += 1
+            finally:
+                self.product_queue.task_done()
+
+    async def review_worker(self):
+        """Stage 3: reviews from the Bazaarvoice API, or the browser without a passkey"""
+        while True:
+            product = await self.review_queue.get()
+            try:
+                product_url = product["product_url"]
+                with step_timer.step("engine_reviews"):
+                    if bazaarvoice_api.is_configured():
+                        # One request at a time inside the slot, so the global limit holds
+                        reviews, rating_summary = await self.run_http(
+                            bazaarvoice_api.BV_API_URL,
+                            partial(bazaarvoice_api.fetch_all_reviews, max_workers=1), product_url)
+                    else:
+                        reviews, rating_summary = await self.run_browser(
+                            product_url, extract_reviews_from_product, product_url)
+
+                product_rating = None
+                if rating_summary.get('has_reviews'):
+                    product_rating = {
+                        'product_title': product.get('title'),
+                        'product_url': product_url,
+                        'average_rating': rating_summary.get('average_rating'),
+                        'total_reviews': rating_summary.get('total_reviews'),
+                        'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
+                    }
+                self.sink.append({
+                    "product_url": product_url,
+                    "product_title": product.get('title'),
+                    "reviews": reviews,
+                    "rating": product_rating
+                })
+                self.review_count += len(reviews)
+                if self.mongo_sink:
+                    self.mongo_sink.add_reviews(reviews)
+                    if product_rating:
+                        self.mongo_sink.add_rating(product_url, product_rating)
+                print(
+                    f"✅ {len(reviews)} reviews for {product.get('title', product_url)[:50]}")
+            except Exception as e:
+                print(f"❌ Review stage failed for {product.get('product_url')}: {e}")
+                self.error_count += 1
+            finally:
+                self.review_queue.task_done()
+
+    async def crawl(self, urls):
+        """Run all three stages concurrently until every queue drains"""
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.browser_semaphore = asyncio.Semaphore(self.browser_workers)
+        self.host_locks = {}
+        self.last_request = {}
+        self.product_queue = asyncio.Queue()
+        self.review_queue = asyncio.Queue()
+
+        workers = [asyncio.create_task(self.product_worker())
+                   for _ in range(self.product_workers)]
+        workers += [asyncio.create_task(self.review_worker())
+                    for _ in range(self.review_workers)]
+
+        try:
+            await self.search_stage(urls)
+            await self.product_queue.join()
+            await self.review_queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def run(self, urls):
+        """Blocking entry point"""
+        try:
+            asyncio.run(self.crawl(urls))
+        finally:
+            self.browser_executor.shutdown(wait=True)
+            self.driver_pool.close_all()
+            if self.mongo_sink:
+                self.mongo_sink.close()
+            # Merged with what earlier runs stored for other products
+            self.sink.close()
+            compact_jsonl(REVIEWS_JSONL, REVIEWS_FILE, RATINGS_FILE)
+
+
+def main():
+    """Crawl every search URL end to end with the async engine"""
+    print(f"🚀 ASYNC CRAWL ENGINE")
+    print(
+        f"⚙️ Concurrency: {CRAWL_CONCURRENCY}, browsers: {BROWSER_WORKERS}, per-host delay: {PER_HOST_DELAY}s")
+
+    engine = CrawlEngine()
+    start_time = time.time()
+    engine.run(search_urls)
+    elapsed_time = time.time() - start_time
+
+    with open("productos_scraped.json", "w", encoding="utf-8") as f:
+        json.dump(engine.products, f, ensure_ascii=False, indent=2)
+
+    print(f"\n🎉 Crawl completed in {elapsed_time:.2f} seconds")
+    print(f"📦 Products: {len(engine.products)}")
+    print(f"🧬 Duplicate listings skipped: {engine.duplicate_count}")
+    print(f"📝 Reviews: {engine.review_count} (saved to {REVIEWS_FILE})")
+    print(f"❌ Errors: {engine.error_count}")
+    step_timer.report()
+
+
+if __name__ == "__main__":
+    main()
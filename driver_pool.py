@@ -0,0 +1,142 @@
+import threading
+from contextlib import contextmanager
+from selenium.common.exceptions import WebDriverException
+
+
+class DriverPool:
+    """Bounded pool of warm Chrome drivers, checked out per product
+
+    acquire() hands out an idle driver (starting a new one while fewer than
+    max_drivers are alive, otherwise waiting for one to be returned) and
+    release() gives it back. The pool owns every driver, so a worker thread
+    that exits never keeps a browser or a slot, and close_all() quits them all.
+    """
+
+    def __init__(self, driver_factory, max_drivers=3, max_pages_per_driver=50):
+        self.driver_factory = driver_factory
+        self.max_drivers = max_drivers
+        self.max_pages_per_driver = max_pages_per_driver
+        self.condition = threading.Condition()
+        # Every live driver (idle or checked out), keyed by id(driver)
+        self.entries = {}
+        self.idle = []
+        # Drivers being started right now (they count against max_drivers)
+        self.starting = 0
+        self.created_count = 0
+        self.recycled_count = 0
+
+    def acquire(self):
+        """Check out a warm driver, starting one if none is idle and there is room"""
+        with self.condition:
+            while not self.idle and len(self.entries) + self.starting >= self.max_drivers:
+                self.condition.wait()
+            if self.idle:
+                return self.idle.pop()["driver"]
+            self.starting += 1
+
+        try:
+            driver = self.driver_factory()
+        except Exception:
+            with self.condition:
+                self.starting -= 1
+                self.condition.notify()
+            raise
+
+        with self.condition:
+            self.starting -= 1
+            self.entries[id(driver)] = {"driver": driver, "pages": 0}
+            self.created_count += 1
+        return driver
+
+    def release(self, driver, healthy=True):
+        """Return a driver after a product; crashed or worn-out drivers are thrown away"""
+        with self.condition:
+            entry = self.entries.get(id(driver))
+        if entry is None or entry["driver"] is not driver:
+            return
+
+        entry["pages"] += 1
+
+        if entry["pages"] >= self.max_pages_per_driver:
+            print(
+                f"♻️ [Thread {threading.current_thread().ident}] Recycling driver after {entry['pages']} pages")
+            self._discard(entry)
+        elif not healthy or not self.reset_driver_state(driver):
+            print(
+                f"♻️ [Thread {threading.current_thread().ident}] Discarding unhealthy driver")
+            self._discard(entry)
+        else:
+            with self.condition:
+                # The pool may have been shrunk while this driver was out
+                surplus = len(self.entries) > self.max_drivers
+                if not surplus:
+                    self.idle.append(entry)
+                    self.condition.notify()
+            if surplus:
+                self._discard(entry)
+
+    @contextmanager
+    def driver(self):
+        """Context manager that acquires a driver and releases it afterwards"""
+        driver = self.acquire()
+        healthy = True
+        try:
+            yield driver
+        except WebDriverException:
+            healthy = False
+            raise
+        finally:
+            self.release(driver, healthy=healthy)
+
+    def resize(self, max_drivers):
+        """Change how many browsers may be alive; idle surplus drivers are quit now"""
+        with self.condition:
+            self.max_drivers = max(1, max_drivers)
+            surplus = []
+            while self.idle and len(self.entries) - len(surplus) > self.max_drivers:
+                surplus.append(self.idle.pop(0))
+            self.condition.notify_all()
+        for entry in surplus:
+            self._discard(entry)
+
+    @staticmethod
+    def reset_driver_state(driver):
+        """Clear cookies and web storage so the next product starts clean"""
+        try:
+            driver.delete_all_cookies()
+            driver.execute_script(
+                "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}")
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            print(f"⚠️ Error resetting driver state: {e}")
+            return False
+
+    def _discard(self, entry):
+        """Quit a driver and free its slot"""
+        try:
+            entry["driver"].quit()
+        except Exception:
+            pass
+
+        with self.condition:
+            if self.entries.pop(id(entry["driver"]), None) is not None:
+                self.recycled_count += 1
+            self.condition.notify()
+
+    def close_all(self):
+        """Quit every driver still alive in the pool, idle or checked out"""
+        with self.condition:
+            entries = list(self.entries.values())
+            self.entries.clear()
+            self.idle.clear()
+            self.condition.notify_all()
+
+        for entry in entries:
+            try:
+                entry["driver"].quit()
+            except Exception:
+                pass
+
+        print(
+            f"🧹 Driver pool closed ({self.created_count} drivers started, {self.recycled_count} recycled)")
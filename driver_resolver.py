@@ -0,0 +1,111 @@
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.core.os_manager import OperationSystemManager, ChromeType
+
+# On-disk cache shared by every process of a run (and by later runs)
+CACHE_FILE = os.path.join(os.path.expanduser(
+    "~"), ".cache", "web_scraper", "chromedriver.json")
+
+_resolved_path = None
+_resolve_lock = threading.Lock()
+
+
+def is_offline_mode():
+    """Offline mode never lets webdriver-manager touch the network"""
+    return os.getenv("CHROMEDRIVER_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+def get_local_chrome_version():
+    """Read the installed Chrome version from the OS (no network access)"""
+    try:
+        return OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+    except Exception:
+        return None
+
+
+def load_cached_driver(cache_file=CACHE_FILE):
+    """Load the cached driver entry if it exists and the binary is still there"""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if not entry.get("path") or not os.path.exists(entry["path"]):
+        return None
+
+    return entry
+
+
+def save_cached_driver(path, chrome_version, cache_file=CACHE_FILE):
+    """Persist the resolved driver path with the Chrome version it was resolved for"""
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_file = cache_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({
+                "path": path,
+                "chrome_version": chrome_version,
+                "resolved_at": datetime.now().isoformat()
+            }, f, indent=2)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        print(f"⚠️ Could not cache chromedriver path: {e}")
+
+
+def resolve_chromedriver_path(offline=None, cache_file=CACHE_FILE):
+    """Resolve the chromedriver binary once per process and reuse it everywhere
+
+    Resolution order:
+    1. Path already resolved in this process
+    2. CHROMEDRIVER_PATH environment variable (set for child processes too)
+    3. On-disk cache whose version stamp matches the installed Chrome
+    4. ChromeDriverManager().install() (skipped in offline mode)
+    """
+    global _resolved_path
+
+    if _resolved_path:
+        return _resolved_path
+
+    with _resolve_lock:
+        if _resolved_path:
+            return _resolved_path
+
+        if offline is None:
+            offline = is_offline_mode()
+
+        path = os.getenv("CHROMEDRIVER_PATH")
+        if path and os.path.exists(path):
+            print(f"🚗 Using chromedriver from CHROMEDRIVER_PATH: {path}")
+        else:
+            path = None
+            chrome_version = get_local_chrome_version()
+            cached = load_cached_driver(cache_file)
+
+            if cached and (offline or chrome_version is None or cached.get("chrome_version") == chrome_version):
+                path = cached["path"]
+                print(
+                    f"🚗 Using cached chromedriver: {path} (Chrome {cached.get('chrome_version')})")
+            elif offline:
+                # Air-gapped workers: fall back to whatever is on PATH
+                path = shutil.which("chromedriver")
+                if not path:
+                    raise RuntimeError(
+                        "Offline mode: no cached chromedriver and none found on PATH. "
+                        "Set CHROMEDRIVER_PATH or run once online to populate the cache.")
+                print(f"🚗 Offline mode, using chromedriver from PATH: {path}")
+                save_cached_driver(path, chrome_version, cache_file)
+            else:
+                print("📥 Resolving chromedriver with webdriver-manager...")
+                path = ChromeDriverManager().install()
+                save_cached_driver(path, chrome_version, cache_file)
+                print(f"✅ Chromedriver resolved: {path}")
+
+        # Hand the path to worker processes spawned later in this run
+        os.environ["CHROMEDRIVER_PATH"] = path
+        _resolved_path = path
+        return path
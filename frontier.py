@@ -0,0 +1,237 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+# Terminal failure: never claimed again
+DEAD = "dead"
+
+
+def is_process_alive(pid):
+    """True if a process with this pid is running on this machine"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CrawlFrontier:
+    """Persistent per-URL crawl state in a local SQLite file
+
+    Every URL is pending, in_flight (leased to a worker), done, failed or
+    dead. Leases expire, so URLs held by a worker that crashed go back into
+    circulation; failed URLs are retried until max_attempts is reached and
+    dead ones are never retried.
+    """
+
+    def __init__(self, path="crawl_frontier.db", lease_seconds=600, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.local = threading.local()
+        self._create_schema()
+
+    def _connection(self):
+        """One connection per thread (sqlite3 connections are not shareable)"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                worker TEXT,
+                lease_expires REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_frontier_state ON frontier (state, lease_expires);
+            CREATE TABLE IF NOT EXISTS product_snapshot (
+                url TEXT PRIMARY KEY,
+                total_reviews INTEGER,
+                average_rating REAL,
+                newest_review_id TEXT,
+                newest_review_date TEXT,
+                checked_at REAL NOT NULL
+            );
+        """)
+
+    def add_urls(self, urls):
+        """Register URLs as pending; URLs already known keep their state"""
+        now = time.time()
+        conn = self._connection()
+        before = conn.total_changes
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT OR IGNORE INTO frontier (url, state, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            ((url, PENDING, now, now) for url in urls))
+        conn.execute("COMMIT")
+        return conn.total_changes - before
+
+    def _claimable_clause(self):
+        return ("(state = 'pending'"
+                " OR (state = 'in_flight' AND lease_expires < :now)"
+                " OR (state = 'failed' AND attempts < :max_attempts))")
+
+    def claim_url(self, url, worker_id=None):
+        """Lease one specific URL; False if it is done, leased or out of attempts"""
+        now = time.time()
+        cursor = self._connection().execute(
+            f"""UPDATE frontier
+                SET state = 'in_flight', attempts = attempts + 1, worker = :worker,
+                    lease_expires = :lease, updated_at = :now
+                WHERE url = :url AND {self._claimable_clause()}""",
+            {"worker": worker_id, "lease": now + self.lease_seconds, "now": now,
+             "url": url, "max_attempts": self.max_attempts})
+        return cursor.rowcount == 1
+
+    def release_dead_leases(self):
+        """Put URLs leased by workers that are no longer running back to pending
+
+        Worker ids start with (or end in) the pid of the process that claimed
+        the URL. Called at startup, so a restart right after a crash does not
+        skip the products the old run had in flight until their lease expires.
+        """
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT url, worker FROM frontier WHERE state = 'in_flight'").fetchall()
+        dead = []
+        for url, worker in rows:
+            pid_match = re.search(r"\d+", worker or "")
+            pid = int(pid_match.group()) if pid_match else None
+            if pid is None or pid == os.getpid() or not is_process_alive(pid):
+                dead.append(url)
+        if not dead:
+            return 0
+        conn.execute("BEGIN")
+        conn.executemany(
+            """UPDATE frontier SET state = 'pending', worker = NULL, lease_expires = NULL, updated_at = ?
+               WHERE url = ? AND state = 'in_flight'""",
+            ((time.time(), url) for url in dead))
+        conn.execute("COMMIT")
+        print(f"🔓 Released {len(dead)} products leased by workers that are no longer running")
+        return len(dead)
+
+    def mark_done(self, url):
+        self._set_state(url, DONE)
+
+    def mark_failed(self, url, error=None):
+        self._set_state(url, FAILED, error)
+
+    def mark_dead(self, url, error=None):
+        self._set_state(url, DEAD, error)
+
+    def mark_many_done(self, urls):
+        """Bulk mark URLs as done (used to import progress from older checkpoints)"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN")
+        conn.executemany(
+            """INSERT INTO frontier (url, state, created_at, updated_at) VALUES (?, 'done', ?, ?)
+               ON CONFLICT(url) DO UPDATE SET state = 'done', lease_expires = NULL, updated_at = excluded.updated_at""",
+            ((url, now, now) for url in urls))
+        conn.execute("COMMIT")
+
+    def requeue_done(self, older_than):
+        """Put products finished more than `older_than` seconds ago back to pending"""
+        cursor = self._connection().execute(
+            """UPDATE frontier SET state = 'pending', attempts = 0, last_error = NULL, updated_at = :now
+               WHERE state = 'done' AND updated_at < :cutoff""",
+            {"now": time.time(), "cutoff": time.time() - older_than})
+        return cursor.rowcount
+
+    def _set_state(self, url, state, error=None):
+        self._connection().execute(
+            """UPDATE frontier SET state = ?, last_error = ?, lease_expires = NULL, updated_at = ?
+               WHERE url = ?""",
+            (state, error, time.time(), url))
+
+    def get(self, url):
+        """Full state row of a URL as a dict, or None"""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT url, state, attempts, last_error, worker, lease_expires, created_at, updated_at "
+            "FROM frontier WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        keys = ["url", "state", "attempts", "last_error",
+                "worker", "lease_expires", "created_at", "updated_at"]
+        return dict(zip(keys, row))
+
+    def save_snapshot(self, url, snapshot):
+        """Remember what a product's reviews looked like when it was last scraped"""
+        self.save_snapshots([(url, snapshot)])
+
+    def save_snapshots(self, snapshots):
+        """Bulk save (url, snapshot) pairs; later pairs for the same URL win"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN")
+        conn.executemany(
+            """INSERT OR REPLACE INTO product_snapshot
+               (url, total_reviews, average_rating, newest_review_id, newest_review_date, checked_at)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            ((url, s.get("total_reviews"), s.get("average_rating"), s.get("newest_review_id"),
+              s.get("newest_review_date"), now) for url, s in snapshots))
+        conn.execute("COMMIT")
+
+    def get_snapshot(self, url):
+        """Last saved snapshot of a product as a dict, or None"""
+        row = self._connection().execute(
+            "SELECT total_reviews, average_rating, newest_review_id, newest_review_date, checked_at "
+            "FROM product_snapshot WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        keys = ["total_reviews", "average_rating",
+                "newest_review_id", "newest_review_date", "checked_at"]
+        return dict(zip(keys, row))
+
+    def has_snapshots(self):
+        return self._connection().execute(
+            "SELECT 1 FROM product_snapshot LIMIT 1").fetchone() is not None
+
+    def is_done(self, url):
+        row = self._connection().execute(
+            "SELECT 1 FROM frontier WHERE url = ? AND state = 'done'", (url,)).fetchone()
+        return row is not None
+
+    def stats(self):
+        """Number of URLs in each state"""
+        rows = self._connection().execute(
+            "SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall()
+        stats = {PENDING: 0, IN_FLIGHT: 0, DONE: 0, FAILED: 0, DEAD: 0}
+        stats.update(dict(rows))
+        return stats
+
+    def failed_urls(self):
+        """(url, attempts, last_error) for every failed URL"""
+        return self._connection().execute(
+            "SELECT url, attempts, last_error FROM frontier WHERE state = 'failed' ORDER BY url").fetchall()
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+    def print_stats(self):
+        stats = self.stats()
+        print(
+            f"🗂️ Frontier {os.path.basename(self.path)}: {stats[DONE]} done, {stats[PENDING]} pending, "
+            f"{stats[IN_FLIGHT]} in flight, {stats[FAILED]} failed, {stats[DEAD]} dead")
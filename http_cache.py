@@ -0,0 +1,195 @@
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+# "on": serve fresh entries and revalidate stale ones, "off": no cache,
+# "replay": never touch the network, only serve what is cached
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE", "on")
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+HTTP_CACHE_MAX_MB = float(os.getenv("HTTP_CACHE_MAX_MB", "500"))
+
+# How long a cached page is used without asking the server (seconds)
+PAGE_TTLS = {
+    "search": 6 * 3600,
+    "product": 24 * 3600,
+    "other": 3600
+}
+
+# Key prefix for HTML captured from the browser after JavaScript ran
+RENDERED_PREFIX = "rendered:"
+
+
+def page_type_for_url(url):
+    """search / product / other, used to pick the TTL"""
+    if "search-results" in url:
+        return "search"
+    if "/pdp/" in url or re.search(r"\d+p\.html", url):
+        return "product"
+    return "other"
+
+
+class HttpCache:
+    """On-disk response cache keyed by URL
+
+    Bodies are stored gzip-compressed, one file per URL; an SQLite index
+    keeps validators (ETag / Last-Modified), fetch time and last access
+    for TTL checks and LRU eviction once max_bytes is exceeded.
+    """
+
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024, ttls=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = ttls or PAGE_TTLS
+        self.local = threading.local()
+        self.evict_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._connection().execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                page_type TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def _connection(self):
+        """One connection per thread (sqlite3 connections are not shareable)"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, "index.db"),
+                                   timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Index entry for a key (and mark it as recently used), or None"""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT key, filename, page_type, etag, last_modified, size, fetched_at FROM entries WHERE key = ?",
+            (key,)).fetchone()
+        if not row:
+            return None
+        conn.execute("UPDATE entries SET last_access = ? WHERE key = ?",
+                     (time.time(), key))
+        keys = ["key", "filename", "page_type", "etag",
+                "last_modified", "size", "fetched_at"]
+        return dict(zip(keys, row))
+
+    def is_fresh(self, entry):
+        ttl = self.ttls.get(entry["page_type"], self.ttls["other"])
+        return time.time() - entry["fetched_at"] < ttl
+
+    def read(self, entry):
+        """Decompressed body of an entry, or None if the file is gone"""
+        try:
+            with open(os.path.join(self.directory, entry["filename"]), "rb") as f:
+                return gzip.decompress(f.read()).decode("utf-8")
+        except (OSError, EOFError):
+            return None
+
+    def validators(self, entry):
+        """Conditional request headers for a stale entry"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, key, body, page_type=None, etag=None, last_modified=None):
+        """Store a body (compressed) and its validators"""
+        filename = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".html.gz"
+        data = gzip.compress(body.encode("utf-8"), compresslevel=6)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(self.directory, filename))
+
+        now = time.time()
+        self._connection().execute(
+            """INSERT OR REPLACE INTO entries
+               (key, filename, page_type, etag, last_modified, size, fetched_at, last_access)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (key, filename, page_type or page_type_for_url(key.replace(RENDERED_PREFIX, "", 1)),
+             etag, last_modified, len(data), now, now))
+        self._evict()
+
+    def mark_revalidated(self, key):
+        """The server answered 304: the cached body is fresh again"""
+        self._connection().execute(
+            "UPDATE entries SET fetched_at = ? WHERE key = ?", (time.time(), key))
+
+    def total_size(self):
+        return self._connection().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is under 90% of max_bytes"""
+        if self.total_size() <= self.max_bytes:
+            return
+        with self.evict_lock:
+            conn = self._connection()
+            excess = self.total_size() - self.max_bytes * 0.9
+            for key, filename, size in conn.execute(
+                    "SELECT key, filename, size FROM entries ORDER BY last_access").fetchall():
+                if excess <= 0:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                excess -= size
+
+    def print_stats(self):
+        count = self._connection().execute(
+            "SELECT COUNT(*) FROM entries").fetchone()[0]
+        print(f"🗄️ HTTP cache ({HTTP_CACHE_MODE}): {self.hits} hits, {self.revalidated} revalidated (304), "
+              f"{self.misses} misses; {count} entries, {self.total_size() / 1024 / 1024:.1f} MB")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Process-wide cache, or None when HTTP_CACHE=off"""
+    global _cache
+    if HTTP_CACHE_MODE == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+    return _cache
+
+
+def load_rendered_snapshot(driver, url, page_html):
+    """Show a cached rendered page in the browser without hitting the site
+
+    Scripts are stripped so nothing re-renders or calls out, and a <base>
+    tag keeps relative links resolving against the original URL.
+    """
+    page_html = re.sub(r"<script\b[^>]*>.*?</script>", "",
+                       page_html, flags=re.S | re.I)
+    page_html = re.sub(r"<head([^>]*)>", f'<head\\1><base href="{url}">',
+                       page_html, count=1, flags=re.I)
+
+    fd, path = tempfile.mkstemp(suffix=".html", prefix="snapshot_")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(page_html)
+    try:
+        driver.get("file://" + path)
+    finally:
+        os.remove(path)
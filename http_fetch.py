@@ -0,0 +1,225 @@
+import json
+import os
+import threading
+import requests
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from http_cache import HTTP_CACHE_MODE, get_http_cache
+
+# "auto" tries plain HTTP first and falls back to Selenium, "http" never
+# opens a browser, "selenium" keeps the old behaviour
+FETCH_BACKEND = os.getenv("FETCH_BACKEND", "auto")
+
+# Fields that must come back from HTTP for us to skip the browser
+REQUIRED_DETAIL_FIELDS = ("detailed_title", "detailed_price")
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/126.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-CA,en;q=0.9",
+}
+
+_thread_local = threading.local()
+
+
+def get_http_session(pool_size=20):
+    """Return this thread's pooled requests session (keep-alive + retries)"""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        retry = Retry(total=2, backoff_factor=0.5,
+                      status_forcelist=[500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _thread_local.session = session
+    return session
+
+
+def fetch_html(url, timeout=15):
+    """Fetch a page over HTTP and return its HTML, or None on failure
+
+    Goes through the on-disk cache: fresh entries are served without a
+    request, stale ones are revalidated with ETag / Last-Modified.
+    """
+    cache = get_http_cache()
+    entry = cache.get(url) if cache else None
+    if entry and (HTTP_CACHE_MODE == "replay" or cache.is_fresh(entry)):
+        body = cache.read(entry)
+        if body is not None:
+            cache.hits += 1
+            return body
+        entry = None
+
+    if HTTP_CACHE_MODE == "replay":
+        print(f"⚠️ Not in cache (replay mode): {url}")
+        return None
+
+    try:
+        headers = cache.validators(entry) if entry else {}
+        response = get_http_session().get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and entry:
+            body = cache.read(entry)
+            if body is not None:
+                cache.mark_revalidated(url)
+                cache.revalidated += 1
+                return body
+            # Cached file vanished: fetch the page again unconditionally
+            response = get_http_session().get(url, timeout=timeout)
+        if response.status_code != 200:
+            print(f"⚠️ HTTP {response.status_code} for {url}")
+            return None
+        if cache:
+            cache.misses += 1
+            cache.put(url, response.text, etag=response.headers.get("ETag"),
+                      last_modified=response.headers.get("Last-Modified"))
+        return response.text
+    except requests.RequestException as e:
+        print(f"⚠️ HTTP fetch failed for {url}: {e}")
+        return None
+
+
+def extract_json_ld(tree):
+    """Return every JSON-LD object embedded in the page (flattening @graph)"""
+    objects = []
+    for script in tree.xpath("//script[@type='application/ld+json']/text()"):
+        try:
+            data = json.loads(script)
+        except (json.JSONDecodeError, TypeError):
+            continue
+
+        items = data if isinstance(data, list) else [data]
+        for item in items:
+            if isinstance(item, dict) and "@graph" in item:
+                objects.extend(
+                    obj for obj in item["@graph"] if isinstance(obj, dict))
+            elif isinstance(item, dict):
+                objects.append(item)
+    return objects
+
+
+def extract_next_data(tree):
+    """Return the Next.js __NEXT_DATA__ state if the page has one"""
+    scripts = tree.xpath("//script[@id='__NEXT_DATA__']/text()")
+    if not scripts:
+        return None
+    try:
+        return json.loads(scripts[0])
+    except json.JSONDecodeError:
+        return None
+
+
+def find_in_state(state, keys):
+    """Depth-first search of an embedded JSON state for the first non-empty key"""
+    stack = [state]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key in keys:
+                value = node.get(key)
+                if isinstance(value, (str, int, float)) and str(value).strip():
+                    return str(value).strip()
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+
+def first_text(tree, xpaths):
+    """Text of the first node matched by any of the xpaths"""
+    for xpath in xpaths:
+        for node in tree.xpath(xpath):
+            text = node.text_content().strip()
+            if text:
+                return text
+    return None
+
+
+def format_price(price):
+    """Format a numeric price the way the page renders it ("$159.99")"""
+    if price is None:
+        return None
+    price = str(price).strip()
+    return price if price.startswith("$") else f"${price}"
+
+
+def parse_product_details(page_html):
+    """Parse h1, price, SKU and description out of a product page"""
+    tree = lxml_html.fromstring(page_html)
+    details = {
+        "detailed_title": None,
+        "detailed_price": None,
+        "sku": None,
+        "description": None
+    }
+
+    # 1. Structured data (schema.org Product)
+    for obj in extract_json_ld(tree):
+        types = obj.get("@type")
+        types = types if isinstance(types, list) else [types]
+        if "Product" not in types:
+            continue
+
+        details["detailed_title"] = details["detailed_title"] or obj.get("name")
+        details["sku"] = details["sku"] or obj.get("sku") or obj.get("mpn")
+        details["description"] = details["description"] or obj.get(
+            "description")
+
+        offers = obj.get("offers")
+        offers = offers[0] if isinstance(offers, list) and offers else offers
+        if isinstance(offers, dict) and not details["detailed_price"]:
+            details["detailed_price"] = format_price(
+                offers.get("price") or offers.get("lowPrice"))
+
+    # 2. Embedded application state
+    next_data = extract_next_data(tree)
+    if next_data:
+        details["sku"] = details["sku"] or find_in_state(
+            next_data, ["sku", "skuNumber", "code"])
+        if not details["detailed_price"]:
+            details["detailed_price"] = format_price(
+                find_in_state(next_data, ["formattedPrice", "price"]))
+
+    # 3. Server-rendered markup
+    details["detailed_title"] = details["detailed_title"] or first_text(
+        tree, ["//h1"])
+    details["detailed_price"] = details["detailed_price"] or first_text(tree, [
+        "//*[contains(concat(' ', normalize-space(@class), ' '), ' price ')]",
+        "//*[contains(@class, 'price')]",
+        "//*[contains(@data-testid, 'price')]"])
+    details["sku"] = details["sku"] or first_text(tree, [
+        "//*[contains(@class, 'sku')]",
+        "//*[contains(@data-testid, 'sku')]",
+        "//*[contains(@class, 'model')]"])
+    details["description"] = details["description"] or first_text(tree, [
+        "//*[contains(concat(' ', normalize-space(@class), ' '), ' description ')]",
+        "//*[contains(@class, 'description')]",
+        "//*[contains(@class, 'detail')]"])
+
+    for key, value in details.items():
+        if value is not None:
+            details[key] = str(value).strip() or None
+
+    return details
+
+
+def fetch_product_details_http(product_url):
+    """Fetch and parse a product page without a browser; returns {} on failure"""
+    page_html = fetch_html(product_url)
+    if not page_html:
+        return {}
+
+    try:
+        return parse_product_details(page_html)
+    except Exception as e:
+        print(f"⚠️ Error parsing product page over HTTP: {e}")
+        return {}
+
+
+def has_required_fields(details):
+    """True if the HTTP result is complete enough to skip Selenium"""
+    return all(details.get(field) for field in REQUIRED_DETAIL_FIELDS)
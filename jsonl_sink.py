@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+
+
+class JsonlSink:
+    """Append-only JSONL checkpoint file, one line per processed product
+
+    Each append is written with a single write() call and flushed, so a
+    crash can at most leave one torn trailing line (skipped on read).
+    fsync is batched by record count and elapsed time.
+    """
+
+    def __init__(self, path, fsync_every=20, fsync_interval=5.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.last_fsync = time.time()
+        self.file = open(path, "a", encoding="utf-8")
+        self._terminate_torn_line()
+
+    def _terminate_torn_line(self):
+        """Start on a fresh line if a previous run died mid-write"""
+        if self.file.tell() == 0:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                self.file.write("\n")
+                self.file.flush()
+
+    def append(self, record):
+        """Append one record atomically"""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.pending += 1
+            if self.pending >= self.fsync_every or time.time() - self.last_fsync >= self.fsync_interval:
+                self._fsync()
+
+    def flush(self):
+        """Force buffered records to disk"""
+        with self.lock:
+            self._fsync()
+
+    def _fsync(self):
+        if self.file.closed:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_fsync = time.time()
+
+    def close(self):
+        with self.lock:
+            self._fsync()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def iter_jsonl(path):
+    """Stream records from a JSONL file, skipping a torn or corrupt line"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping unreadable line {line_number} in {path}")
+    except FileNotFoundError:
+        return
+
+
+def write_json_array(path, items):
+    """Write an iterable as a JSON array without building the list in memory"""
+    tmp_path = path + ".tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for item in items:
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(item, ensure_ascii=False, indent=2))
+            count += 1
+        f.write("\n]\n")
+    os.replace(tmp_path, path)
+    return count
+
+
+def iter_jsonl_files(paths):
+    """Stream records from several JSONL files, one file after the other"""
+    for path in paths:
+        yield from iter_jsonl(path)
+
+
+def compact_jsonl(jsonl_path, reviews_file, ratings_file):
+    """Produce the legacy reviews list and ratings dict from a JSONL checkpoint
+
+    jsonl_path may also be a list of checkpoints (e.g. one per shard), read
+    in order as if they were one file. If a product was recorded more than
+    once, the latest full record wins. Records flagged "incremental" (new
+    reviews from a re-crawl) are added to the full record before them
+    instead of replacing it.
+    """
+    paths = [jsonl_path] if isinstance(jsonl_path, str) else list(jsonl_path)
+
+    # First pass: remember which line is the latest full record for each product
+    latest_line = {}
+    for index, record in enumerate(iter_jsonl_files(paths)):
+        if not record.get("incremental"):
+            latest_line[record.get("product_url")] = index
+
+    product_ratings = {}
+
+    def _reviews():
+        seen = set()
+        for index, record in enumerate(iter_jsonl_files(paths)):
+            product_url = record.get("product_url")
+            if index < latest_line.get(product_url, -1):
+                continue
+            if index == latest_line.get(product_url):
+                product_ratings.pop(product_url, None)
+            if record.get("rating"):
+                product_ratings[product_url] = record["rating"]
+            for review in record.get("reviews", []):
+                review_id = review.get("review_id")
+                if review_id is not None:
+                    if (product_url, review_id) in seen:
+                        continue
+                    seen.add((product_url, review_id))
+                yield review
+
+    review_count = write_json_array(reviews_file, _reviews())
+
+    tmp_ratings = ratings_file + ".tmp"
+    with open(tmp_ratings, "w", encoding="utf-8") as f:
+        json.dump(product_ratings, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_ratings, ratings_file)
+
+    print(
+        f"🗜️ Compacted {', '.join(paths)}: {review_count} reviews -> {reviews_file}, {len(product_ratings)} ratings -> {ratings_file}")
+    return review_count, len(product_ratings)
+
+
+def seed_jsonl_from_legacy(jsonl_path, reviews_file, ratings_file):
+    """One-time import of legacy JSON results so an old run can be resumed"""
+    if os.path.exists(jsonl_path):
+        return 0
+
+    try:
+        with open(reviews_file, "r", encoding="utf-8") as f:
+            reviews = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        reviews = []
+
+    try:
+        with open(ratings_file, "r", encoding="utf-8") as f:
+            ratings = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        ratings = {}
+
+    if not reviews and not ratings:
+        return 0
+
+    by_product = {}
+    for review in reviews:
+        by_product.setdefault(review.get("product_url"), []).append(review)
+
+    with JsonlSink(jsonl_path) as sink:
+        for product_url in set(by_product) | set(ratings):
+            sink.append({
+                "product_url": product_url,
+                "reviews": by_product.get(product_url, []),
+                "rating": ratings.get(product_url)
+            })
+
+    print(f"📂 Imported {len(reviews)} legacy reviews into {jsonl_path}")
+    return len(reviews)
@@ -0,0 +1,222 @@
+import json
+import os
+import sys
+import threading
+import time
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from driver_resolver import resolve_chromedriver_path
+from waits import wait_for_page, SEARCH_READY_SELECTORS
+
+# Turn lean browsing on for the serial scrapers (the parallel one always uses it)
+LEAN_BROWSING = os.getenv("LEAN_BROWSING", "").lower() in ("1", "true", "yes")
+
+IMAGE_PATTERNS = ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*",
+                  "*.webp*", "*.avif*", "*.svg*", "*.ico*"]
+FONT_PATTERNS = ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"]
+MEDIA_PATTERNS = ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.ogg*"]
+ANALYTICS_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*googleadservices.com*", "*facebook.net*",
+    "*connect.facebook.com*", "*hotjar.com*", "*criteo.com*", "*criteo.net*",
+    "*adobedtm.com*", "*demdex.net*", "*omtrdc.net*", "*quantummetric.com*",
+    "*bing.com/bat*", "*bat.bing.com*", "*analytics.tiktok.com*", "*pinterest.com/ct*",
+    "*snapchat.com*", "*taboola.com*", "*outbrain.com*", "*newrelic.com*", "*nr-data.net*",
+    # Bazaarvoice's own beacon; the widget renders without it
+    "*network-a.bazaarvoice.com*"
+]
+# Chat, video and map embeds: no stage reads anything from them
+WIDGET_PATTERNS = [
+    "*liveperson.net*", "*lpsnmedia.net*", "*youtube.com/embed*", "*ytimg.com*",
+    "*player.vimeo.com*", "*maps.googleapis.com*", "*maps.gstatic.com*"
+]
+# The review widget: bv.js, its bundles and the Conversations API
+REVIEW_WIDGET_PATTERNS = ["*apps.bazaarvoice.com*", "*api.bazaarvoice.com*"]
+
+# What each stage can live without. Everything is blocked by URL pattern
+# through CDP, so use_stage() turns the review widget back on for "reviews"
+# on a driver that was started for search or product pages. Search and
+# product details are read from Canadian Tire's own markup, so they also
+# skip the widget and its API calls.
+STAGE_PROFILES = {
+    "search": {"images": True, "fonts": True, "media": True, "analytics": True,
+               "widgets": True, "review_widget": True},
+    "product": {"images": True, "fonts": True, "media": True, "analytics": True,
+                "widgets": True, "review_widget": True},
+    "reviews": {"images": True, "fonts": True, "media": True, "analytics": True,
+                "widgets": True, "review_widget": False},
+    "full": {"images": False, "fonts": False, "media": False, "analytics": False,
+             "widgets": False, "review_widget": False}
+}
+
+
+def build_blocked_patterns(stage):
+    """URL patterns to block for a stage (Network.setBlockedURLs syntax)"""
+    profile = STAGE_PROFILES[stage]
+    patterns = []
+    if profile["images"]:
+        patterns += IMAGE_PATTERNS
+    if profile["fonts"]:
+        patterns += FONT_PATTERNS
+    if profile["media"]:
+        patterns += MEDIA_PATTERNS
+    if profile["analytics"]:
+        patterns += ANALYTICS_PATTERNS
+    if profile["widgets"]:
+        patterns += WIDGET_PATTERNS
+    if profile["review_widget"]:
+        patterns += REVIEW_WIDGET_PATTERNS
+    return patterns
+
+
+def apply_lean_options(options):
+    """Chrome switches and prefs for lean browsing
+
+    Replaces the old "--disable-images" flag, which is not a Chrome switch.
+    Images are not disabled here: a launch-time pref could not be undone
+    per stage, so enable_lean_browsing blocks them by URL pattern instead.
+    """
+    options.add_argument("--headless=new")
+    options.add_experimental_option("prefs", {
+        "profile.default_content_setting_values.notifications": 2,
+        "profile.default_content_setting_values.geolocation": 2
+    })
+    return options
+
+
+def enable_lean_browsing(driver, stage):
+    """Block the stage's resource patterns on an existing driver via CDP
+
+    Can be called again before each navigation to switch stages.
+    """
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {
+                               "urls": build_blocked_patterns(stage)})
+        driver.lean_stage = stage
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not enable lean browsing ({stage}): {e}")
+        return False
+
+
+def use_stage(driver, stage):
+    """Switch a lean driver to another stage's profile; no-op for full drivers"""
+    if getattr(driver, "lean_stage", None) not in (None, stage):
+        enable_lean_browsing(driver, stage)
+
+
+def setup_measurement_driver(stage):
+    """Headless driver for the before/after comparison"""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument(
+        f"--user-data-dir=/tmp/chrome_profile_measure_{stage}_{os.getpid()}_{threading.current_thread().ident}")
+    apply_lean_options(options)
+    # Network events from the DevTools protocol, read back with get_log()
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    driver = webdriver.Chrome(service=Service(
+        resolve_chromedriver_path()), options=options)
+    enable_lean_browsing(driver, stage)
+    return driver
+
+
+def read_network_log(driver, totals):
+    """Add finished requests from the performance log to totals; returns how many
+
+    encodedDataLength is what went over the wire, cross-origin responses
+    included (the page's Resource Timing reports 0 for those without
+    Timing-Allow-Origin). Blocked requests never finish, so they add nothing.
+    """
+    finished = 0
+    for entry in driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        if message["method"] == "Network.loadingFinished":
+            totals["bytes"] += message["params"]["encodedDataLength"]
+            totals["requests"] += 1
+            finished += 1
+    return finished
+
+
+def measure_page_load(driver, url, ready_selectors, settle_seconds=2, max_seconds=30):
+    """Bytes transferred, request count and page-ready time for one page load
+
+    Requests are counted until the network has been quiet for settle_seconds
+    (or max_seconds), so late ads and trackers are included in the full profile.
+    """
+    driver.get("about:blank")
+    driver.get_log("performance")  # drop events from earlier loads
+    totals = {"bytes": 0, "requests": 0}
+
+    start_time = time.time()
+    driver.get(url)
+    wait_for_page(driver, ready_selectors, timeout=30,
+                  step_name="measure_page_load")
+    ready_seconds = time.time() - start_time
+
+    read_network_log(driver, totals)
+    quiet_since = time.time()
+    while time.time() - quiet_since < settle_seconds and time.time() - start_time < max_seconds:
+        time.sleep(0.5)
+        if read_network_log(driver, totals):
+            quiet_since = time.time()
+
+    return {"ready_seconds": round(ready_seconds, 2), **totals}
+
+
+def compare_profiles(url, stage, ready_selectors, runs=3):
+    """Measure a page with the full browser and with the stage's lean profile"""
+    results = {}
+    for profile in ("full", stage):
+        driver = setup_measurement_driver(profile)
+        try:
+            samples = [measure_page_load(driver, url, ready_selectors)
+                       for _ in range(runs)]
+        finally:
+            driver.quit()
+
+        results[profile] = {
+            "ready_seconds": round(sum(s["ready_seconds"] for s in samples) / runs, 2),
+            "bytes": int(sum(s["bytes"] for s in samples) / runs),
+            "requests": int(sum(s["requests"] for s in samples) / runs)
+        }
+
+    full, lean = results["full"], results[stage]
+    print(f"\n📏 {stage} page: {url}")
+    print(f"   {'profile':<10} {'KB':>10} {'requests':>9} {'ready(s)':>9}")
+    for name, stats in (("full", full), ("lean", lean)):
+        print(
+            f"   {name:<10} {stats['bytes'] / 1024:>10.1f} {stats['requests']:>9} {stats['ready_seconds']:>9.2f}")
+    if full["bytes"]:
+        print(
+            f"   saved {100 - lean['bytes'] * 100 / full['bytes']:.1f}% bytes, {full['ready_seconds'] - lean['ready_seconds']:.2f}s to ready")
+    return results
+
+
+def main():
+    """Before/after measurement on a search page and a product page"""
+    search_url = "https://www.canadiantire.ca/en/search-results.html?q=bikes"
+    product_url = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if not product_url:
+        try:
+            with open("productos_scraped_v0.json", "r", encoding="utf-8") as f:
+                product_url = json.load(f)[0]["product_url"]
+        except (FileNotFoundError, IndexError, KeyError):
+            pass
+
+    report = {"search": compare_profiles(
+        search_url, "search", SEARCH_READY_SELECTORS)}
+    if product_url:
+        report["reviews"] = compare_profiles(
+            product_url, "reviews", [".bv_numReviews_text"])
+
+    with open("lean_browsing_report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("\n💾 Measurement saved to lean_browsing_report.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from clean_products import clean_product, clean_review
+
+# Stream scraped records straight into MongoDB while the crawl runs
+MONGO_SINK = os.getenv("MONGO_SINK", "").lower() in ("1", "true", "yes")
+# Local/other deployment (e.g. mongodb://localhost:27017); default is the Atlas cluster
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB = os.getenv("MONGO_DB", "canadian_tire_scraper")
+MONGO_BATCH_SIZE = int(os.getenv("MONGO_BATCH_SIZE", "500"))
+MONGO_FLUSH_INTERVAL = float(os.getenv("MONGO_FLUSH_INTERVAL", "5"))
+
+
+def connect_database(uri=None):
+    """(client, database) for MONGO_URI, or the project's Atlas cluster"""
+    from pymongo.mongo_client import MongoClient
+    from pymongo.server_api import ServerApi
+
+    uri = uri or MONGO_URI
+    if uri:
+        client = MongoClient(uri)
+    else:
+        from setup_database import uri as atlas_uri
+        client = MongoClient(atlas_uri, server_api=ServerApi('1'))
+    return client, client[MONGO_DB]
+
+
+class MongoSink:
+    """Batched upserts of cleaned products and reviews
+
+    Records are cleaned with the clean_products functions as they arrive
+    and buffered per collection; a buffer is written with one unordered
+    bulk_write when it reaches batch_size, and a background thread writes
+    whatever is buffered every flush_interval seconds, so a slow trickle
+    of records never waits for the next one. Upserts are keyed on
+    product_id / review_id and use $set, so fields added later (NLP,
+    sentiment) are kept.
+    """
+
+    def __init__(self, db, batch_size=MONGO_BATCH_SIZE, flush_interval=MONGO_FLUSH_INTERVAL):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.buffers = {"products": [], "reviews": []}
+        self.last_flush = time.time()
+        self.written = {"products": 0, "reviews": 0}
+        self.error_count = 0
+
+        self.db.products.create_index("product_id", unique=True)
+        self.db.reviews.create_index("review_id", unique=True)
+        self.db.reviews.create_index("product_id")
+
+        self.stopped = threading.Event()
+        self.flusher = threading.Thread(
+            target=self._flush_periodically, name="mongo-sink-flusher", daemon=True)
+        self.flusher.start()
+
+    def _flush_periodically(self):
+        """Write buffers older than flush_interval even when no new record arrives"""
+        while not self.stopped.wait(self.flush_interval):
+            with self.lock:
+                if time.time() - self.last_flush >= self.flush_interval:
+                    self._flush()
+
+    def add_product(self, product, ratings_data=None):
+        """Clean and queue one scraped product"""
+        cleaned = clean_product(product, ratings_data)
+        if not cleaned:
+            print(
+                f"⚠️ Mongo sink: no product_id in {product.get('product_url')}")
+            return
+        created_at = cleaned.pop("created_at")
+        # Ratings come from the review scraper (add_rating); don't blank them
+        for field in ("average_rating", "total_reviews"):
+            if cleaned[field] is None:
+                del cleaned[field]
+        self._add("products", UpdateOne(
+            {"product_id": cleaned["product_id"]},
+            {"$set": cleaned, "$setOnInsert": {"created_at": created_at}},
+            upsert=True))
+
+    def add_rating(self, product_url, rating_summary):
+        """Update a product's average rating and review count"""
+        product = clean_review({"product_url": product_url})
+        if not product["product_id"]:
+            return
+        self._add("products", UpdateOne(
+            {"product_id": product["product_id"]},
+            {"$set": {"average_rating": rating_summary.get('average_rating'),
+                      "total_reviews": rating_summary.get('total_reviews'),
+                      "updated_at": datetime.now().isoformat()},
+             "$setOnInsert": {"product_url": product_url}},
+            upsert=True))
+
+    def add_reviews(self, reviews):
+        """Clean and queue a product's reviews"""
+        for review in reviews:
+            if not review.get("review_id"):
+                continue
+            self._add("reviews", UpdateOne(
+                {"review_id": review["review_id"]},
+                {"$set": clean_review(review)},
+                upsert=True))
+
+    def _add(self, collection, operation):
+        with self.lock:
+            self.buffers[collection].append(operation)
+            if (len(self.buffers[collection]) >= self.batch_size
+                    or time.time() - self.last_flush >= self.flush_interval):
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        for collection, operations in self.buffers.items():
+            if not operations:
+                continue
+            try:
+                result = self.db[collection].bulk_write(
+                    operations, ordered=False)
+                self.written[collection] += result.upserted_count + \
+                    result.modified_count
+            except BulkWriteError as e:
+                # Unordered: everything except the failed operations was applied
+                self.error_count += len(e.details.get("writeErrors", []))
+                print(
+                    f"⚠️ Mongo sink: {len(e.details.get('writeErrors', []))} {collection} writes failed")
+            except PyMongoError as e:
+                self.error_count += len(operations)
+                print(
+                    f"❌ Mongo sink: {collection} batch of {len(operations)} failed: {e}")
+            self.buffers[collection] = []
+        self.last_flush = time.time()
+
+    def close(self):
+        self.stopped.set()
+        self.flusher.join()
+        self.flush()
+        print(f"🍃 Mongo sink: {self.written['products']} products and {self.written['reviews']} reviews "
+              f"written ({self.error_count} errors)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_mongo_sink():
+    """MongoSink on the configured database, or None when MONGO_SINK is off"""
+    if not MONGO_SINK:
+        return None
+    _, db = connect_database()
+    print(f"🍃 Streaming to MongoDB database {MONGO_DB} "
+          f"(batch {MONGO_BATCH_SIZE}, every {MONGO_FLUSH_INTERVAL}s)")
+    return MongoSink(db)
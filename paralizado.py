@@ -1,50 +1,110 @@
+import argparse
 import json
 import time
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_resolver import resolve_chromedriver_path
 from selenium.webdriver.chrome.service import Service
 from datetime import datetime
 import queue
 import os
+from driver_pool import DriverPool
+from lean_profile import apply_lean_options, enable_lean_browsing
+from adaptive_concurrency import (AdaptiveConcurrencyController, DomainRateLimiter, PageBlockedError,
+                                  classify_page, DOMAIN_RATE, OK, ERROR, TIMEOUT)
+from retry_queue import (RetryQueue, DeadLetterFile, ScrapeFailure, classify_failure, is_retryable,
+                         backoff_delay, MAX_RETRIES, FRESH_DRIVER_FAILURES, SELECTOR_MISS, EMPTY_REVIEWS)
+from jsonl_sink import JsonlSink, iter_jsonl, compact_jsonl, seed_jsonl_from_legacy
+from mongo_sink import open_mongo_sink
+from frontier import CrawlFrontier
+from sharding import select_shard, shard_suffix
+from review_scraper import handle_review_pagination
+import bazaarvoice_api
+from waits import wait_until, wait_for_page, any_css_present, REVIEW_SECTIONS_SELECTOR, step_timer
+
+
+# Seconds before a product page load counts as a timeout
+PAGE_LOAD_TIMEOUT = 45
+
+# Pooled drivers move between threads, so profiles are numbered, not per thread
+_profile_ids = itertools.count()
 
 
 class ThreadSafeReviewScraper:
-    def __init__(self, max_workers=3):
+    def __init__(self, max_workers=8, max_pages_per_driver=50, output_suffix="", page_workers=4,
+                 initial_workers=2, domain_rate=DOMAIN_RATE):
+        # Upper bound on browsers; the controller decides how many are busy
         self.max_workers = max_workers
-        self.all_reviews = []
+        # Concurrent review pages per product (API path) and when to use it
+        self.page_workers = page_workers
+        self.page_parallel_threshold = 8
+        self.review_count = 0
         self.product_ratings = {}
-        self.processed_urls = set()
         self.lock = threading.Lock()
         self.results_queue = queue.Queue()
         self.error_count = 0
         self.success_count = 0
+        self.retry_count = 0
+
+        # Append-only checkpoint and the legacy files compacted from it
+        # (output_suffix keeps shards run on the same machine apart)
+        self.reviews_jsonl = f"product_reviews_parallel{output_suffix}.jsonl"
+        self.reviews_file = f"product_reviews_parallel{output_suffix}.json"
+        self.ratings_file = f"product_ratings_parallel{output_suffix}.json"
+        self.sink = None
+        # Optional second sink that upserts straight into MongoDB (MONGO_SINK=1)
+        self.mongo_sink = None
+
+        # Per-URL crawl state shared by all workers (lease-based claiming)
+        self.frontier_file = f"review_frontier_parallel{output_suffix}.db"
+        self.frontier = None
+
+        # Failed products wait here (with backoff) before being re-run;
+        # terminal failures go to the dead-letter file
+        self.retry_queue = RetryQueue()
+        self.dead_letter_file = f"dead_letter_parallel{output_suffix}.jsonl"
+        self.dead_letter = None
+
+        # AIMD concurrency driven by page latency/errors, capped per domain
+        self.decisions_file = f"concurrency_decisions{output_suffix}.jsonl"
+        self.controller = AdaptiveConcurrencyController(
+            initial=initial_workers, max_limit=max_workers)
+        self.rate_limiter = DomainRateLimiter(rate=domain_rate)
+
+        # Warm browsers checked out per product instead of one new browser per product;
+        # resized to the controller's limit so it bounds the number of browsers
+        self.driver_pool = DriverPool(
+            self.setup_driver, max_drivers=self.controller.limit, max_pages_per_driver=max_pages_per_driver)
 
     def setup_driver(self):
         """Configure Chrome driver with optimized options for parallel processing"""
         options = webdriver.ChromeOptions()
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--headless")  # Always headless for parallel
         options.add_argument("--disable-gpu")
-        options.add_argument("--disable-images")
         options.add_argument("--disable-extensions")
         options.add_argument("--disable-plugins")
         options.add_argument("--disable-background-timer-throttling")
         options.add_argument("--disable-backgrounding-occluded-windows")
         options.add_argument("--disable-renderer-backgrounding")
 
-        # Unique user data dir for each thread
+        # Always headless for parallel, without images, fonts, media or trackers
+        apply_lean_options(options)
+
+        # Unique user data dir for each driver (and process, when sharded)
         options.add_argument(
-            f"--user-data-dir=/tmp/chrome_profile_{threading.current_thread().ident}")
+            f"--user-data-dir=/tmp/chrome_profile_{os.getpid()}_{next(_profile_ids)}")
 
-        service = Service(ChromeDriverManager().install())
+        service = Service(resolve_chromedriver_path())
         driver = webdriver.Chrome(service=service, options=options)
+        enable_lean_browsing(driver, "reviews")
+        driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
         driver.implicitly_wait(5)  # Reduced wait time
         return driver
 
@@ -98,7 +158,10 @@ class ThreadSafeReviewScraper:
         try:
             result = driver.execute_script(js_click_script)
             if result['success']:
-                time.sleep(2)  # Reduced wait time
+                # Wait for the reviews container instead of a fixed sleep
+                wait_until(driver, any_css_present(
+                    ["#reviews_container", "#BVRRContainer", "#BVRRContainer-mobile"]),
+                    timeout=10, step_name="review_click")
                 return True, result
             else:
                 return False, result
@@ -213,18 +276,71 @@ class ThreadSafeReviewScraper:
                 f"❌ [Thread {threading.current_thread().ident}] Error extracting reviews: {e}")
             return []
 
-    def process_single_product(self, product, thread_id):
+    def collect_all_reviews(self, driver, product_url, total_reviews):
+        """Collect every review of a product, stopping at the header's total_reviews"""
+        # Products with several pages: fetch page ranges concurrently from the review API
+        if bazaarvoice_api.is_configured() and total_reviews and total_reviews > self.page_parallel_threshold:
+            product_id = bazaarvoice_api.product_id_for_url(product_url)
+            offsets = list(
+                range(0, total_reviews, bazaarvoice_api.MAX_PAGE_SIZE))
+            reviews, failed_pages = bazaarvoice_api.fetch_page_range(
+                product_id, product_url, offsets, max_workers=self.page_workers)
+            if reviews and not failed_pages:
+                print(
+                    f"📚 [Thread {threading.current_thread().ident}] {len(reviews)}/{total_reviews} reviews from {len(offsets)} API pages")
+                return reviews
+            print(
+                f"⚠️ [Thread {threading.current_thread().ident}] API page range incomplete, paginating in the browser")
+
+        # Otherwise walk the widget's pages in this browser until the header count is reached
+        return handle_review_pagination(
+            driver, total_reviews=total_reviews, extract_page=self.extract_individual_reviews)
+
+    def process_single_product(self, product):
         """Process a single product - this is what gets parallelized"""
         product_url = product["product_url"]
         product_title = product.get('title', 'Unknown Product')
+        thread_id = threading.current_thread().name
+
+        with self.controller.slot():
+            # Lease the URL only once a slot is free, so waiting threads hold no leases;
+            # no other worker (or process) scrapes it at the same time
+            if not self.frontier.claim_url(product_url, f"{os.getpid()}-{thread_id}"):
+                return {
+                    'product_url': product_url,
+                    'product_title': product_title,
+                    'thread_id': thread_id,
+                    'success': False,
+                    'skipped': True
+                }
+            return self._scrape_product(product_url, product_title, thread_id)
+
+    def load_product_page(self, driver, product_url):
+        """Polite, timed page load whose outcome feeds the concurrency controller"""
+        self.rate_limiter.wait(product_url)
+        start_time = time.time()
+        outcome = ERROR
+        try:
+            driver.get(product_url)
+            outcome = classify_page(driver)
+            if outcome != OK:
+                raise PageBlockedError(outcome, product_url)
+            wait_for_page(driver, [".bv_numReviews_text", ".bv_avgRating_component_container"],
+                          step_name="product_page_load")
+        except TimeoutException:
+            outcome = TIMEOUT
+            raise
+        finally:
+            self.controller.record(time.time() - start_time, outcome)
 
+    def _scrape_product(self, product_url, product_title, thread_id):
         print(f"🔄 [Thread {thread_id}] Starting: {product_title[:50]}...")
 
-        driver = self.setup_driver()
+        driver = self.driver_pool.acquire()
+        healthy = True
         try:
             # Navigate to product page
-            driver.get(product_url)
-            time.sleep(3)  # Reduced wait time
+            self.load_product_page(driver, product_url)
 
             reviews = []
             product_rating_summary = {
@@ -244,12 +360,24 @@ class ThreadSafeReviewScraper:
                     'has_reviews': True
                 }
 
+            if not review_section_opened and product_rating_summary.get('total_reviews'):
+                raise ScrapeFailure(
+                    SELECTOR_MISS, "review count button could not be clicked")
+
             if review_section_opened:
                 # Wait for reviews section to load
-                time.sleep(3)
+                if not wait_until(driver, any_css_present([REVIEW_SECTIONS_SELECTOR]),
+                                  timeout=15, step_name="reviews_section_load"):
+                    raise ScrapeFailure(
+                        SELECTOR_MISS, "review sections did not render")
+
+                # Extract the complete review history, not just the first page
+                reviews = self.collect_all_reviews(
+                    driver, product_url, product_rating_summary.get('total_reviews'))
 
-                # Extract reviews (simplified pagination for parallel processing)
-                reviews = self.extract_individual_reviews(driver)
+                if not reviews and product_rating_summary.get('total_reviews'):
+                    raise ScrapeFailure(
+                        EMPTY_REVIEWS, f"0 of {product_rating_summary['total_reviews']} reviews extracted")
 
                 # Add product URL to each review
                 for review in reviews:
@@ -269,8 +397,11 @@ class ThreadSafeReviewScraper:
             return result
 
         except Exception as e:
+            failure = classify_failure(e)
+            # Crashed, timed-out or blocked browsers are replaced; others are reset and reused
+            healthy = failure not in FRESH_DRIVER_FAILURES
             print(
-                f"❌ [Thread {thread_id}] Error processing {product_title}: {e}")
+                f"❌ [Thread {thread_id}] Error processing {product_title} ({failure}): {e}")
             return {
                 'product_url': product_url,
                 'product_title': product_title,
@@ -278,19 +409,22 @@ class ThreadSafeReviewScraper:
                 'rating_summary': {'has_reviews': False},
                 'thread_id': thread_id,
                 'success': False,
+                'failure': failure,
                 'error': str(e)
             }
         finally:
-            driver.quit()
+            self.driver_pool.release(driver, healthy=healthy)
 
     def merge_results(self, result):
         """Thread-safe merge of results"""
+        if result.get('skipped'):
+            return
+
         with self.lock:
             if result['success']:
-                self.all_reviews.extend(result['reviews'])
-
+                product_rating = None
                 if result['rating_summary'].get('has_reviews'):
-                    self.product_ratings[result['product_url']] = {
+                    product_rating = {
                         'product_title': result['product_title'],
                         'product_url': result['product_url'],
                         'average_rating': result['rating_summary'].get('average_rating'),
@@ -298,61 +432,100 @@ class ThreadSafeReviewScraper:
                         'extracted_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                         'thread_id': result['thread_id']
                     }
-
-                self.processed_urls.add(result['product_url'])
+                    self.product_ratings[result['product_url']] = product_rating
+
+                # One appended line per product instead of rewriting everything
+                self.sink.append({
+                    'product_url': result['product_url'],
+                    'product_title': result['product_title'],
+                    'reviews': result['reviews'],
+                    'rating': product_rating
+                })
+                if self.mongo_sink:
+                    self.mongo_sink.add_reviews(result['reviews'])
+                    if product_rating:
+                        self.mongo_sink.add_rating(
+                            result['product_url'], product_rating)
+
+                self.review_count += len(result['reviews'])
+                self.frontier.mark_done(result['product_url'])
                 self.success_count += 1
+
+    def handle_failure(self, product, retries_done, result):
+        """Re-enqueue a retryable failure with backoff, or dead-letter it"""
+        failure = result.get('failure')
+        error = result.get('error')
+        product_title = result['product_title'][:50]
+
+        with self.lock:
+            if is_retryable(failure, retries_done):
+                delay = backoff_delay(failure, retries_done)
+                self.frontier.mark_failed(
+                    result['product_url'], f"{failure}: {error}")
+                self.retry_queue.push((product, retries_done + 1), delay)
+                self.retry_count += 1
+                print(
+                    f"🔁 Retry {retries_done + 1}/{MAX_RETRIES[failure]} for {product_title} in {delay:.0f}s ({failure})")
             else:
+                self.frontier.mark_dead(
+                    result['product_url'], f"{failure}: {error}")
+                self.dead_letter.add(
+                    product, failure, error, attempts=retries_done + 1)
                 self.error_count += 1
+                print(
+                    f"💀 Giving up on {product_title} after {retries_done + 1} attempts ({failure})")
 
     def save_progress(self):
-        """Save current progress to files"""
-        with self.lock:
-            # Save reviews
-            try:
-                with open("product_reviews_parallel.json", "w", encoding="utf-8") as f:
-                    json.dump(self.all_reviews, f,
-                              ensure_ascii=False, indent=2)
-            except Exception as e:
-                print(f"Error saving reviews: {e}")
-
-            # Save product ratings
-            try:
-                with open("product_ratings_parallel.json", "w", encoding="utf-8") as f:
-                    json.dump(self.product_ratings, f,
-                              ensure_ascii=False, indent=2)
-            except Exception as e:
-                print(f"Error saving ratings: {e}")
+        """Make sure checkpointed results are on disk"""
+        if self.sink:
+            self.sink.flush()
+        if self.mongo_sink:
+            self.mongo_sink.flush()
 
     def load_existing_data(self):
-        """Load existing data to resume processing"""
-        try:
-            with open("product_reviews_parallel.json", "r", encoding="utf-8") as f:
-                self.all_reviews = json.load(f)
-                self.processed_urls = set(
-                    [review["product_url"] for review in self.all_reviews])
-                print(f"📂 Loaded {len(self.all_reviews)} existing reviews")
-        except FileNotFoundError:
+        """Load existing data to resume processing (streamed from the JSONL checkpoint)"""
+        seed_jsonl_from_legacy(
+            self.reviews_jsonl, self.reviews_file, self.ratings_file)
+
+        is_new_frontier = not os.path.exists(self.frontier_file)
+        # Enough attempts for the longest retry budget of any failure class
+        self.frontier = CrawlFrontier(
+            self.frontier_file, max_attempts=max(MAX_RETRIES.values()) + 1)
+
+        checkpointed_urls = []
+        for record in iter_jsonl(self.reviews_jsonl):
+            checkpointed_urls.append(record['product_url'])
+            self.review_count += len(record.get('reviews', []))
+            if record.get('rating'):
+                self.product_ratings[record['product_url']] = record['rating']
+
+        # First run with a frontier: everything already checkpointed is done
+        if is_new_frontier and checkpointed_urls:
+            self.frontier.mark_many_done(checkpointed_urls)
+
+        if checkpointed_urls:
+            print(
+                f"📂 Loaded {self.review_count} existing reviews from {len(set(checkpointed_urls))} products")
+            print(
+                f"📂 Loaded {len(self.product_ratings)} existing product ratings")
+        else:
             print("📂 No existing reviews found, starting fresh")
 
-        try:
-            with open("product_ratings_parallel.json", "r", encoding="utf-8") as f:
-                self.product_ratings = json.load(f)
-                print(
-                    f"📂 Loaded {len(self.product_ratings)} existing product ratings")
-        except FileNotFoundError:
-            print("📂 No existing product ratings found, starting fresh")
-
     def parallel_scrape(self, products):
         """Main parallel scraping function"""
-        print(f"🚀 Starting parallel scraping with {self.max_workers} workers")
+        print(
+            f"🚀 Starting parallel scraping with {self.controller.limit} workers (adaptive, max {self.max_workers})")
         print(f"📊 Total products to process: {len(products)}")
 
         # Load existing data
         self.load_existing_data()
 
-        # Filter out already processed products
+        # Filter out already processed products (O(1) lookup per URL)
+        self.frontier.add_urls(p["product_url"] for p in products)
+        # Products a crashed run had in flight are scraped again now
+        self.frontier.release_dead_leases()
         unprocessed_products = [
-            p for p in products if p["product_url"] not in self.processed_urls]
+            p for p in products if not self.frontier.is_done(p["product_url"])]
 
         if len(unprocessed_products) != len(products):
             print(
@@ -365,60 +538,129 @@ class ThreadSafeReviewScraper:
 
         # Process in parallel
         start_time = time.time()
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all jobs
-            future_to_product = {
-                executor.submit(self.process_single_product, product, f"T{i % self.max_workers}"): product
-                for i, product in enumerate(unprocessed_products)
-            }
-
-            # Process completed jobs
-            for future in as_completed(future_to_product):
-                try:
-                    result = future.result()
-                    self.merge_results(result)
-
-                    # Save progress every 5 completed products
-                    if (self.success_count + self.error_count) % 5 == 0:
-                        self.save_progress()
-                        progress = (self.success_count + self.error_count) / \
-                            len(unprocessed_products) * 100
-                        print(
-                            f"📈 Progress: {progress:.1f}% ({self.success_count} success, {self.error_count} errors)")
-
-                except Exception as e:
-                    print(f"❌ Future execution error: {e}")
-                    self.error_count += 1
-
-        # Final save
-        self.save_progress()
+        self.sink = JsonlSink(self.reviews_jsonl)
+        self.controller.decision_log = JsonlSink(self.decisions_file)
+        self.dead_letter = DeadLetterFile(self.dead_letter_file)
+        self.mongo_sink = open_mongo_sink()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="T") as executor:
+            future_to_product = {}
+
+            def _submit(product, retries_done):
+                future = executor.submit(self.process_single_product, product)
+                future_to_product[future] = (product, retries_done)
+
+            # Submit all jobs (attempts from earlier runs count against the retry budget)
+            for product in unprocessed_products:
+                _submit(product, self.frontier.get(
+                    product["product_url"])["attempts"])
+
+            # Process completed jobs and resubmit retries once their backoff has elapsed
+            last_reported = 0
+            while future_to_product or len(self.retry_queue):
+                if future_to_product:
+                    done, _ = wait(future_to_product, timeout=self.retry_queue.next_ready_in(),
+                                   return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(self.retry_queue.next_ready_in())
+                    done = set()
+
+                for future in done:
+                    product, retries_done = future_to_product.pop(future)
+                    try:
+                        result = future.result()
+                        if result['success'] or result.get('skipped'):
+                            self.merge_results(result)
+                        else:
+                            self.handle_failure(product, retries_done, result)
+                    except Exception as e:
+                        print(f"❌ Future execution error: {e}")
+                        self.error_count += 1
+
+                for product, retries_done in self.retry_queue.pop_ready():
+                    _submit(product, retries_done)
+
+                # Keep no more browsers alive than the controller currently allows
+                if self.driver_pool.max_drivers != self.controller.limit:
+                    self.driver_pool.resize(self.controller.limit)
+
+                # Save progress every 5 finished products
+                finished = self.success_count + self.error_count
+                if finished != last_reported and finished % 5 == 0:
+                    last_reported = finished
+                    self.save_progress()
+                    progress = finished / len(unprocessed_products) * 100
+                    print(
+                        f"📈 Progress: {progress:.1f}% ({self.success_count} success, {self.error_count} errors, "
+                        f"{len(self.retry_queue)} waiting to retry, concurrency {self.controller.limit})")
+
+        self.driver_pool.close_all()
+
+        # Final save: close the checkpoint and rebuild the legacy JSON files
+        self.sink.close()
+        self.controller.decision_log.close()
+        self.dead_letter.close()
+        if self.mongo_sink:
+            self.mongo_sink.close()
+        compact_jsonl(self.reviews_jsonl, self.reviews_file, self.ratings_file)
+        self.frontier.print_stats()
 
         elapsed_time = time.time() - start_time
         print(f"\n🎉 Parallel scraping completed!")
         print(f"⏱️ Total time: {elapsed_time:.2f} seconds")
         print(f"📊 Success: {self.success_count} products")
         print(f"❌ Errors: {self.error_count} products")
-        print(f"📝 Total reviews extracted: {len(self.all_reviews)}")
+        print(
+            f"🔁 Retries: {self.retry_count} ({self.dead_letter.count} products dead-lettered to {self.dead_letter_file})")
+        print(
+            f"🎛️ Final concurrency: {self.controller.limit} ({len(self.controller.decisions)} decisions in {self.decisions_file})")
+        print(f"📝 Total reviews extracted: {self.review_count}")
         print(f"⭐ Products with ratings: {len(self.product_ratings)}")
-        print(f"💾 Results saved to: product_reviews_parallel.json and product_ratings_parallel.json")
+        print(
+            f"💾 Results saved to: {self.reviews_file} and {self.ratings_file}")
+        step_timer.report()
 
 
 def main_parallel():
     """Main function for parallel processing"""
+    parser = argparse.ArgumentParser(description="Parallel review scraper")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="starting number of concurrent browsers (adapted at runtime)")
+    parser.add_argument("--max-workers", type=int, default=8,
+                        help="ceiling for the adaptive concurrency (browsers in this process)")
+    parser.add_argument("--domain-rate", type=float, default=DOMAIN_RATE,
+                        help="maximum page requests per second to one domain, for all shards together")
+    parser.add_argument("--shard", type=int, default=None,
+                        help="index of the shard this process handles")
+    parser.add_argument("--num-shards", type=int, default=1)
+    parser.add_argument("--products", default="productos_scraped_v0.json")
+    args = parser.parse_args()
+
     # Load products
     try:
-        with open("productos_scraped_v0.json", "r", encoding="utf-8") as f:
+        with open(args.products, "r", encoding="utf-8") as f:
             products = json.load(f)
     except FileNotFoundError:
-        print("Error: productos_scraped_v0.json not found. Please run the product scraper first.")
+        print(f"Error: {args.products} not found. Please run the product scraper first.")
         return
 
     print(f"🚀 PARALLEL REVIEW SCRAPER")
     print(f"📊 Loaded {len(products)} products")
 
-    # Create scraper with 3 workers (adjust based on your system)
-    scraper = ThreadSafeReviewScraper(max_workers=3)
+    output_suffix = ""
+    domain_rate = args.domain_rate
+    if args.shard is not None:
+        # Deterministic split by product_id hash; every shard writes its own files
+        products = select_shard(products, args.shard, args.num_shards)
+        output_suffix = shard_suffix(args.shard, args.num_shards)
+        # All shards hit the same site, so they share one politeness budget
+        domain_rate = args.domain_rate / args.num_shards
+        print(
+            f"🧩 Shard {args.shard}/{args.num_shards}: {len(products)} products, {domain_rate:.2f} requests/s")
+
+    scraper = ThreadSafeReviewScraper(
+        max_workers=max(args.max_workers, args.workers), initial_workers=args.workers,
+        output_suffix=output_suffix, domain_rate=domain_rate)
 
     # Start parallel processing
     scraper.parallel_scrape(products)
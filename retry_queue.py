@@ -0,0 +1,142 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from datetime import datetime
+from selenium.common.exceptions import (TimeoutException, NoSuchElementException, NoSuchWindowException,
+                                        InvalidSessionIdException)
+from adaptive_concurrency import PageBlockedError, TIMEOUT as TIMEOUT_OUTCOME
+from jsonl_sink import JsonlSink
+
+# Failure classes
+TIMEOUT = "timeout"
+DRIVER_CRASH = "driver_crash"
+SELECTOR_MISS = "selector_miss"
+EMPTY_REVIEWS = "empty_reviews"
+BLOCKED = "blocked"
+UNKNOWN = "unknown"
+
+# Retries allowed per class; 0 means terminal on the first failure
+# (an unknown error is most likely a bug that a retry will not fix)
+MAX_RETRIES = {
+    TIMEOUT: 3,
+    DRIVER_CRASH: 3,
+    BLOCKED: 3,
+    EMPTY_REVIEWS: 2,
+    SELECTOR_MISS: 1,
+    UNKNOWN: 0
+}
+
+# First backoff delay per class in seconds (doubles on every retry)
+BASE_DELAY = {
+    TIMEOUT: 10.0,
+    DRIVER_CRASH: 5.0,
+    BLOCKED: 60.0,
+    EMPTY_REVIEWS: 10.0,
+    SELECTOR_MISS: 10.0,
+    UNKNOWN: 10.0
+}
+MAX_DELAY = 600.0
+
+# Failures after which the driver is thrown away instead of reused
+FRESH_DRIVER_FAILURES = {TIMEOUT, DRIVER_CRASH, BLOCKED}
+
+# WebDriver error messages that mean the browser or chromedriver is gone
+DRIVER_CRASH_MARKERS = [
+    "invalid session id", "chrome not reachable", "disconnected", "session deleted",
+    "tab crashed", "no such window", "target window already closed",
+    "max retries exceeded", "connection refused"
+]
+
+
+class ScrapeFailure(Exception):
+    """A product scrape that finished without the data we expected"""
+
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
+
+
+def classify_failure(error):
+    """Failure class of an exception raised while scraping a product"""
+    if isinstance(error, ScrapeFailure):
+        return error.kind
+    if isinstance(error, PageBlockedError):
+        return TIMEOUT if error.outcome == TIMEOUT_OUTCOME else BLOCKED
+    if isinstance(error, TimeoutException):
+        return TIMEOUT
+    if isinstance(error, NoSuchElementException):
+        return SELECTOR_MISS
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException, ConnectionError)):
+        return DRIVER_CRASH
+    if any(marker in str(error).lower() for marker in DRIVER_CRASH_MARKERS):
+        return DRIVER_CRASH
+    return UNKNOWN
+
+
+def is_retryable(failure, retries_done):
+    return retries_done < MAX_RETRIES.get(failure, 0)
+
+
+def backoff_delay(failure, retries_done):
+    """Exponential backoff with jitter (between half and all of the full delay)"""
+    delay = min(MAX_DELAY, BASE_DELAY.get(failure, 10.0) * 2 ** retries_done)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class RetryQueue:
+    """Thread-safe queue of items that become ready after a delay"""
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def push(self, item, delay):
+        with self.lock:
+            heapq.heappush(
+                self.heap, (time.time() + delay, next(self.counter), item))
+
+    def pop_ready(self):
+        """Every item whose delay has elapsed"""
+        now = time.time()
+        ready = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                ready.append(heapq.heappop(self.heap)[2])
+        return ready
+
+    def next_ready_in(self):
+        """Seconds until the next item is ready (None if empty)"""
+        with self.lock:
+            if not self.heap:
+                return None
+            return max(0.0, self.heap[0][0] - time.time())
+
+    def __len__(self):
+        with self.lock:
+            return len(self.heap)
+
+
+class DeadLetterFile:
+    """Append-only JSONL record of products that failed for good"""
+
+    def __init__(self, path):
+        self.path = path
+        self.sink = JsonlSink(path, fsync_every=1)
+        self.count = 0
+
+    def add(self, product, failure, error, attempts):
+        self.sink.append({
+            "product_url": product["product_url"],
+            "product_title": product.get("title"),
+            "failure": failure,
+            "error": error,
+            "attempts": attempts,
+            "failed_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+        self.count += 1
+
+    def close(self):
+        self.sink.close()
@@ -1,12 +1,49 @@
 import json
+import os
 import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_resolver import resolve_chromedriver_path
 from selenium.webdriver.chrome.service import Service
+import bazaarvoice_api
+from jsonl_sink import JsonlSink, iter_jsonl, compact_jsonl, seed_jsonl_from_legacy
+from frontier import CrawlFrontier
+from retry_queue import ScrapeFailure, SELECTOR_MISS
+from mongo_sink import open_mongo_sink
+from lean_profile import LEAN_BROWSING, apply_lean_options, enable_lean_browsing, use_stage
+from waits import (wait_until, wait_for_page, any_css_present, review_sections_changed,
+                   get_review_sections_signature, step_timer)
+
+# Append-only checkpoint and the legacy files compacted from it
+REVIEWS_JSONL = "product_reviews.jsonl"
+REVIEWS_FILE = "product_reviews.json"
+RATINGS_FILE = "product_ratings_summary.json"
+# Per-URL crawl state (pending/in_flight/done/failed)
+FRONTIER_FILE = "review_frontier.db"
+
+# Safety net for pagination when the header has no review count
+MAX_REVIEW_PAGES = 500
+
+# "dom" clicks through the review widget in Chrome, "api" reads the
+# Bazaarvoice JSON API directly (needs BV_PASSKEY)
+REVIEW_SOURCE = os.getenv("REVIEW_SOURCE", "dom")
+
+# Incremental re-crawl: re-check finished products and only fetch reviews
+# newer than the last run (products finished less than REFRESH_AFTER_HOURS
+# ago are left alone, so an interrupted refresh resumes where it stopped)
+INCREMENTAL = os.getenv("INCREMENTAL", "").lower() in ("1", "true", "yes")
+REFRESH_AFTER_HOURS = float(os.getenv("REFRESH_AFTER_HOURS", "12"))
+
+# Containers that show up once the review count button has been clicked
+REVIEW_CONTAINER_SELECTORS = [
+    "#reviews_container", "#BVRRContainer", "#BVRRContainer-mobile"]
+
+# Elements that mean the Bazaarvoice summary on a product page is ready
+REVIEW_SUMMARY_SELECTORS = [".bv_numReviews_text",
+                            ".bv_avgRating_component_container"]
 
 
 def setup_driver():
@@ -16,10 +53,15 @@ def setup_driver():
     options.add_argument("--disable-dev-shm-usage")
     # Uncomment the following line if you want it to run without a window
     # options.add_argument("--headless")
+    # LEAN_BROWSING=1 runs headless and skips images, fonts, media and trackers
+    if LEAN_BROWSING:
+        apply_lean_options(options)
 
-    # Use WebDriver Manager to automatically download the correct version
-    service = Service(ChromeDriverManager().install())
+    # Driver path is resolved once per process and cached on disk
+    service = Service(resolve_chromedriver_path())
     driver = webdriver.Chrome(service=service, options=options)
+    if LEAN_BROWSING:
+        enable_lean_browsing(driver, "reviews")
     driver.implicitly_wait(10)
     return driver
 
@@ -136,7 +178,9 @@ def click_on_review_count(driver):
             if result['total_reviews']:
                 print(f"📊 Found total reviews: {result['total_reviews']}")
 
-            time.sleep(3)  # Wait a bit
+            # Wait for the reviews container to appear instead of a fixed sleep
+            wait_until(driver, any_css_present(REVIEW_CONTAINER_SELECTORS),
+                       timeout=10, step_name="review_click")
 
             # Now expand the reviews accordion if we're on mobile view
             print("🔍 Checking if we need to expand reviews accordion...")
@@ -164,7 +208,9 @@ def click_on_review_count(driver):
             accordion_result = driver.execute_script(accordion_script)
             print(f"📱 Accordion action: {accordion_result['action']}")
 
-            time.sleep(3)  # Wait for expansion
+            # Wait for expansion
+            wait_until(driver, reviews_section_loaded,
+                       timeout=10, step_name="review_expand")
             return True, result
         else:
             print(f"⚠️ {result['text']}")
@@ -174,68 +220,52 @@ def click_on_review_count(driver):
         return False, {'average_rating': None, 'total_reviews': None}
 
 
-def wait_for_reviews_section_to_load(driver, timeout=30):
-    """Wait for the reviews section to load after clicking"""
-    print("⏳ Waiting for reviews section to load...")
+def reviews_section_loaded(driver):
+    """Condition: any sign that the reviews section has rendered (single JS round trip)"""
+    try:
+        return driver.execute_script("""
+            // Check for reviews_container first (desktop/expanded mobile)
+            const reviews = document.querySelectorAll("#reviews_container section[id^='bv-review-']");
+            if (reviews.length) {
+                return 'Found ' + reviews.length + ' reviews in reviews_container';
+            }
 
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            # Check for reviews_container first (desktop/expanded mobile)
-            reviews_container = driver.find_element(By.ID, "reviews_container")
-            reviews = reviews_container.find_elements(
-                By.CSS_SELECTOR, "section[id^='bv-review-']")
-            if reviews:
-                print(f"✅ Found {len(reviews)} reviews in reviews_container")
-                return True
-
-        except:
-            pass
-
-        try:
-            # Check for mobile BVRRContainer that's expanded
-            mobile_container = driver.find_element(
-                By.ID, "BVRRContainer-mobile")
-            accordion_panel = mobile_container.find_element(
-                By.CSS_SELECTOR, ".nl-accordion__panel:not(.nl-accordion__panel--hidden)")
-            # If we found an expanded accordion panel, that's good
-            print("✅ Found expanded mobile reviews accordion")
-            return True
-
-        except:
-            pass
-
-        try:
-            # Check for any Bazaarvoice review content
-            bv_elements = driver.find_elements(
-                By.CSS_SELECTOR, "[class*='bv-'], [id*='BV']")
-            review_elements = [el for el in bv_elements if 'review' in el.get_attribute(
-                'class').lower() or 'review' in el.get_attribute('id').lower()]
-            if len(review_elements) > 3:
-                print(
-                    f"✅ Found {len(review_elements)} Bazaarvoice review elements")
-                return True
+            // Check for mobile BVRRContainer that's expanded
+            if (document.querySelector('#BVRRContainer-mobile .nl-accordion__panel:not(.nl-accordion__panel--hidden)')) {
+                return 'Found expanded mobile reviews accordion';
+            }
 
-        except:
-            pass
+            // Check for any Bazaarvoice review content
+            const bvElements = Array.from(document.querySelectorAll("[class*='bv-'], [id*='BV']"));
+            const reviewElements = bvElements.filter(el =>
+                String(el.className).toLowerCase().includes('review') || el.id.toLowerCase().includes('review'));
+            if (reviewElements.length > 3) {
+                return 'Found ' + reviewElements.length + ' Bazaarvoice review elements';
+            }
+
+            // Check for review text indicators
+            const pageText = document.body.innerText.toLowerCase();
+            const indicators = ['verified purchaser', 'days ago', 'weeks ago', 'months ago', 'helpful', 'filter reviews'];
+            const foundIndicators = indicators.filter(indicator => pageText.includes(indicator)).length;
+            if (foundIndicators >= 2) {
+                return 'Found ' + foundIndicators + ' review text indicators';
+            }
 
-        # Check for review text indicators
-        try:
-            page_text = driver.execute_script(
-                "return document.body.innerText.toLowerCase();")
-            indicators = ["verified purchaser", "days ago",
-                          "weeks ago", "months ago", "helpful", "filter reviews"]
-            found_indicators = sum(
-                1 for indicator in indicators if indicator in page_text)
+            return null;
+        """)
+    except Exception:
+        return None
 
-            if found_indicators >= 2:
-                print(f"✅ Found {found_indicators} review text indicators")
-                return True
 
-        except:
-            pass
+def wait_for_reviews_section_to_load(driver, timeout=30):
+    """Wait for the reviews section to load after clicking"""
+    print("⏳ Waiting for reviews section to load...")
 
-        time.sleep(1)
+    found = wait_until(driver, reviews_section_loaded,
+                       timeout=timeout, step_name="reviews_section_load")
+    if found:
+        print(f"✅ {found}")
+        return True
 
     print("⚠️ Timeout waiting for reviews section")
 
@@ -374,16 +404,85 @@ def extract_individual_reviews(driver):
         return []
 
 
-def handle_review_pagination(driver, max_pages=10):
-    """Handle pagination to get all reviews using the specific Next Reviews button"""
-    print(f"📄 Handling pagination (max {max_pages} pages)...")
+def click_next_reviews_page(driver):
+    """Click the Next Reviews button and wait for the next page to render
+
+    Returns True only if a new page of review sections is on screen.
+    """
+    # Remember what is rendered now so we can detect the page swap
+    previous_signature = get_review_sections_signature(driver)
+
+    # Look for Next button using the specific structure you provided
+    next_clicked = driver.execute_script("""
+        // Look for the specific Next Reviews button structure
+        const nextButton = document.querySelector('a.next[role="button"]');
+        if (nextButton && !nextButton.disabled && nextButton.href) {
+            // Scroll to button and click
+            nextButton.scrollIntoView({behavior: 'smooth', block: 'center'});
+            nextButton.click();
+            return true;
+        }
+        
+        // Fallback: Look for any Next button
+        const allButtons = document.querySelectorAll('a, button');
+        for (let button of allButtons) {
+            const text = button.textContent.toLowerCase();
+            if (text.includes('next') && text.includes('review')) {
+                if (!button.disabled && button.style.display !== 'none') {
+                    button.scrollIntoView({behavior: 'smooth', block: 'center'});
+                    button.click();
+                    return true;
+                }
+            }
+        }
+        
+        return false;
+    """)
+
+    if not next_clicked:
+        print("   ⚠️ No more pages - pagination complete")
+        return False
+
+    print("   ✅ Clicked Next Reviews button")
+    # Wait until the review sections are replaced by the next page
+    changed = wait_until(driver, review_sections_changed(previous_signature),
+                         timeout=15, step_name="review_page_change")
+    if not changed:
+        print("   ⚠️ Next page did not render - stopping pagination")
+        return False
+
+    return True
+
+
+def handle_review_pagination(driver, max_pages=None, total_reviews=None, extract_page=None,
+                             stop_at_review_id=None):
+    """Handle pagination to get all reviews using the specific Next Reviews button
+
+    Stops when total_reviews (from click_on_review_count) have been collected,
+    when stop_at_review_id (newest review of the last run) shows up, when
+    there is no next page, or after max_pages (None = only the
+    MAX_REVIEW_PAGES safety cap).
+    """
+    extract_page = extract_page or extract_individual_reviews
+    max_pages = max_pages or MAX_REVIEW_PAGES
+    print(
+        f"📄 Handling pagination (expecting {total_reviews or 'unknown'} reviews, max {max_pages} pages)...")
 
     all_reviews = []
+    seen_review_ids = set()
     page_count = 0
 
     while page_count < max_pages:
         # Extract reviews from current page
-        page_reviews = extract_individual_reviews(driver)
+        page_reviews = [r for r in extract_page(driver)
+                        if r['review_id'] not in seen_review_ids]
+        seen_review_ids.update(r['review_id'] for r in page_reviews)
+
+        # Everything from the last run's newest review on is already stored
+        page_ids = [r['review_id'] for r in page_reviews]
+        reached_known = stop_at_review_id is not None and stop_at_review_id in page_ids
+        if reached_known:
+            page_reviews = page_reviews[:page_ids.index(stop_at_review_id)]
 
         if page_reviews:
             all_reviews.extend(page_reviews)
@@ -411,54 +510,64 @@ def handle_review_pagination(driver, max_pages=10):
         if pagination_info:
             print(f"   Pagination: {pagination_info}")
 
-        # Look for Next button using the specific structure you provided
-        next_clicked = driver.execute_script("""
-            // Look for the specific Next Reviews button structure
-            const nextButton = document.querySelector('a.next[role="button"]');
-            if (nextButton && !nextButton.disabled && nextButton.href) {
-                // Scroll to button and click
-                nextButton.scrollIntoView({behavior: 'smooth', block: 'center'});
-                nextButton.click();
-                return true;
-            }
-            
-            // Fallback: Look for any Next button
-            const allButtons = document.querySelectorAll('a, button');
-            for (let button of allButtons) {
-                const text = button.textContent.toLowerCase();
-                if (text.includes('next') && text.includes('review')) {
-                    if (!button.disabled && button.style.display !== 'none') {
-                        button.scrollIntoView({behavior: 'smooth', block: 'center'});
-                        button.click();
-                        return true;
-                    }
-                }
-            }
-            
-            return false;
-        """)
+        if reached_known:
+            print("   ✅ Reached reviews collected in the last run")
+            break
 
-        if next_clicked:
-            print("   ✅ Clicked Next Reviews button")
-            time.sleep(4)  # Wait for next page to load
-            page_count += 1
-        else:
-            print("   ⚠️ No more pages - pagination complete")
+        # Stop as soon as the header count is reached
+        if total_reviews and len(all_reviews) >= total_reviews:
+            print(f"   ✅ Collected all {total_reviews} reviews")
             break
 
+        if not click_next_reviews_page(driver):
+            break
+        page_count += 1
+
     print(
         f"📄 Pagination complete: {len(all_reviews)} total reviews from {page_count + 1} pages")
 
     return all_reviews
 
 
-def extract_reviews_from_product(driver, product_url):
-    """Extract all reviews from a product page using the specific Canadian Tire flow"""
+def review_snapshot(reviews, rating_summary, previous=None):
+    """What to remember about a product's reviews for the next incremental run"""
+    snapshot = {
+        'total_reviews': rating_summary.get('total_reviews'),
+        'average_rating': rating_summary.get('average_rating'),
+        'newest_review_id': None,
+        'newest_review_date': None
+    }
+    # Reviews are listed newest first; keep the old marker if nothing is new
+    if reviews:
+        snapshot['newest_review_id'] = reviews[0].get('review_id')
+        snapshot['newest_review_date'] = reviews[0].get('date')
+    elif previous:
+        snapshot['newest_review_id'] = previous.get('newest_review_id')
+        snapshot['newest_review_date'] = previous.get('newest_review_date')
+    return snapshot
+
+
+def reviews_unchanged(previous, rating_summary):
+    """True when the header count and average match the last run"""
+    return (previous is not None and rating_summary.get('total_reviews') is not None
+            and previous.get('total_reviews') == rating_summary.get('total_reviews')
+            and previous.get('average_rating') == rating_summary.get('average_rating'))
+
+
+def extract_reviews_from_product(driver, product_url, previous=None):
+    """Extract all reviews from a product page using the specific Canadian Tire flow
+
+    With `previous` (a snapshot from the last run) only newer reviews are
+    collected, and nothing at all if the header count and rating are the same.
+    Raises when the page reports reviews but the review widget cannot be read.
+    """
     print(f"Extracting reviews from: {product_url}")
+    use_stage(driver, "reviews")
     driver.get(product_url)
 
-    # Wait for the page to load
-    time.sleep(5)
+    # Wait for the Bazaarvoice summary to render
+    wait_for_page(driver, REVIEW_SUMMARY_SELECTORS,
+                  step_name="product_page_load")
 
     reviews = []
     product_rating_summary = {
@@ -479,20 +588,41 @@ def extract_reviews_from_product(driver, product_url):
                 'has_reviews': True
             }
 
+        if reviews_unchanged(previous, product_rating_summary):
+            print("⏭️ Review count and rating unchanged since the last run")
+            product_rating_summary['unchanged'] = True
+            return reviews, product_rating_summary
+
         if not review_section_opened:
-            print("❌ Could not open reviews section")
-            # Still return the product rating summary even if we can't get individual reviews
+            # A product without reviews has no button; one with reviews must not pass as empty
+            if product_rating_summary.get('total_reviews'):
+                raise ScrapeFailure(
+                    SELECTOR_MISS, "could not open reviews section")
+            print("ℹ️ No reviews section to open")
             return reviews, product_rating_summary
 
         # Step 2: Wait for reviews section to load
         reviews_loaded = wait_for_reviews_section_to_load(driver)
 
         if not reviews_loaded:
-            print("❌ Reviews section did not load properly")
-            return reviews, product_rating_summary
-
-        # Step 3: Extract reviews with pagination
-        reviews = handle_review_pagination(driver, max_pages=3)
+            raise ScrapeFailure(
+                SELECTOR_MISS, "reviews section did not load")
+
+        # Step 3: Extract reviews with pagination until the header count is reached
+        # (incremental: until the new reviews are in or a known review shows up)
+        expected_reviews = product_rating_summary.get('total_reviews')
+        stop_at_review_id = None
+        if previous:
+            stop_at_review_id = previous.get('newest_review_id')
+            if expected_reviews and previous.get('total_reviews') and expected_reviews > previous['total_reviews']:
+                expected_reviews -= previous['total_reviews']
+        reviews = handle_review_pagination(
+            driver, total_reviews=expected_reviews, stop_at_review_id=stop_at_review_id)
+        # The known review on screen means nothing newer was missed, even if
+        # the count went up (a review was removed and another one added)
+        if stop_at_review_id and driver.execute_script(
+                "return !!document.getElementById(arguments[0]);", stop_at_review_id):
+            product_rating_summary['reached_known_review'] = True
 
         # Add product URL to each review
         for review in reviews:
@@ -509,55 +639,40 @@ def extract_reviews_from_product(driver, product_url):
                     f"   Greg review by {review['reviewer']}: {review['body'][:100]}...")
 
     except Exception as e:
+        # Raised so the caller can mark the product failed instead of done
         print(f"❌ Error in extract_reviews_from_product: {e}")
+        raise
 
     return reviews, product_rating_summary
 
 
-def save_reviews_to_file(all_reviews, filename="product_reviews.json"):
-    """Save reviews to JSON file"""
-    try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(all_reviews, f, ensure_ascii=False, indent=2)
-        print(f"Reviews saved to {filename}")
-    except Exception as e:
-        print(f"Error saving reviews: {e}")
+def missing_reviews(reviews, rating_summary, previous=None):
+    """Reviews the header announces (new ones, when incremental) that were not extracted
 
+    Nothing is missing once the newest review of the last run was reached:
+    the count can change without new reviews when some were removed.
+    """
+    if rating_summary.get('reached_known_review'):
+        return 0
+    expected = rating_summary.get('total_reviews') or 0
+    if previous and previous.get('total_reviews'):
+        expected -= previous['total_reviews']
+    return max(expected, 0) if not reviews else 0
 
-def save_product_ratings_to_file(product_ratings, filename="product_ratings_summary.json"):
-    """Save product rating summaries to JSON file"""
-    try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(product_ratings, f, ensure_ascii=False, indent=2)
-        print(f"Product ratings summary saved to {filename}")
-    except Exception as e:
-        print(f"Error saving product ratings: {e}")
 
+def products_with_retry_pass(products, frontier):
+    """(label, product) for every product, then once more for those that failed this run"""
+    for i, product in enumerate(products):
+        yield f"{i+1}/{len(products)}", product
 
-def load_existing_product_ratings(filename="product_ratings_summary.json"):
-    """Load existing product ratings from JSON file if it exists"""
-    try:
-        with open(filename, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"No existing {filename} found. Starting fresh.")
-        return {}
-    except Exception as e:
-        print(f"Error loading existing product ratings: {e}")
-        return {}
-
-
-def load_existing_reviews(filename="product_reviews.json"):
-    """Load existing reviews from JSON file if it exists"""
-    try:
-        with open(filename, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"No existing {filename} found. Starting fresh.")
-        return []
-    except Exception as e:
-        print(f"Error loading existing reviews: {e}")
-        return []
+    failed = {url for url, attempts, _ in frontier.failed_urls()
+              if attempts < frontier.max_attempts}
+    retry_products = [p for p in products if p["product_url"] in failed]
+    if retry_products:
+        print(
+            f"\n🔁 Retrying {len(retry_products)} products that failed in this run")
+    for i, product in enumerate(retry_products):
+        yield f"retry {i+1}/{len(retry_products)}", product
 
 
 def main():
@@ -570,42 +685,98 @@ def main():
         print("Error: productos_scraped_v0.json not found. Please run the product scraper first.")
         return
 
-    # Load existing reviews and product ratings (in case we're resuming)
-    all_reviews = load_existing_reviews()
-    product_ratings = load_existing_product_ratings()
-
-    # Get URLs that have already been processed
-    processed_urls = set([review["product_url"] for review in all_reviews])
-
-    driver = setup_driver()
+    # Runs made before the JSONL checkpoint existed can still be resumed
+    seed_jsonl_from_legacy(REVIEWS_JSONL, REVIEWS_FILE, RATINGS_FILE)
+
+    # Per-URL crawl state; on first use, import progress from the checkpoint
+    is_new_frontier = not os.path.exists(FRONTIER_FILE)
+    frontier = CrawlFrontier(FRONTIER_FILE)
+    if is_new_frontier:
+        frontier.mark_many_done(record["product_url"]
+                                for record in iter_jsonl(REVIEWS_JSONL))
+    frontier.add_urls(product["product_url"] for product in products)
+    # Products a crashed run had in flight are scraped again now
+    frontier.release_dead_leases()
+
+    if INCREMENTAL:
+        # Snapshots for products scraped before incremental mode existed
+        if not frontier.has_snapshots():
+            frontier.save_snapshots(
+                (record["product_url"], review_snapshot(record.get("reviews", []), record.get("rating") or {}))
+                for record in iter_jsonl(REVIEWS_JSONL))
+        requeued = frontier.requeue_done(REFRESH_AFTER_HOURS * 3600)
+        print(f"🔄 Incremental mode: re-checking {requeued} finished products")
+
+    worker_id = f"review_scraper-{os.getpid()}"
+    total_reviews = 0
+    unchanged_count = 0
+
+    use_api = REVIEW_SOURCE == "api"
+    if use_api and not bazaarvoice_api.is_configured():
+        print("❌ REVIEW_SOURCE=api requires BV_PASSKEY. Falling back to the browser.")
+        use_api = False
+
+    driver = None if use_api else setup_driver()
+    sink = JsonlSink(REVIEWS_JSONL)
+    mongo_sink = open_mongo_sink()
 
     try:
         print(f"Processing {len(products)} products for reviews...")
-        if processed_urls:
-            print(
-                f"Found {len(processed_urls)} already processed products. Continuing from where we left off...")
+        frontier.print_stats()
 
-        # Process each product
-        for i, product in enumerate(products):
+        # Process each product, then give this run's failures one more try
+        for label, product in products_with_retry_pass(products, frontier):
             product_url = product["product_url"]
 
-            # Skip if already processed
-            if product_url in processed_urls:
+            # Skip if already processed (or leased by another live worker)
+            if not frontier.claim_url(product_url, worker_id):
                 print(
-                    f"\n=== Skipping product {i+1}/{len(products)} (already processed) ===")
+                    f"\n=== Skipping product {label} (already processed) ===")
                 print(f"Product: {product['title']}")
                 continue
 
-            print(f"\n=== Processing product {i+1}/{len(products)} ===")
+            print(f"\n=== Processing product {label} ===")
             print(f"Product: {product['title']}")
 
-            # Extract reviews and rating summary from product page
-            reviews, rating_summary = extract_reviews_from_product(
-                driver, product_url)
+            # What the last run saw; None means scrape everything
+            previous = frontier.get_snapshot(
+                product_url) if INCREMENTAL else None
+
+            # Extract reviews and rating summary from the API or the product page
+            try:
+                if use_api and previous and previous.get('newest_review_id'):
+                    reviews, rating_summary = bazaarvoice_api.fetch_new_reviews(
+                        product_url, previous['newest_review_id'])
+                elif use_api:
+                    reviews, rating_summary = bazaarvoice_api.fetch_all_reviews(
+                        product_url)
+                else:
+                    reviews, rating_summary = extract_reviews_from_product(
+                        driver, product_url, previous)
+            except Exception as e:
+                print(f"❌ Error processing product: {e}")
+                frontier.mark_failed(product_url, str(e))
+                continue
+
+            # The header counts reviews the page did not give us: retry later
+            missing = missing_reviews(reviews, rating_summary, previous)
+            if missing:
+                print(f"❌ {missing} reviews expected, none extracted")
+                frontier.mark_failed(
+                    product_url, f"0 of {missing} reviews extracted")
+                continue
+
+            if reviews_unchanged(previous, rating_summary) and not reviews:
+                frontier.save_snapshot(
+                    product_url, review_snapshot([], rating_summary, previous))
+                frontier.mark_done(product_url)
+                unchanged_count += 1
+                continue
 
             # Store the product rating summary
+            product_rating = None
             if rating_summary.get('has_reviews'):
-                product_ratings[product_url] = {
+                product_rating = {
                     'product_title': product['title'],
                     'product_url': product_url,
                     'average_rating': rating_summary.get('average_rating'),
@@ -614,35 +785,56 @@ def main():
                     'extracted_at': time.strftime('%Y-%m-%d %H:%M:%S')
                 }
 
-            # Add new reviews to the collection
-            all_reviews.extend(reviews)
+            # Append this product's results to the checkpoint (no full rewrite);
+            # incremental records only carry the new reviews
+            record = {
+                "product_url": product_url,
+                "product_title": product['title'],
+                "reviews": reviews,
+                "rating": product_rating
+            }
+            if previous:
+                record["incremental"] = True
+            sink.append(record)
+            if mongo_sink:
+                mongo_sink.add_reviews(reviews)
+                if product_rating:
+                    mongo_sink.add_rating(product_url, product_rating)
+            # The snapshot makes the next run skip what it describes, so it is
+            # only saved once the reviews are on disk (failures never get here)
+            sink.flush()
+            frontier.save_snapshot(
+                product_url, review_snapshot(reviews, rating_summary, previous))
+            frontier.mark_done(product_url)
+            total_reviews += len(reviews)
 
             print(f"Found {len(reviews)} individual reviews for this product")
             if rating_summary.get('has_reviews'):
                 print(
                     f"Product rating: {rating_summary.get('average_rating')} stars ({rating_summary.get('total_reviews')} total reviews)")
-            print(f"Total reviews so far: {len(all_reviews)}")
-
-            # Save after each product to avoid data loss
-            save_reviews_to_file(all_reviews)
-            save_product_ratings_to_file(product_ratings)
-
-            # Small pause between products
-            time.sleep(2)
+            print(f"Total reviews this run: {total_reviews}")
 
         print(f"\n=== REVIEW EXTRACTION COMPLETED ===")
-        print(f"Total individual reviews extracted: {len(all_reviews)}")
-        print(f"Total products with rating summaries: {len(product_ratings)}")
-        print(f"Results saved to: product_reviews.json and product_ratings_summary.json")
+        print(f"Total individual reviews extracted this run: {total_reviews}")
+        if INCREMENTAL:
+            print(f"Unchanged products skipped: {unchanged_count}")
+        frontier.print_stats()
+        step_timer.report()
 
     except Exception as e:
         print(f"Error in main process: {e}")
-        # Save whatever we have collected so far
-        save_reviews_to_file(all_reviews)
-        save_product_ratings_to_file(product_ratings)
 
     finally:
-        driver.quit()
+        if driver:
+            driver.quit()
+
+        # Whatever was collected is already on disk; rebuild the legacy files
+        sink.close()
+        if mongo_sink:
+            mongo_sink.close()
+        frontier.close()
+        compact_jsonl(REVIEWS_JSONL, REVIEWS_FILE, RATINGS_FILE)
+        print(f"Results saved to: {REVIEWS_FILE} and {RATINGS_FILE}")
 
 
 if __name__ == "__main__":
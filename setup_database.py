@@ -1,10 +1,16 @@
+import argparse
+import hashlib
 import json
 import os
+import time
 import pymongo
 from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
 from pymongo.server_api import ServerApi
 from pymongo.mongo_client import MongoClient
 from dotenv import load_dotenv
+from clean_products import clean_review
 
 load_dotenv()
 
@@ -14,48 +20,270 @@ uri = "mongodb+srv://alejandrocanomn:" + \
     "@cluster0.vlqder.mongodb.net/?retryWrites=true&w=majority&appName=Cluster0"
 
 
-def load_data_simple():
-    """Simple MongoDB loader - separate collections"""
+# Documents per unordered bulk_write
+LOAD_BATCH_SIZE = 1000
+DUPLICATE_KEY_ERROR = 11000
 
-    # Connect to MongoDB
-    client = MongoClient(
-        uri, server_api=ServerApi('1'))
-    db = client.canadian_tire_scraper
+# Fields that change on every clean/scrape run without the content changing
+VOLATILE_FIELDS = {"_id", "created_at", "updated_at", "content_hash"}
+# Fields the NLP and sentiment steps add to stored reviews
+DERIVED_FIELDS = {"sentences", "words", "nlp_processed_at", "nlp_concatenated",
+                  "nlp_text_used", "sentiment_analysis", "sentiment_updated_at"}
+
+INDEXES = {
+    "products": [("product_id", True)],
+    "reviews": [("review_id", True), ("product_id", False), ("reviewer", False)]
+}
+
+
+def content_hash(doc):
+    """Stable hash of a document's content (volatile fields left out)"""
+    content = {k: v for k, v in doc.items() if k not in VOLATILE_FIELDS}
+    encoded = json.dumps(content, sort_keys=True,
+                         ensure_ascii=False, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def review_content_id(review):
+    """review_id for a review scraped without one, derived from its content"""
+    return "content-" + content_hash(review)[:16]
+
+
+def prepare_reviews(reviews):
+    """Reviews with product_id attached and a review_id to upsert on
+
+    Reviews scraped without an id get one derived from their content.
+    """
+    for review in reviews:
+        review = clean_review(review)
+        if not review.get("review_id"):
+            review["review_id"] = review_content_id(review)
+        yield review
+
+
+def stored_review_id(doc):
+    """The id prepare_reviews gives the review a stored document was loaded from"""
+    return review_content_id(clean_review(
+        {k: v for k, v in doc.items() if k not in DERIVED_FIELDS}))
+
+
+# How to fill in a missing key on a document stored by the old loader
+KEY_BACKFILLS = {"reviews": stored_review_id}
+
+
+def has_unique_index(collection, field):
+    return any(index.get("unique") and index["key"] == [(field, 1)]
+               for index in collection.index_information().values())
+
+
+def prepare_unique_index(collection, name, key, batch_size=LOAD_BATCH_SIZE):
+    """Backfill missing keys and drop duplicates so a unique index on key can be built
+
+    The old loader inserted reviews as they were, some without a review_id
+    and some more than once. Missing ids are filled in the way
+    prepare_reviews derives them, so the next upsert matches the document;
+    of several documents with the same key the first one is kept.
+    Returns (keys backfilled, duplicates removed).
+    """
+    if has_unique_index(collection, key):
+        return 0, 0
+
+    backfilled = 0
+    backfill = KEY_BACKFILLS.get(name)
+    if backfill:
+        operations = [UpdateOne({"_id": doc["_id"]}, {"$set": {key: backfill(doc)}})
+                      for doc in collection.find({key: {"$in": [None, ""]}})]
+        for i in range(0, len(operations), batch_size):
+            backfilled += collection.bulk_write(
+                operations[i:i + batch_size], ordered=False).modified_count
+
+    extra_ids = []
+    for group in collection.aggregate([
+            {"$match": {key: {"$nin": [None, ""]}}},
+            {"$group": {"_id": f"${key}", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}}], allowDiskUse=True):
+        extra_ids.extend(sorted(group["ids"])[1:])
+    removed = 0
+    for i in range(0, len(extra_ids), batch_size):
+        removed += collection.delete_many(
+            {"_id": {"$in": extra_ids[i:i + batch_size]}}).deleted_count
+
+    if backfilled or removed:
+        print(f"🧹 {name}: {backfilled} missing {key}s filled in, "
+              f"{removed} duplicate documents removed before the unique index")
+    return backfilled, removed
+
+
+def ensure_indexes(collection, name):
+    """Create the indexes the loader upserts against (no-op if they exist)"""
+    for field, unique in INDEXES[name]:
+        collection.create_index(field, unique=unique)
+
+
+def upsert_changed(collection, docs, key, batch_size=LOAD_BATCH_SIZE, prune=False):
+    """Upsert only new or changed documents, in unordered bulk batches
+
+    For each batch the stored hashes are read with one projected $in query
+    and compared with the hashes of the incoming documents; unchanged
+    documents are not sent. A key seen earlier in docs is a duplicate and
+    is skipped (the first one wins). $set keeps fields the loader does not
+    own (NLP, sentiment). With prune, documents whose key is not in docs
+    are deleted. Counts come from the BulkWriteResult of each batch.
+    Returns (inserted, updated, unchanged, deleted, duplicates).
+    """
+    inserted = updated = unchanged = duplicates = failed = 0
+    seen = set()
+    batch = {}
+    now = datetime.now().isoformat()
+
+    def _write():
+        nonlocal inserted, updated, unchanged, failed
+        if not batch:
+            return
+        existing = {doc[key]: doc.get("content_hash")
+                    for doc in collection.find({key: {"$in": list(batch)}},
+                                               {key: 1, "content_hash": 1, "_id": 0})}
+        operations = []
+        for doc_key, (doc, digest) in batch.items():
+            if existing.get(doc_key) == digest:
+                unchanged += 1
+                continue
+            fields = {k: v for k, v in doc.items() if k not in VOLATILE_FIELDS}
+            operations.append(UpdateOne(
+                {key: doc_key},
+                {"$set": {**fields, "content_hash": digest, "updated_at": now},
+                 "$setOnInsert": {"created_at": doc.get("created_at") or now}},
+                upsert=True))
+        batch.clear()
+        if not operations:
+            return
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            inserted += result.upserted_count
+            updated += result.modified_count
+        except BulkWriteError as e:
+            # Unordered: everything except the failed operations was applied
+            inserted += e.details.get("nUpserted", 0)
+            updated += e.details.get("nModified", 0)
+            failed += len(e.details.get("writeErrors", []))
 
-    print("🚀 Loading data to MongoDB (Simple approach)...")
+    for doc in docs:
+        doc_key = doc[key]
+        if doc_key in seen:
+            duplicates += 1
+            continue
+        seen.add(doc_key)
+        batch[doc_key] = (doc, content_hash(doc))
+        if len(batch) >= batch_size:
+            _write()
+    _write()
+
+    if failed:
+        print(f"⚠️ {collection.name}: {failed} upserts failed")
+
+    deleted = 0
+    if prune:
+        stale = [doc[key] for doc in collection.find({}, {key: 1, "_id": 0})
+                 if key in doc and doc[key] not in seen]
+        for i in range(0, len(stale), batch_size):
+            deleted += collection.delete_many(
+                {key: {"$in": stale[i:i + batch_size]}}).deleted_count
+
+    return inserted, updated, unchanged, deleted, duplicates
+
+
+def load_via_staging(db, name, docs, key, batch_size=LOAD_BATCH_SIZE):
+    """Rebuild a collection in <name>_staging and swap it in with renameCollection
+
+    Readers see the old collection until the rename. This is a full
+    rebuild from the file: fields added later (NLP, sentiment) are not
+    carried over. Duplicate keys in docs are skipped (the first one wins)
+    so the unique index does not abort the load.
+    Returns (documents loaded, duplicates skipped).
+    """
+    staging = db[f"{name}_staging"]
+    staging.drop()
+    ensure_indexes(staging, name)
+
+    count = duplicates = 0
+    seen = set()
+    batch = []
+
+    def _insert():
+        nonlocal count, duplicates
+        if not batch:
+            return
+        try:
+            staging.insert_many(batch, ordered=False)
+            count += len(batch)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            # Only duplicate keys are expected; anything else aborts before the swap
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            count += e.details.get("nInserted", 0)
+            duplicates += len(errors)
+        batch.clear()
+
+    for doc in docs:
+        if doc.get(key) in seen:
+            duplicates += 1
+            continue
+        seen.add(doc.get(key))
+        batch.append({**doc, "content_hash": content_hash(doc)})
+        if len(batch) >= batch_size:
+            _insert()
+    _insert()
+
+    staging.rename(name, dropTarget=True)
+    return count, duplicates
+
+
+def load_collection(db, name, docs, key, staging=False, prune=False):
+    if staging:
+        count, duplicates = load_via_staging(db, name, docs, key)
+        print(f"✅ {name}: {count} documents swapped in from staging"
+              f"{f' ({duplicates} duplicates skipped)' if duplicates else ''}")
+        return
+
+    collection = db[name]
+    prepare_unique_index(collection, name, INDEXES[name][0][0])
+    try:
+        ensure_indexes(collection, name)
+    except OperationFailure as e:
+        if e.code != DUPLICATE_KEY_ERROR:
+            raise
+        print(f"❌ {name}: duplicate keys left in the collection, cannot build the unique index "
+              f"({e}). Run again with --staging to rebuild it from the file.")
+        raise
+    start_time = time.time()
+    inserted, updated, unchanged, deleted, duplicates = upsert_changed(
+        collection, docs, key, prune=prune)
+    print(f"✅ {name}: {inserted} inserted, {updated} updated, {unchanged} unchanged"
+          f"{f', {deleted} deleted' if prune else ''}"
+          f"{f', {duplicates} duplicates skipped' if duplicates else ''} ({time.time() - start_time:.1f}s)")
+
+
+def load_data(db, staging=False, prune=False):
+    """Load the cleaned products and reviews, touching only what changed"""
+    print("🚀 Loading data to MongoDB (incremental upserts)..."
+          if not staging else "🚀 Loading data to MongoDB (staging + rename)...")
 
     # 1. Load Products
     with open("productos_cleaned.json", "r", encoding="utf-8") as f:
         products = json.load(f)
-
-    # Clear existing data
-    db.products.delete_many({})
-
-    # Insert products
-    db.products.insert_many(products)
-    print(f"✅ Loaded {len(products)} products")
+    load_collection(db, "products", products, "product_id",
+                    staging=staging, prune=prune)
 
     # 2. Load Reviews (if exists)
     try:
         with open("product_reviews.json", "r", encoding="utf-8") as f:
             reviews = json.load(f)
-
-        # Clear existing reviews
-        db.reviews.delete_many({})
-
-        # Insert reviews
-        if reviews:
-            db.reviews.insert_many(reviews)
-            print(f"✅ Loaded {len(reviews)} reviews")
+        load_collection(db, "reviews", prepare_reviews(reviews), "review_id",
+                        staging=staging, prune=prune)
     except FileNotFoundError:
         print("⚠️ No reviews file found, skipping reviews")
 
-    # 3. Simple indexes
-    db.products.create_index("product_id", unique=True)
-    db.reviews.create_index("product_id")
-    db.reviews.create_index("reviewer")
-
-    print("✅ Simple indexes created")
     print("🎉 Data loading complete!")
 
     # Show summary
@@ -63,8 +291,27 @@ def load_data_simple():
     print(f"   Products: {db.products.count_documents({})}")
     print(f"   Reviews: {db.reviews.count_documents({})}")
 
-    client.close()
+
+def load_data_simple(staging=False, prune=False):
+    """Simple MongoDB loader - separate collections"""
+
+    # Connect to MongoDB
+    client = MongoClient(
+        uri, server_api=ServerApi('1'))
+    db = client.canadian_tire_scraper
+
+    try:
+        load_data(db, staging=staging, prune=prune)
+    finally:
+        client.close()
 
 
 if __name__ == "__main__":
-    load_data_simple()
+    parser = argparse.ArgumentParser(
+        description="Load the cleaned JSON files into MongoDB")
+    parser.add_argument("--staging", action="store_true",
+                        help="rebuild each collection in a staging collection and swap it in")
+    parser.add_argument("--prune", action="store_true",
+                        help="delete documents that are no longer in the files")
+    args = parser.parse_args()
+    load_data_simple(staging=args.staging, prune=args.prune)
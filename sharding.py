@@ -0,0 +1,143 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from adaptive_concurrency import DOMAIN_RATE
+from clean_products import extract_product_id
+from jsonl_sink import compact_jsonl
+
+
+def shard_key(product):
+    """Stable key for a product: its product_id, or the URL if none can be extracted"""
+    product_url = product.get("product_url", "")
+    return extract_product_id(product_url) or product_url
+
+
+def shard_for_product(product, num_shards):
+    """Deterministic shard index (same on every machine and Python run)"""
+    digest = hashlib.md5(shard_key(product).encode("utf-8")).hexdigest()
+    return int(digest, 16) % num_shards
+
+
+def select_shard(products, shard_index, num_shards):
+    """Products that belong to one shard"""
+    return [p for p in products if shard_for_product(p, num_shards) == shard_index]
+
+
+def shard_suffix(shard_index, num_shards):
+    """File name suffix used by every output of a shard"""
+    return f"_shard{shard_index}of{num_shards}"
+
+
+def split_products_file(input_file, num_shards, output_dir="."):
+    """Write one products file per shard (to copy to other machines)"""
+    with open(input_file, "r", encoding="utf-8") as f:
+        products = json.load(f)
+
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    paths = []
+    for shard_index in range(num_shards):
+        shard_products = select_shard(products, shard_index, num_shards)
+        path = os.path.join(
+            output_dir, f"{base_name}{shard_suffix(shard_index, num_shards)}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(shard_products, f, ensure_ascii=False, indent=2)
+        print(f"📦 Shard {shard_index}: {len(shard_products)} products -> {path}")
+        paths.append(path)
+    return paths
+
+
+def run_local_shards(num_shards, workers_per_shard=3, products_file="productos_scraped_v0.json",
+                     max_workers=8, domain_rate=DOMAIN_RATE):
+    """Run one paralizado.py process per shard on this machine and wait for all
+
+    max_workers is the browser ceiling for the whole machine and is split
+    between the shards; each shard divides domain_rate by the shard count.
+    """
+    shard_max_workers = max(1, max_workers // num_shards)
+    processes = []
+    for shard_index in range(num_shards):
+        command = [sys.executable, "paralizado.py",
+                   "--shard", str(shard_index),
+                   "--num-shards", str(num_shards),
+                   "--workers", str(min(workers_per_shard, shard_max_workers)),
+                   "--max-workers", str(shard_max_workers),
+                   "--domain-rate", str(domain_rate),
+                   "--products", products_file]
+        print(f"🚀 Starting shard {shard_index}: {' '.join(command)}")
+        processes.append(subprocess.Popen(command))
+
+    failed = 0
+    for shard_index, process in enumerate(processes):
+        if process.wait() != 0:
+            print(f"❌ Shard {shard_index} exited with code {process.returncode}")
+            failed += 1
+    return failed
+
+
+def merge_shard_outputs(jsonl_files, reviews_file="product_reviews_parallel.json",
+                        ratings_file="product_ratings_parallel.json"):
+    """Merge shard checkpoints into the legacy files
+
+    Same rules as compacting one checkpoint: the latest full record of a
+    product wins and incremental records are added to it.
+    """
+    review_count, rating_count = compact_jsonl(
+        jsonl_files, reviews_file, ratings_file)
+    print(f"🔗 Merged {len(jsonl_files)} shards: {review_count} reviews, {rating_count} ratings")
+    return review_count
+
+
+def shard_jsonl_files(num_shards, directory="."):
+    """Checkpoint files produced by paralizado.py for each shard"""
+    return [os.path.join(directory, f"product_reviews_parallel{shard_suffix(i, num_shards)}.jsonl")
+            for i in range(num_shards)]
+
+
+def main():
+    """split / run / merge the sharded review scrape"""
+    parser = argparse.ArgumentParser(
+        description="Shard the review scrape across processes or machines")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    split_parser = subparsers.add_parser(
+        "split", help="write one products file per shard")
+    split_parser.add_argument("--num-shards", type=int, required=True)
+    split_parser.add_argument("--products", default="productos_scraped_v0.json")
+    split_parser.add_argument("--output-dir", default=".")
+
+    run_parser = subparsers.add_parser(
+        "run", help="run every shard as a local process, then merge")
+    run_parser.add_argument("--num-shards", type=int, default=os.cpu_count())
+    run_parser.add_argument("--workers", type=int, default=3,
+                            help="starting browsers per shard")
+    run_parser.add_argument("--max-workers", type=int, default=8,
+                            help="browser ceiling for all shards on this machine")
+    run_parser.add_argument("--domain-rate", type=float, default=DOMAIN_RATE,
+                            help="page requests per second to one domain, for all shards")
+    run_parser.add_argument("--products", default="productos_scraped_v0.json")
+
+    merge_parser = subparsers.add_parser(
+        "merge", help="merge shard checkpoints copied into one directory")
+    merge_parser.add_argument("--num-shards", type=int, required=True)
+    merge_parser.add_argument("--input-dir", default=".")
+
+    args = parser.parse_args()
+
+    if args.command == "split":
+        split_products_file(args.products, args.num_shards, args.output_dir)
+    elif args.command == "run":
+        failed = run_local_shards(args.num_shards, args.workers, args.products,
+                                  args.max_workers, args.domain_rate)
+        merge_shard_outputs(shard_jsonl_files(args.num_shards))
+        if failed:
+            print(f"⚠️ {failed} shards failed; rerun them to resume from their frontier")
+    elif args.command == "merge":
+        merge_shard_outputs(shard_jsonl_files(
+            args.num_shards, args.input_dir))
+
+
+if __name__ == "__main__":
+    main()
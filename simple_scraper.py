@@ -1,12 +1,23 @@
 import json
+import math
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_resolver import resolve_chromedriver_path
 from selenium.webdriver.chrome.service import Service
+from waits import wait_for_page, wait_until, step_timer, SEARCH_READY_SELECTORS
+from driver_pool import DriverPool
+from clean_products import extract_product_id
+from lean_profile import LEAN_BROWSING, apply_lean_options, enable_lean_browsing, use_stage
+from http_fetch import FETCH_BACKEND, fetch_product_details_http, has_required_fields
+from http_cache import HTTP_CACHE_MODE, RENDERED_PREFIX, get_http_cache, load_rendered_snapshot
+from mongo_sink import open_mongo_sink
 
 # List of search URLs
 search_urls = [
@@ -28,6 +39,24 @@ search_urls = [
     "https://www.canadiantire.ca/en/search-results.html?q=home+improvement"
 ]
 
+# Selectors tried (in order) to find product cards on a search page
+PRODUCT_CARD_SELECTORS = [
+    "article",
+    "[data-testid*='product']",
+    ".product-card",
+    ".product-tile",
+    "[class*='product']"
+]
+
+# Query-string parameter the search page uses for result pages
+SEARCH_PAGE_PARAM = os.getenv("SEARCH_PAGE_PARAM", "page")
+# Extra headless browsers used to load result pages 3..N of a query
+# concurrently (1 = load them one by one in the main browser)
+LISTING_WORKERS = int(os.getenv("LISTING_WORKERS", "1"))
+# Safety cap on result pages (or scroll rounds) per query
+MAX_SEARCH_PAGES = 50
+COVERAGE_FILE = "search_coverage.json"
+
 
 def setup_driver():
     """Configure Chrome driver with optimized options"""
@@ -36,128 +65,166 @@ def setup_driver():
     options.add_argument("--disable-dev-shm-usage")
     # Uncomment the following line if you want it to run without a window
     # options.add_argument("--headless")
+    # LEAN_BROWSING=1 runs headless and skips images, fonts, media and trackers
+    if LEAN_BROWSING:
+        apply_lean_options(options)
+
+    # Driver path is resolved once per process and cached on disk
+    service = Service(resolve_chromedriver_path())
+    driver = webdriver.Chrome(service=service, options=options)
+    if LEAN_BROWSING:
+        enable_lean_browsing(driver, "search")
+    driver.implicitly_wait(10)
+    return driver
+
+
+def setup_listing_driver():
+    """Headless lean browser for the listing pool (never opens a window)"""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    apply_lean_options(options)
 
-    # Use WebDriver Manager to automatically download the correct version
-    service = Service(ChromeDriverManager().install())
+    service = Service(resolve_chromedriver_path())
     driver = webdriver.Chrome(service=service, options=options)
+    enable_lean_browsing(driver, "search")
     driver.implicitly_wait(10)
     return driver
 
 
 def extract_products_from_search(driver, search_url):
-    """Extract all products from a search page"""
+    """Extract all products rendered on one search page"""
     print(f"Accessing: {search_url}")
-    driver.get(search_url)
+    use_stage(driver, "search")
+
+    if not load_search_page(driver, search_url):
+        return []
+    return extract_search_cards(driver, search_url)
+
+
+def load_search_page(driver, search_url):
+    """Show a search page in the browser, from the cache when possible
+
+    Returns False only when replay mode has no snapshot of the page.
+    """
+    # Search pages are rendered by JavaScript, so the cache keeps the
+    # rendered HTML; a fresh (or, in replay mode, any) snapshot is parsed
+    # without loading the live page
+    cache = get_http_cache()
+    snapshot = cache.get(RENDERED_PREFIX + search_url) if cache else None
+    snapshot_html = None
+    if snapshot and (HTTP_CACHE_MODE == "replay" or cache.is_fresh(snapshot)):
+        snapshot_html = cache.read(snapshot)
+
+    if snapshot_html:
+        print("Using cached rendered search page")
+        cache.hits += 1
+        load_rendered_snapshot(driver, search_url, snapshot_html)
+    elif HTTP_CACHE_MODE == "replay":
+        print(f"⚠️ Not in cache (replay mode): {search_url}")
+        return False
+    else:
+        driver.get(search_url)
+
+        # Wait until the first product card renders instead of a fixed sleep
+        if wait_for_page(driver, SEARCH_READY_SELECTORS, step_name="search_page_load") and cache:
+            cache.misses += 1
+            cache.put(RENDERED_PREFIX + search_url,
+                      driver.page_source, page_type="search")
+    return True
+
+
+def extract_search_cards(driver, search_url):
+    """Extract every product card currently rendered on a search page"""
+    products = []
 
-    # Wait for the page to load
-    time.sleep(5)
+    # JavaScript to extract every card in one round trip instead of one
+    # find_element call (and one implicit wait on a miss) per card and selector
+    extraction_script = """
+        const productSelectors = arguments[0];
+        const titleSelectors = ["h1", "h2", "h3", "h4", "[class*='title']", "[class*='name']", "a[title]"];
+        const linkSelectors = ["a[href*='pdp']", "a[href*='product']", "a[href]"];
+        const priceSelectors = [".price", "[class*='price']", "[data-testid*='price']"];
+
+        // Use the first product selector that matches anything
+        let productElements = [];
+        let usedSelector = null;
+        for (const selector of productSelectors) {
+            const elements = document.querySelectorAll(selector);
+            if (elements.length) {
+                productElements = Array.from(elements);
+                usedSelector = selector;
+                break;
+            }
+        }
+
+        const firstText = (element, selectors) => {
+            for (const selector of selectors) {
+                const found = element.querySelector(selector);
+                const text = found ? (found.innerText || '').trim() : '';
+                if (text) {
+                    return text;
+                }
+            }
+            return null;
+        };
+
+        const cards = productElements.map((element, index) => {
+            // Search for product link
+            let productUrl = null;
+            for (const selector of linkSelectors) {
+                const link = element.querySelector(selector);
+                if (link && link.href) {
+                    productUrl = link.href;
+                    if (productUrl.includes('pdp') || productUrl.includes('product')) {
+                        break;
+                    }
+                }
+            }
 
-    products = []
+            return {
+                title: firstText(element, titleSelectors),
+                product_url: productUrl,
+                price: firstText(element, priceSelectors),
+                html: index < 3 ? element.outerHTML.substring(0, 500) : null
+            };
+        });
+
+        return { selector: usedSelector, cards: cards };
+    """
 
     try:
-        # Try different selectors to find products
-        product_selectors = [
-            "article",
-            "[data-testid*='product']",
-            ".product-card",
-            ".product-tile",
-            "[class*='product']"
-        ]
-
-        product_elements = []
-        for selector in product_selectors:
-            try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    print(
-                        f"Found {len(elements)} products with selector: {selector}")
-                    product_elements = elements
-                    break
-            except:
-                continue
-
-        if not product_elements:
+        result = driver.execute_script(
+            extraction_script, PRODUCT_CARD_SELECTORS)
+
+        if not result or not result.get('cards'):
             print("No products found. Saving HTML for debug...")
             with open("debug_page.html", "w", encoding="utf-8") as f:
                 f.write(driver.page_source)
             return products
 
-        # Extract information from each product
-        for i, element in enumerate(product_elements):
-            try:
-                product = {}
-
-                # Debugging: Save HTML of the element
-                if i < 3:  # Only for the first 3 elements
-                    print(f"=== DEBUG ELEMENT {i+1} ===")
-                    print(
-                        f"Element HTML: {element.get_attribute('outerHTML')[:500]}...")
-
-                # Search for product title
-                title = None
-                title_selectors = [
-                    "h1", "h2", "h3", "h4", "[class*='title']", "[class*='name']", "a[title]"]
-                for selector in title_selectors:
-                    try:
-                        title_element = element.find_element(
-                            By.CSS_SELECTOR, selector)
-                        title = title_element.text.strip()
-                        if title:
-                            if i < 3:
-                                print(
-                                    f"Title found with '{selector}': {title}")
-                            break
-                    except:
-                        if i < 3:
-                            print(f"No title found with '{selector}'")
-                        continue
-
-                # Search for product link
-                product_url = None
-                link_selectors = ["a[href*='pdp']",
-                                  "a[href*='product']", "a[href]"]
-                for selector in link_selectors:
-                    try:
-                        link_element = element.find_element(
-                            By.CSS_SELECTOR, selector)
-                        product_url = link_element.get_attribute("href")
-                        if product_url and ("pdp" in product_url or "product" in product_url):
-                            if i < 3:
-                                print(
-                                    f"URL found with '{selector}': {product_url}")
-                            break
-                    except:
-                        if i < 3:
-                            print(f"No link found with '{selector}'")
-                        continue
-
-                # Search for price (optional)
-                price = None
-                price_selectors = [
-                    ".price", "[class*='price']", "[data-testid*='price']"]
-                for selector in price_selectors:
-                    try:
-                        price_element = element.find_element(
-                            By.CSS_SELECTOR, selector)
-                        price = price_element.text.strip()
-                        if price:
-                            break
-                    except:
-                        continue
-
-                if title and product_url:
-                    product = {
-                        "title": title,
-                        "product_url": product_url,
-                        "price": price,
-                        "search_url": search_url
-                    }
-                    products.append(product)
-                    print(f"Product {i+1}: {title}")
-
-            except Exception as e:
-                print(f"Error extracting product {i+1}: {e}")
-                continue
+        cards = result['cards']
+        print(
+            f"Found {len(cards)} products with selector: {result['selector']}")
+
+        for i, card in enumerate(cards):
+            # Debugging: Show HTML of the first 3 elements
+            if card.get('html'):
+                print(f"=== DEBUG ELEMENT {i+1} ===")
+                print(f"Element HTML: {card['html']}...")
+
+            title = card.get('title')
+            product_url = card.get('product_url')
+
+            if title and product_url:
+                product = {
+                    "title": title,
+                    "product_url": product_url,
+                    "price": card.get('price'),
+                    "search_url": search_url
+                }
+                products.append(product)
+                print(f"Product {i+1}: {title}")
 
     except Exception as e:
         print(f"General error extracting products: {e}")
@@ -165,13 +232,286 @@ def extract_products_from_search(driver, search_url):
     return products
 
 
-def extract_product_details(driver, product_url):
-    """Extract specific details from a product page"""
+def search_page_url(search_url, page):
+    """URL of result page `page` (1-based) of a search"""
+    parts = urlsplit(search_url)
+    params = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+              if key != SEARCH_PAGE_PARAM]
+    if page > 1:
+        params.append((SEARCH_PAGE_PARAM, str(page)))
+    return urlunsplit(parts._replace(query=urlencode(params)))
+
+
+def product_key(product):
+    """Canonical identity of a product across pages and queries"""
+    return extract_product_id(product["product_url"]) or product["product_url"]
+
+
+def get_reported_total(driver):
+    """Number of results the search page says it has, or None"""
+    return driver.execute_script("""
+        const text = document.body ? document.body.innerText : '';
+        const match = text.match(/([\\d,]+)\\s+(?:results|products|items)\\b/i);
+        return match ? parseInt(match[1].replace(/,/g, ''), 10) : null;
+    """)
+
+
+def count_product_cards(driver):
+    """Number of cards matched by the first product selector that matches"""
+    return driver.execute_script("""
+        for (const selector of arguments[0]) {
+            const count = document.querySelectorAll(selector).length;
+            if (count) { return count; }
+        }
+        return 0;
+    """, PRODUCT_CARD_SELECTORS)
+
+
+def scroll_until_complete(driver, expected_total=None):
+    """Infinite-scroll / "load more" listings: scroll until no new cards appear"""
+    count = count_product_cards(driver)
+    for _ in range(MAX_SEARCH_PAGES):
+        if expected_total and count >= expected_total:
+            break
+        driver.execute_script("""
+            window.scrollTo(0, document.body.scrollHeight);
+            const more = Array.from(document.querySelectorAll('button, a'))
+                .find(el => /load more|show more|view more/i.test(el.textContent));
+            if (more) { more.click(); }
+        """)
+        # Wait for the card count to grow instead of sleeping
+        previous_count = count
+        if not wait_until(driver, lambda d: count_product_cards(d) > previous_count,
+                          timeout=10, step_name="search_scroll"):
+            break
+        count = count_product_cards(driver)
+    return count
+
+
+def add_unique(products_by_key, products):
+    """Add products not seen yet; returns how many were new"""
+    added = 0
+    for product in products:
+        key = product_key(product)
+        if key not in products_by_key:
+            products_by_key[key] = product
+            added += 1
+    return added
+
+
+def extract_result_page(driver, page_url):
+    """Products on one result page, or None if the page failed to load"""
+    try:
+        return extract_products_from_search(driver, page_url)
+    except Exception as e:
+        print(f"❌ Result page failed, skipping it: {page_url}: {e}")
+        return None
+
+
+def fetch_search_pages(page_urls, driver_pool, executor):
+    """Load several result pages at once, each with a browser checked out of the pool
+
+    A page that fails is None in the result, so one bad page costs only itself.
+    """
+    def _fetch(page_url):
+        # Caught outside the with block so a crashed browser is not put back
+        try:
+            with driver_pool.driver() as page_driver:
+                return extract_products_from_search(page_driver, page_url)
+        except Exception as e:
+            print(f"❌ Result page failed, skipping it: {page_url}: {e}")
+            return None
+
+    return list(executor.map(_fetch, page_urls))
+
+
+def harvest_query(driver, search_url, driver_pool=None, page_executor=None):
+    """Collect every result of one search, following its pages or scrolling
+
+    Pages 3..N are loaded on page_executor with driver_pool browsers when
+    both are given (shared by every query), otherwise one by one in driver.
+    Result pages after the first that fail are skipped and listed in the
+    coverage dict's "failed_pages". Returns (unique products, coverage dict).
+    """
+    products_by_key = {}
+    failed_pages = []
+    add_unique(products_by_key, extract_products_from_search(driver, search_url))
+    first_page_count = len(products_by_key)
+    reported_total = get_reported_total(driver)
+    mode = "single page"
+
+    if reported_total and first_page_count and first_page_count < reported_total:
+        page_count = min(MAX_SEARCH_PAGES, math.ceil(
+            reported_total / first_page_count))
+
+        # Page 2 tells us whether the URL page parameter is honoured
+        second_page_url = search_page_url(search_url, 2)
+        second_page = extract_result_page(driver, second_page_url)
+        if second_page is None:
+            failed_pages.append(second_page_url)
+        elif add_unique(products_by_key, second_page):
+            mode = "pages"
+            page_urls = [search_page_url(search_url, page)
+                         for page in range(3, page_count + 1)]
+            if driver_pool and page_executor and page_urls:
+                pages = fetch_search_pages(
+                    page_urls, driver_pool, page_executor)
+            else:
+                pages = [extract_result_page(driver, page_url)
+                         for page_url in page_urls]
+            for page_url, page_products in zip(page_urls, pages):
+                if page_products is None:
+                    failed_pages.append(page_url)
+                else:
+                    add_unique(products_by_key, page_products)
+        elif HTTP_CACHE_MODE != "replay":
+            # Same cards on "page 2": the listing grows by scrolling instead
+            mode = "scroll"
+            driver.get(search_url)
+            wait_for_page(driver, SEARCH_READY_SELECTORS,
+                          step_name="search_page_load")
+            scroll_until_complete(driver, reported_total)
+            add_unique(products_by_key, extract_search_cards(driver, search_url))
+
+    products = list(products_by_key.values())
+    for product in products:
+        product["search_url"] = search_url
+
+    coverage = {
+        "search_url": search_url,
+        "mode": mode,
+        "reported_total": reported_total,
+        "found": len(products),
+        "coverage": round(len(products) / reported_total, 3) if reported_total else None,
+        "failed_pages": failed_pages
+    }
+    print(
+        f"🔎 {search_url}: {len(products)}/{reported_total or '?'} products ({mode})"
+        f"{f', {len(failed_pages)} pages failed' if failed_pages else ''}")
+    return products, coverage
+
+
+def dedupe_products(query_results):
+    """Merge the products of several queries so each product page is fetched once
+
+    query_results: list of (search_url, products). Every unique product keeps
+    the first query in "search_url" and all of them in "search_urls".
+    Returns (unique products, number of new products per query).
+    """
+    products_by_key = {}
+    new_counts = []
+    total_cards = 0
+
+    for search_url, products in query_results:
+        new_count = 0
+        for product in products:
+            total_cards += 1
+            key = product_key(product)
+            existing = products_by_key.get(key)
+            if existing is None:
+                products_by_key[key] = {**product, "search_url": search_url,
+                                        "search_urls": [search_url]}
+                new_count += 1
+            elif search_url not in existing["search_urls"]:
+                existing["search_urls"].append(search_url)
+        new_counts.append(new_count)
+
+    saved = total_cards - len(products_by_key)
+    if total_cards:
+        print(f"🧬 {total_cards} listing cards -> {len(products_by_key)} unique products "
+              f"({saved} detail fetches saved, {saved / total_cards:.0%})")
+    return list(products_by_key.values()), new_counts
+
+
+def harvest_listings(driver, urls):
+    """Harvest every query, then merge products found by several queries
+
+    Writes a per-query coverage report to COVERAGE_FILE.
+    """
+    query_results = []
+    report = []
+    driver_pool = page_executor = None
+    if LISTING_WORKERS > 1:
+        # One pool and one executor for every query
+        driver_pool = DriverPool(setup_listing_driver, max_drivers=LISTING_WORKERS)
+        page_executor = ThreadPoolExecutor(max_workers=LISTING_WORKERS)
+
+    try:
+        for search_url in urls:
+            print(f"\n=== Processing search: {search_url} ===")
+            products, coverage = harvest_query(
+                driver, search_url, driver_pool, page_executor)
+            query_results.append((search_url, products))
+            report.append(coverage)
+    finally:
+        if page_executor:
+            page_executor.shutdown(wait=True)
+        if driver_pool:
+            driver_pool.close_all()
+
+    unique_products, new_counts = dedupe_products(query_results)
+    for coverage, new_count in zip(report, new_counts):
+        coverage["new"] = new_count
+        coverage["duplicates"] = coverage["found"] - new_count
+
+    print_coverage_report(report)
+    with open(COVERAGE_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    return unique_products, report
+
+
+def print_coverage_report(report):
+    print(f"\n📋 Search coverage")
+    print(f"   {'query':<28} {'mode':<12} {'found':>6} {'total':>6} {'cover':>6} {'new':>5} {'dup':>5} {'failed':>6}")
+    for row in report:
+        query = dict(parse_qsl(urlsplit(row["search_url"]).query)).get(
+            "q", row["search_url"])
+        cover = f"{row['coverage']:.0%}" if row["coverage"] is not None else "?"
+        print(f"   {query[:28]:<28} {row['mode']:<12} {row['found']:>6} {str(row['reported_total'] or '?'):>6} "
+              f"{cover:>6} {row['new']:>5} {row['duplicates']:>5} {len(row['failed_pages']):>6}")
+    print(f"   Unique products: {sum(row['new'] for row in report)}")
+
+
+def extract_product_details(driver, product_url, backend=FETCH_BACKEND):
+    """Extract specific details from a product page
+
+    backend: "auto" (HTTP first, Selenium when fields are missing),
+    "http" (never open the page in the browser) or "selenium".
+    """
     print(f"Extracting details from: {product_url}")
 
+    # Replay never goes to the site, so only cached HTTP pages are used
+    if HTTP_CACHE_MODE == "replay":
+        backend = "http"
+
+    http_details = {}
+    if backend in ("auto", "http"):
+        with step_timer.step("product_http_fetch"):
+            http_details = fetch_product_details_http(product_url)
+
+        if backend == "http" or has_required_fields(http_details):
+            return http_details
+
+        print("HTTP details incomplete, falling back to Selenium...")
+
+    details = extract_product_details_selenium(driver, product_url)
+
+    # Keep anything HTTP found that the browser did not
+    for key, value in http_details.items():
+        if value and not details.get(key):
+            details[key] = value
+
+    return details
+
+
+def extract_product_details_selenium(driver, product_url):
+    """Extract specific details from a product page rendered in the browser"""
     try:
+        use_stage(driver, "product")
         driver.get(product_url)
-        time.sleep(3)
+        wait_for_page(driver, ["h1"], timeout=10,
+                      step_name="product_page_load")
 
         details = {}
 
@@ -247,31 +587,27 @@ def main():
     """Main scraper function"""
     driver = setup_driver()
     all_products = []
+    mongo_sink = open_mongo_sink()
 
     try:
-        # Process each search URL
-        for search_url in search_urls:
-            print(f"\n=== Processing search: {search_url} ===")
-
-            # Extract products from search page
-            search_products = extract_products_from_search(
-                driver, search_url)
-            print(f"Found {len(search_products)} products")
-
-            # Extract details from each product
-            for i, product in enumerate(search_products):
-                print(f"\nProcessing product {i+1}/{len(search_products)}")
+        # Every page of every query; products found by several queries are
+        # merged first so each product page is scheduled once
+        search_products, _ = harvest_listings(driver, search_urls)
+        print(f"Found {len(search_products)} products")
 
-                # Extract product details
-                details = extract_product_details(
-                    driver, product["product_url"])
+        # Extract details from each product
+        for i, product in enumerate(search_products):
+            print(f"\nProcessing product {i+1}/{len(search_products)}")
 
-                # Combine basic information with details
-                complete_product = {**product, **details}
-                all_products.append(complete_product)
+            # Extract product details
+            details = extract_product_details(
+                driver, product["product_url"])
 
-                # Small pause between products
-                time.sleep(2)
+            # Combine basic information with details
+            complete_product = {**product, **details}
+            all_products.append(complete_product)
+            if mongo_sink:
+                mongo_sink.add_product(complete_product)
 
         # Save results to JSON
         with open("productos_scraped.json", "w", encoding="utf-8") as f:
@@ -280,12 +616,17 @@ def main():
         print(f"\n=== SCRAPING COMPLETED ===")
         print(f"Total products processed: {len(all_products)}")
         print(f"Results saved to: productos_scraped.json")
+        step_timer.report()
+        if get_http_cache():
+            get_http_cache().print_stats()
 
     except Exception as e:
         print(f"Error in main process: {e}")
 
     finally:
         driver.quit()
+        if mongo_sink:
+            mongo_sink.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# The scripts import each other as top-level modules (run from the repo root or NLP/)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "NLP"))
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """In-memory MongoDB database (mongomock)"""
+    import mongomock
+    from mongomock.collection import BulkOperationBuilder
+
+    # pymongo >= 4.9 passes a `sort` argument to bulk updates that
+    # mongomock 4.3 does not accept yet
+    add_update = BulkOperationBuilder.add_update
+
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+
+    monkeypatch.setattr(BulkOperationBuilder, "add_update", add_update_without_sort)
+    return mongomock.MongoClient()["canadian_tire_scraper_test"]
@@ -0,0 +1,40 @@
+from adaptive_concurrency import (AdaptiveConcurrencyController, CHALLENGE, OK, THROTTLED,
+                                  classify_status, simulate)
+
+
+def test_limit_settles_near_stub_capacity():
+    capacity = 4
+    controller = simulate(total_requests=200, capacity=capacity,
+                          base_latency=0.05, max_limit=16)
+
+    # AIMD saw-tooth: climbs until latency passes the target (2x capacity),
+    # halves, climbs again; it never runs away towards max_limit
+    limits = [decision["to"] for decision in controller.decisions]
+    assert any(decision["action"] == "decrease" for decision in controller.decisions)
+    assert max(limits) <= capacity * 2
+    first_decrease = next(i for i, decision in enumerate(controller.decisions)
+                          if decision["action"] == "decrease")
+    assert min(limits[first_decrease:]) >= capacity
+    assert capacity <= controller.limit <= capacity * 2
+
+
+def test_throttle_or_challenge_halves_the_limit():
+    controller = AdaptiveConcurrencyController(initial=8, max_limit=8, cooldown=0)
+    controller.record(0.1, OK)
+    assert controller.limit == 8
+
+    controller.record(0.1, classify_status(429))
+    assert controller.limit == 4
+
+    challenge = classify_status(200, "<title>Pardon Our Interruption</title>")
+    assert challenge == CHALLENGE
+    controller.record(0.1, challenge)
+    assert controller.limit == 2
+    assert [d["action"] for d in controller.decisions] == ["decrease", "decrease"]
+
+
+def test_one_cut_per_cooldown():
+    controller = AdaptiveConcurrencyController(initial=8, max_limit=8, cooldown=60)
+    controller.record(0.1, THROTTLED)
+    controller.record(0.1, THROTTLED)
+    assert controller.limit == 4
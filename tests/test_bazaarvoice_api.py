@@ -0,0 +1,116 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import bazaarvoice_api
+from clean_products import review_age_text
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PRODUCT_URL = ("https://www.canadiantire.ca/en/pdp/"
+               "supercycle-reaction-hardtail-mountain-bike-for-all-ages-26-in-black-0710110p.html")
+# What the widget renders next to a review
+WIDGET_DATE = re.compile(
+    r"^(a few seconds|(a|an|\d+) (minute|hour|day|month|year)s?) ago$")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def recorded_api():
+    """Local server replaying a recorded reviews.json response, sliced by Offset/Limit"""
+    recorded = load_fixture("bv_reviews_0710110P.json")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            params = parse_qs(urlparse(self.path).query)
+            offset = int(params["Offset"][0])
+            limit = int(params["Limit"][0])
+            page = {**recorded, "Offset": offset, "Limit": limit,
+                    "Results": recorded["Results"][offset:offset + limit]}
+            body = json.dumps(page).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/data/reviews.json"
+    server.shutdown()
+    server.server_close()
+
+
+def test_api_reviews_match_dom_reviews(recorded_api):
+    dom_review = load_fixture("dom_review.json")
+
+    reviews, summary = bazaarvoice_api.fetch_all_reviews(
+        PRODUCT_URL, page_size=2, api_url=recorded_api)
+
+    assert len(reviews) == 3
+    assert summary == {"average_rating": 3.7, "total_reviews": 3, "has_reviews": True}
+    for review in reviews:
+        assert list(review) == list(dom_review)
+        assert re.match(r"^bv-review-\d+$", review["review_id"])
+        assert review["product_url"] == PRODUCT_URL
+        assert isinstance(review["rating"], int)
+        assert isinstance(review["body"], str)
+        assert isinstance(review["reviewer"], str)
+        assert isinstance(review["verified_purchaser"], bool)
+        assert isinstance(review["helpful_count"], int)
+        assert WIDGET_DATE.match(review["date"])
+
+    # The same review read both ways
+    first = reviews[0]
+    for field in ("review_id", "rating", "title", "body", "reviewer",
+                  "verified_purchaser", "helpful_count"):
+        assert first[field] == dom_review[field]
+    assert WIDGET_DATE.match(dom_review["date"])
+
+
+def test_fetch_new_reviews_stops_at_known_review(recorded_api):
+    new_reviews, _ = bazaarvoice_api.fetch_new_reviews(
+        PRODUCT_URL, "bv-review-291004377", page_size=2, api_url=recorded_api)
+    assert [r["review_id"] for r in new_reviews] == [
+        "bv-review-298713442", "bv-review-297950118"]
+
+
+@pytest.mark.parametrize("submitted, expected", [
+    ("2025-08-05T19:59:30.000+00:00", "a few seconds ago"),
+    ("2025-08-05T19:20:00.000+00:00", "40 minutes ago"),
+    ("2025-08-05T15:00:00.000+00:00", "5 hours ago"),
+    ("2025-08-04T10:00:00.000+00:00", "a day ago"),
+    ("2025-08-03T18:21:07.000+00:00", "2 days ago"),
+    ("2025-07-01T12:00:00.000+00:00", "a month ago"),
+    ("2025-06-05T12:00:00.000+00:00", "2 months ago"),
+    ("2024-09-30T11:05:12.000+00:00", "10 months ago"),
+    ("2023-08-01T00:00:00.000+00:00", "2 years ago"),
+])
+def test_review_age_text(submitted, expected):
+    now = datetime(2025, 8, 5, 20, 0, tzinfo=timezone.utc)
+    assert review_age_text(submitted, now=now) == expected
+
+
+def test_review_age_text_keeps_unparseable_values():
+    assert review_age_text(None) == ''
+    assert review_age_text("last spring") == "last spring"
+
+
+def test_fetch_new_reviews_reports_known_review_on_first_position(recorded_api):
+    new_reviews, summary = bazaarvoice_api.fetch_new_reviews(
+        PRODUCT_URL, "bv-review-298713442", page_size=2, api_url=recorded_api)
+    assert new_reviews == []
+    assert summary["reached_known_review"]
@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+from frontier import CrawlFrontier, PENDING, IN_FLIGHT
+
+
+def finished_pid():
+    """Pid of a process that has already exited"""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_restart_releases_leases_of_dead_workers(tmp_path):
+    frontier = CrawlFrontier(str(tmp_path / "frontier.db"))
+    frontier.add_urls(["crashed", "alive", "parallel"])
+    dead_pid = finished_pid()
+    assert frontier.claim_url("crashed", f"review_scraper-{dead_pid}")
+    assert frontier.claim_url("parallel", f"{dead_pid}-T_0")
+    # A worker in another live process keeps its lease
+    assert frontier.claim_url("alive", f"review_scraper-{os.getppid()}")
+
+    # The old run's leases have not expired, so nothing can be claimed yet
+    assert not frontier.claim_url("crashed", "next-run")
+
+    assert frontier.release_dead_leases() == 2
+    assert frontier.get("crashed")["state"] == PENDING
+    assert frontier.get("parallel")["state"] == PENDING
+    assert frontier.get("alive")["state"] == IN_FLIGHT
+    assert frontier.claim_url("crashed", "next-run")
+    frontier.close()
@@ -0,0 +1,55 @@
+import time
+
+from mongo_sink import MongoSink
+
+REVIEW = {
+    "review_id": "bv-review-298713442",
+    "product_url": "https://www.canadiantire.ca/en/pdp/supercycle-reaction-26-in-black-0710110p.html",
+    "rating": 1,
+    "title": "Bike Return Policy",
+    "body": "I'm not very happy with the policy of Canadian tire...",
+    "date": "2 days ago",
+    "reviewer": "Greg",
+    "verified_purchaser": True,
+    "helpful_count": 0
+}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_same_review_twice_is_one_updated_document(mongo_db):
+    sink = MongoSink(mongo_db, batch_size=100, flush_interval=60)
+    sink.add_reviews([REVIEW])
+    sink.flush()
+    # Fields owned by the NLP step must survive a re-scrape
+    mongo_db.reviews.update_one({"review_id": REVIEW["review_id"]},
+                                {"$set": {"sentiment": "negative"}})
+
+    sink.add_reviews([{**REVIEW, "helpful_count": 3}])
+    sink.close()
+
+    assert mongo_db.reviews.count_documents({}) == 1
+    stored = mongo_db.reviews.find_one({"review_id": REVIEW["review_id"]})
+    assert stored["helpful_count"] == 3
+    assert stored["sentiment"] == "negative"
+    assert stored["product_id"] == "0710110p"
+    assert sink.written["reviews"] == 2
+    assert sink.error_count == 0
+
+
+def test_timer_flushes_a_partial_batch(mongo_db):
+    sink = MongoSink(mongo_db, batch_size=100, flush_interval=0.2)
+    try:
+        sink.add_reviews([REVIEW])
+        # No further record arrives, the background thread writes it anyway
+        assert wait_for(lambda: mongo_db.reviews.count_documents({}) == 1)
+        assert sink.buffers["reviews"] == []
+    finally:
+        sink.close()
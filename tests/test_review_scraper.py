@@ -0,0 +1,19 @@
+from review_scraper import missing_reviews, review_snapshot
+
+PREVIOUS = {"total_reviews": 10, "average_rating": 4.2,
+            "newest_review_id": "bv-review-1", "newest_review_date": "3 days ago"}
+
+
+def test_new_reviews_announced_but_none_extracted_are_missing():
+    assert missing_reviews([], {"total_reviews": 12}, PREVIOUS) == 2
+    assert missing_reviews([], {"total_reviews": 5}) == 5
+
+
+def test_count_change_without_new_reviews_is_not_missing():
+    # One review removed and another added: the known review is still first
+    summary = {"total_reviews": 11, "average_rating": 4.3, "reached_known_review": True}
+    assert missing_reviews([], summary, PREVIOUS) == 0
+
+    snapshot = review_snapshot([], summary, PREVIOUS)
+    assert snapshot["total_reviews"] == 11
+    assert snapshot["newest_review_id"] == "bv-review-1"
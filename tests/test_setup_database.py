@@ -0,0 +1,40 @@
+import importlib
+
+import pytest
+
+REVIEWS = [
+    {"review_id": "bv-review-1", "product_url": "https://x/a-0710110p.html", "body": "Great"},
+    {"review_id": "bv-review-1", "product_url": "https://x/a-0710110p.html", "body": "Great"},
+    {"product_url": "https://x/a-0710110p.html", "body": "No id", "rating": 4},
+    {"review_id": "bv-review-2", "product_url": "https://x/b-0220220p.html", "body": "Fine"},
+]
+
+
+@pytest.fixture
+def setup_database(monkeypatch):
+    # The module builds the Atlas URI from DB_PASSWORD when imported
+    monkeypatch.setenv("DB_PASSWORD", "test")
+    return importlib.import_module("setup_database")
+
+
+def test_incremental_load_on_a_database_from_the_old_loader(setup_database, mongo_db):
+    # The old loader inserted the file as is, without a unique index;
+    # the NLP step then added its fields
+    mongo_db.reviews.insert_many([dict(review) for review in REVIEWS])
+    mongo_db.reviews.update_many({}, {"$set": {"words": ["..."], "sentiment_analysis": {"label": "positive"}}})
+
+    setup_database.load_collection(mongo_db, "reviews",
+                                   setup_database.prepare_reviews(REVIEWS), "review_id")
+
+    assert setup_database.has_unique_index(mongo_db.reviews, "review_id")
+    assert mongo_db.reviews.count_documents({}) == 3
+    # The review without an id got the id the loader derives, so it was matched, not duplicated
+    no_id = mongo_db.reviews.find_one({"body": "No id"})
+    assert no_id["review_id"].startswith("content-")
+    assert no_id["sentiment_analysis"] == {"label": "positive"}
+
+
+def test_unique_index_already_there_is_left_alone(setup_database, mongo_db):
+    mongo_db.reviews.create_index("review_id", unique=True)
+    mongo_db.reviews.insert_one({"review_id": "bv-review-1"})
+    assert setup_database.prepare_unique_index(mongo_db.reviews, "reviews", "review_id") == (0, 0)
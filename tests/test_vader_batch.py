@@ -0,0 +1,32 @@
+import random
+
+import pytest
+
+from vader_batch import FIXTURE_REVIEWS, BatchVader, compare_with_nltk, get_vader_analyzer
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    try:
+        return get_vader_analyzer()
+    except LookupError as e:
+        pytest.skip(str(e))
+
+
+@pytest.fixture(scope="module")
+def engine(analyzer):
+    return BatchVader(analyzer.lexicon)
+
+
+def test_fixture_corpus_matches_nltk(analyzer, engine):
+    mismatches = compare_with_nltk(FIXTURE_REVIEWS, analyzer, engine)
+    assert not mismatches, "\n".join(
+        f"{text!r}: NLTK {expected}, batch {got}" for text, expected, got in mismatches)
+
+
+def test_mixed_reviews_match_nltk(analyzer, engine):
+    # Several fixture texts joined, as in the benchmark: rules cross sentence boundaries
+    rng = random.Random(0)
+    texts = [" ".join(rng.sample(FIXTURE_REVIEWS, 3)) for _ in range(200)]
+    assert engine.polarity_scores_batch(texts) == [
+        analyzer.polarity_scores(text) for text in texts]
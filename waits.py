@@ -0,0 +1,148 @@
+import threading
+import time
+from contextlib import contextmanager
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+REVIEW_SECTIONS_SELECTOR = "#reviews_container section[id^='bv-review-']"
+# A search page is ready once a product card with its link has rendered
+# (a bare [class*='product'] matches page wrappers long before any card)
+SEARCH_READY_SELECTORS = [
+    "article a[href]",
+    "[data-testid*='product'] a[href]",
+    ".product-card a[href]",
+    ".product-tile a[href]"
+]
+
+
+class StepTimer:
+    """Collect how long each scraping step takes so slow waits are visible"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.steps = {}
+
+    @contextmanager
+    def step(self, name):
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.record(name, time.time() - start_time)
+
+    def record(self, name, elapsed):
+        with self.lock:
+            stats = self.steps.setdefault(
+                name, {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+
+    def report(self):
+        """Print a per-step timing summary"""
+        with self.lock:
+            steps = dict(self.steps)
+
+        if not steps:
+            return
+
+        print(f"\n⏱️ STEP TIMING REPORT:")
+        print(f"   {'step':<28} {'count':>6} {'total(s)':>10} {'avg(s)':>8} {'max(s)':>8}")
+        for name, stats in sorted(steps.items(), key=lambda item: -item[1]["total"]):
+            avg = stats["total"] / stats["count"]
+            print(
+                f"   {name:<28} {stats['count']:>6} {stats['total']:>10.2f} {avg:>8.2f} {stats['max']:>8.2f}")
+
+
+# Shared timer used by all scrapers in this process
+step_timer = StepTimer()
+
+
+def wait_until(driver, condition, timeout=15, step_name=None, poll_frequency=0.25):
+    """Wait for an expected condition and return its value, or None on timeout"""
+    start_time = time.time()
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(condition)
+    except TimeoutException:
+        return None
+    finally:
+        if step_name:
+            step_timer.record(step_name, time.time() - start_time)
+
+
+def document_ready(driver):
+    """Condition: the document finished loading"""
+    try:
+        return driver.execute_script("return document.readyState") == "complete"
+    except WebDriverException:
+        return False
+
+
+def any_css_present(selectors):
+    """Condition: at least one selector matches; returns the matching selector
+
+    Uses querySelector in the page so a miss never waits out implicitly_wait.
+    """
+    script = """
+        for (const selector of arguments[0]) {
+            try {
+                if (document.querySelector(selector)) { return selector; }
+            } catch (e) {}
+        }
+        return null;
+    """
+
+    def _condition(driver):
+        try:
+            return driver.execute_script(script, list(selectors))
+        except WebDriverException:
+            return None
+
+    return _condition
+
+
+def get_review_sections_signature(driver):
+    """Count and first id of the rendered review sections"""
+    try:
+        return driver.execute_script("""
+            const sections = document.querySelectorAll(arguments[0]);
+            return {
+                count: sections.length,
+                first_id: sections.length ? sections[0].id : null
+            };
+        """, REVIEW_SECTIONS_SELECTOR)
+    except WebDriverException:
+        return {"count": 0, "first_id": None}
+
+
+class review_sections_changed:
+    """Condition: the set of rendered review sections differs from a previous signature
+
+    Bazaarvoice swaps the review sections in place when paginating, so we
+    compare both the count and the id of the first section.
+    """
+
+    def __init__(self, previous_signature):
+        self.previous_signature = previous_signature
+
+    def __call__(self, driver):
+        current = get_review_sections_signature(driver)
+        if current["count"] and current != self.previous_signature:
+            return current
+        return False
+
+
+def wait_for_page(driver, ready_selectors=None, timeout=15, step_name="page_load"):
+    """Wait for document ready and, optionally, for any of the given selectors"""
+    start_time = time.time()
+    wait_until(driver, document_ready, timeout=timeout)
+
+    found = None
+    if ready_selectors:
+        remaining = max(timeout - (time.time() - start_time), 1)
+        found = wait_until(driver, any_css_present(
+            ready_selectors), timeout=remaining)
+
+    step_timer.record(step_name, time.time() - start_time)
+    return found
+